@@ -1,21 +1,42 @@
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
-from flasgger import Swagger
 
-from extensions import db, jwt, migrate
+from extensions import db, jwt
 
 from src.models.user_model import User
 from src.models.account_model import Account
 from src.models.transaction_model import Transaction
 from src.models.token_blocklist_model import TokenBlocklist
+from src.models.balance_snapshot_model import BalanceSnapshot
+from src.models.idempotency_key_model import IdempotencyKey
+from src.models.pending_transfer_model import PendingTransfer
+from src.models.account_shard_model import AccountShard
 
 from src.api.v1.controllers.default_controller import default_bp
 from src.api.v1.controllers.account_controller import account_bp
 from src.api.v1.controllers.transaction_controller import transaction_bp
 from src.api.v1.controllers.user_controller import user_bp
+from src.api.v1.controllers.async_controller import async_bp
 
-from src.services.token_blocklist_service import check_if_token_revoked
-from logger import logger
+from src.commands.query_plan_command import check_query_plans
+from src.commands.ledger_command import ledger_cli
+from src.commands.token_command import token_cli
+from src.commands.idempotency_command import idempotency_cli
+from src.commands.transfer_command import transfer_cli
+from src.commands.account_command import account_cli
+from src.commands.user_command import user_cli
+from src.commands.swagger_command import export_apispec
+
+from src.services.token_blocklist_service import check_if_token_revoked, init_revoked_token_cache
+from src.utils.pool_metrics import configure_pool_metrics
+from src.utils.request_metrics import init_request_metrics
+from src.utils.replicas import init_replicas
+from src.utils.async_db import init_async_db
+from src.utils.passwords import init_password_hasher
+from src.utils.rate_limit import init_rate_limiting
+from src.utils.schema import check_schema, migrations_directory
+from logger import logger, init_logging
 from config import config
 
 
@@ -25,30 +46,58 @@ def create_app():
     config_name = os.getenv('FLASK_ENV', 'default')
     configuration = config[config_name]()
     app.config.from_object(configuration)
+    if configuration.TRUSTED_PROXY_COUNT:
+        # Behind a load balancer every request comes from its address, the client's is taken from the X-Forwarded-For header it appends
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=configuration.TRUSTED_PROXY_COUNT)
 
+    init_logging(app)
+    init_request_metrics(app)
+    configure_pool_metrics(app)
     db.init_app(app)
+    init_replicas(app)
+    init_async_db(app)
+    init_password_hasher(app)
     jwt.init_app(app)
-    migrate.init_app(app, db)
+    init_rate_limiting(app)
+    if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+        # Only the flask db commands need Flask-Migrate, which loads alembic and its templating, so workers skip it
+        from flask_migrate import Migrate
+        Migrate(app, db, directory=migrations_directory(app))
 
-    if config_name != 'testing':
-        with app.app_context():
-            db.create_all()
+    check_schema(app)
 
     app.register_blueprint(default_bp)
     app.register_blueprint(account_bp, url_prefix = '/account')
     app.register_blueprint(transaction_bp, url_prefix = '/transaction')
     app.register_blueprint(user_bp, url_prefix = '/user')
+    if configuration.ASYNC_ENABLED:
+        app.register_blueprint(async_bp, url_prefix = '/async')
 
+    init_revoked_token_cache(app)
     jwt.token_in_blocklist_loader(check_if_token_revoked)
 
-    swagger = Swagger(app, template={
-        "info": {
-            "title": configuration.APP_NAME,
-            "description": configuration.APP_DESCRIPTION,
-            "version": configuration.APP_VERSION,
-            }
-        }
-    )
+    app.cli.add_command(check_query_plans)
+    app.cli.add_command(ledger_cli)
+    app.cli.add_command(token_cli)
+    app.cli.add_command(idempotency_cli)
+    app.cli.add_command(transfer_cli)
+    app.cli.add_command(account_cli)
+    app.cli.add_command(user_cli)
+    app.cli.add_command(export_apispec)
+
+    if configuration.SWAGGER_ENABLED:
+        # Imported here so that workers running without the API docs never load flasgger
+        from src.utils.swagger import CachedSwagger
+
+        swagger = CachedSwagger(app, template={
+            "info": {
+                "title": configuration.APP_NAME,
+                "description": configuration.APP_DESCRIPTION,
+                "version": configuration.APP_VERSION,
+                }
+            },
+            spec_file=configuration.SWAGGER_SPEC_FILE,
+        )
 
     return app
 
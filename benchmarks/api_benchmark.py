@@ -0,0 +1,333 @@
+'''
+Throughput and latency benchmark of the API, run against a local SQLite or PostgreSQL database
+
+    python -m benchmarks.api_benchmark run --database-uri sqlite:///benchmark.db --clients 16 --duration 30
+    python -m benchmarks.api_benchmark run --database-uri sqlite:///benchmark.db --clients 16 --duration 30 --path async
+    python -m benchmarks.api_benchmark compare benchmarks/results/old.json benchmarks/results/new.json
+
+The application is built with create_app() and served over WSGI by a threaded server in this process, the clients are threads
+issuing HTTP requests over keep-alive connections, so the numbers are those of a single worker
+With --path async the balance, history and money moving requests go to the /async endpoints instead, which measures their overhead
+as they hold the request thread like the sync views
+'''
+import json
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+from datetime import datetime, timedelta
+from http.client import HTTPConnection
+from urllib.parse import urlencode
+
+import click
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+
+BENCHMARK_PASSWORD = 'benchmark'
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(__file__), 'results')
+
+# Relative weight of each operation in the request mix
+OPERATIONS = {'login': 1, 'deposit': 2, 'withdraw': 2, 'transfer': 4, 'balance': 6, 'history': 5}
+
+
+def configure_environment(database_uri: str, env: str, path: str) -> None:
+    '''
+    Function to point the application at the benchmark database before it is created, tokens must outlive the run, rate limits are lifted and per request logging is turned down so that it is not measured
+    '''
+    os.environ['FLASK_ENV'] = env
+    os.environ['SQLALCHEMY_DATABASE_URI'] = database_uri
+    os.environ.setdefault('JWT_ACCESS_TOKEN_EXPIRES', '86400')
+    os.environ.setdefault('JWT_REFRESH_TOKEN_EXPIRES', '86400')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('LOG_FILE', '')
+    # The benchmark creates the tables itself when seeding
+    os.environ.setdefault('SCHEMA_CHECK', 'off')
+    # Every client comes from the same address, the limits would reject most of the load
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'False')
+    os.environ['ASYNC_ENABLED'] = str(path == 'async')
+
+def seed(db, users: int, accounts_per_user: int, transactions: int, balance: float, rng: random.Random) -> None:
+    '''
+    Function to recreate the tables and fill them with benchmark users sharing one password, their accounts and a random transaction history
+    '''
+    from sqlalchemy import insert
+    from src.models.user_model import User
+    from src.models.account_model import Account
+    from src.models.transaction_model import Transaction
+    from src.services.user_service import UserService
+    from src.utils.constants import Currency, TransactionType
+
+    db.drop_all()
+    db.create_all()
+
+    now = datetime.now()
+    salt, password = UserService(db.session).salt_and_hash(BENCHMARK_PASSWORD)
+
+    db.session.execute(insert(User), [
+        {'id': user, 'username': f'bench{user}', 'email': f'bench{user}@benchmark.test', 'password': password, 'salt': salt, 'first_name': 'bench', 'last_name': 'bench', 'date': now}
+        for user in range(1, users + 1)
+    ])
+    db.session.execute(insert(Account), [
+        {'id': (user - 1) * accounts_per_user + number, 'user_id': user, 'currency': Currency.USD.value, 'balance': balance, 'date': now}
+        for user in range(1, users + 1) for number in range(1, accounts_per_user + 1)
+    ])
+
+    account_count = users * accounts_per_user
+    for start in range(0, transactions, 10000):
+        rows = []
+        for _ in range(start, min(start + 10000, transactions)):
+            sender, receiver = rng.randint(1, account_count), rng.randint(1, account_count)
+            type = rng.choice(list(TransactionType)).value
+            if type == TransactionType.DEPOSIT.value:
+                sender = receiver
+            elif type == TransactionType.WITHDRAW.value:
+                receiver = sender
+            rows.append({'type': type, 'amount': round(rng.uniform(1, 100), 2), 'sender_id': sender, 'receiver_id': receiver, 'date': now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))})
+        db.session.execute(insert(Transaction), rows)
+
+    db.session.commit()
+
+def load_users(db) -> list[dict]:
+    from sqlalchemy import select
+    from src.models.user_model import User
+    from src.models.account_model import Account
+
+    users = {}
+    rows = db.session.execute(select(User.username, Account.id).join(Account, Account.user_id == User.id).where(User.username.like('bench%'), Account.active).order_by(Account.id))
+    for username, account_id in rows:
+        users.setdefault(username, []).append(account_id)
+    return [{'username': username, 'accounts': accounts} for username, accounts in users.items()]
+
+class Client(threading.Thread):
+    '''
+    Simulated user issuing a weighted mix of requests until the deadline, latencies are only kept once the warmup is over
+    '''
+    def __init__(self, port: int, user: dict, users: list[dict], start_at: float, deadline: float, seed: int, prefix: str = ''):
+        super().__init__(daemon=True)
+        self.connection = HTTPConnection('127.0.0.1', port, timeout=60)
+        self.prefix = prefix
+        self.user = user
+        self.users = users
+        self.start_at = start_at
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.samples = {operation: [] for operation in OPERATIONS}
+        self.statuses = {operation: {} for operation in OPERATIONS}
+        self.errors = {operation: 0 for operation in OPERATIONS}
+        self.token = None
+
+    def request(self, method: str, path: str, form: dict = None) -> tuple[int, dict]:
+        headers = {'Authorization': f'Bearer {self.token}'} if self.token else {}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        payload = response.read()
+        return response.status, json.loads(payload) if payload else {}
+
+    def login(self) -> tuple[int, dict]:
+        self.token = None
+        status, body = self.request('POST', '/user/login', {'username': self.user['username'], 'password': BENCHMARK_PASSWORD})
+        self.token = body.get('user', {}).get('access')
+        return status, body
+
+    def call(self, operation: str) -> tuple[int, dict]:
+        account = self.rng.choice(self.user['accounts'])
+        match operation:
+            case 'login':
+                return self.login()
+            case 'deposit':
+                return self.request('PUT', f'{self.prefix}/transaction/deposit', {'id': account, 'amount': round(self.rng.uniform(1, 100), 2)})
+            case 'withdraw':
+                return self.request('PUT', f'{self.prefix}/transaction/withdraw', {'id': account, 'amount': round(self.rng.uniform(1, 100), 2)})
+            case 'transfer':
+                receiver = self.rng.choice([user for user in self.users if user is not self.user] or self.users)
+                return self.request('PUT', f'{self.prefix}/transaction/transfer', {'id': account, 'receiver_username': receiver['username'], 'receiver_id': self.rng.choice(receiver['accounts']), 'amount': round(self.rng.uniform(1, 100), 2)})
+            case 'balance':
+                return self.request('POST', f'{self.prefix}/account/balance', {'id': account})
+            case 'history':
+                return self.request('POST', f'{self.prefix}/account/view-transaction-history', {'id': account})
+
+    def run(self):
+        self.login()
+        operations, weights = list(OPERATIONS), list(OPERATIONS.values())
+
+        while (now := time.perf_counter()) < self.deadline:
+            operation = self.rng.choices(operations, weights)[0]
+            try:
+                status, _ = self.call(operation)
+            except Exception:
+                self.connection.close()
+                status = None
+            elapsed = time.perf_counter() - now
+
+            if now < self.start_at:
+                continue
+            if status is None or status >= 500:
+                self.errors[operation] += 1
+            else:
+                self.samples[operation].append(elapsed)
+                self.statuses[operation][str(status)] = self.statuses[operation].get(str(status), 0) + 1
+
+class QuietRequestHandler(WSGIRequestHandler):
+    '''
+    Request handler without the access log, which would otherwise be written and measured for every request
+    '''
+    def log_request(self, *args, **kwargs):
+        pass
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return None
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+def summarize(latencies: list[float], errors: int, duration: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': len(latencies) / duration,
+        'p50 ms': percentile(latencies, 0.50) and percentile(latencies, 0.50) * 1000,
+        'p95 ms': percentile(latencies, 0.95) and percentile(latencies, 0.95) * 1000,
+        'p99 ms': percentile(latencies, 0.99) and percentile(latencies, 0.99) * 1000,
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+@click.group()
+def cli():
+    '''
+    API throughput and latency benchmarks.
+    '''
+
+@cli.command()
+@click.option('--database-uri', default='sqlite:///benchmark.db', show_default=True, help='Database to run against, it is dropped and recreated when seeding.')
+@click.option('--env', default='production', show_default=True, help='Configuration the application is created with.')
+@click.option('--seed/--no-seed', 'seed_database', default=True, show_default=True, help='Recreate and fill the database, --no-seed reuses the benchmark users already there.')
+@click.option('--users', default=100, show_default=True, help='Number of seeded users.')
+@click.option('--accounts-per-user', default=2, show_default=True, help='Number of seeded accounts per user.')
+@click.option('--transactions', default=100000, show_default=True, help='Number of seeded transactions.')
+@click.option('--balance', default=1e9, show_default=True, help='Starting balance of every seeded account.')
+@click.option('--clients', default=16, show_default=True, help='Number of concurrent clients.')
+@click.option('--duration', default=30.0, show_default=True, help='Seconds during which latencies are recorded.')
+@click.option('--warmup', default=5.0, show_default=True, help='Seconds of load before latencies are recorded.')
+@click.option('--path', type=click.Choice(['sync', 'async']), default='sync', show_default=True, help='Serve the requests with the sync views or the /async endpoints.')
+@click.option('--random-seed', default=0, show_default=True, help='Seed of the dataset and request mix.')
+@click.option('--output', type=click.Path(dir_okay=False), help='Result file, defaults to benchmarks/results/<commit>-<dialect>.json.')
+def run(database_uri, env, seed_database, users, accounts_per_user, transactions, balance, clients, duration, warmup, path, random_seed, output):
+    '''
+    Seed the database, serve the application and load it with concurrent clients.
+    '''
+    configure_environment(database_uri, env, path)
+    from app import create_app
+    from extensions import db
+
+    rng = random.Random(random_seed)
+    app = create_app()
+    with app.app_context():
+        if seed_database:
+            start = time.perf_counter()
+            seed(db, users, accounts_per_user, transactions, balance, rng)
+            click.echo(f'Seeded {users} users, {users * accounts_per_user} accounts and {transactions} transactions in {time.perf_counter() - start:.1f}s')
+        benchmark_users = load_users(db)
+        dialect = db.engine.dialect.name
+        db.session.remove()
+
+    if not benchmark_users:
+        raise click.ClickException('No benchmark users found, run with --seed')
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    start_at = time.perf_counter() + warmup
+    deadline = start_at + duration
+    workers = [Client(server.server_port, rng.choice(benchmark_users), benchmark_users, start_at, deadline, rng.random(), '/async' if path == 'async' else '') for _ in range(clients)]
+    click.echo(f'Running {clients} clients for {warmup:.0f}s of warmup and {duration:.0f}s against {dialect} on the {path} path')
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    server.shutdown()
+
+    operations = {}
+    for operation in OPERATIONS:
+        operations[operation] = summarize([sample for worker in workers for sample in worker.samples[operation]], sum(worker.errors[operation] for worker in workers), duration)
+        statuses = {}
+        for worker in workers:
+            for status, count in worker.statuses[operation].items():
+                statuses[status] = statuses.get(status, 0) + count
+        operations[operation]['statuses'] = statuses
+
+    result = {
+        'commit': git_commit(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'database': dialect,
+        'path': path,
+        'parameters': {'env': env, 'users': users, 'accounts per user': accounts_per_user, 'transactions': transactions, 'clients': clients, 'duration': duration, 'warmup': warmup, 'random seed': random_seed, 'seeded': seed_database},
+        'total': summarize([sample for worker in workers for operation in OPERATIONS for sample in worker.samples[operation]], sum(sum(worker.errors.values()) for worker in workers), duration),
+        'operations': operations,
+    }
+
+    click.echo(f"{'operation':<10} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, summary in [*operations.items(), ('total', result['total'])]:
+        click.echo(f"{name:<10} {summary['requests']:>9} {summary['errors']:>7} {summary['throughput']:>9.1f} {format_ms(summary['p50 ms'])} {format_ms(summary['p95 ms'])} {format_ms(summary['p99 ms'])}")
+
+    if not output:
+        os.makedirs(RESULTS_DIRECTORY, exist_ok=True)
+        output = os.path.join(RESULTS_DIRECTORY, f"{result['commit']}-{dialect}{'-async' if path == 'async' else ''}.json")
+    with open(output, 'w') as file:
+        json.dump(result, file, indent=2)
+    click.echo(f'Results written to {output}')
+
+def format_ms(value: float) -> str:
+    return f'{value:>8.1f}' if value is not None else f"{'-':>8}"
+
+@cli.command()
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.argument('candidate', type=click.Path(exists=True, dir_okay=False))
+@click.option('--threshold', default=0.10, show_default=True, help='Relative throughput drop or p95 increase reported as a regression.')
+def compare(baseline, candidate, threshold):
+    '''
+    Compare two result files and fail when the candidate regressed.
+    '''
+    with open(baseline) as file:
+        before = json.load(file)
+    with open(candidate) as file:
+        after = json.load(file)
+
+    if before['parameters'] != after['parameters'] or before['database'] != after['database']:
+        click.echo('Warning: the runs used different parameters or databases')
+
+    regressions = []
+    click.echo(f"{before['commit']} ({before.get('path', 'sync')}) -> {after['commit']} ({after.get('path', 'sync')})")
+    click.echo(f"{'operation':<10} {'req/s':>19} {'p95 ms':>19}")
+    for name in [*OPERATIONS, 'total']:
+        old = before['total'] if name == 'total' else before['operations'].get(name)
+        new = after['total'] if name == 'total' else after['operations'].get(name)
+        if not old or not new or not old['requests'] or not new['requests']:
+            continue
+
+        throughput = new['throughput'] / old['throughput'] - 1
+        latency = new['p95 ms'] / old['p95 ms'] - 1
+        click.echo(f"{name:<10} {old['throughput']:>8.1f} {new['throughput']:>8.1f} {throughput:+.0%} {old['p95 ms']:>7.1f} {new['p95 ms']:>7.1f} {latency:+.0%}")
+
+        if throughput < -threshold or latency > threshold:
+            regressions.append(name)
+
+    if regressions:
+        raise click.ClickException(f"Regressed beyond {threshold:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,74 @@
+'''
+Report of the time spent importing a module and everything it pulls in, taken from python -X importtime
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module app --top 30 --output import_time.json
+
+Dependencies that only some commands or routes need should be imported where they are used, the report shows which packages dominate
+'''
+import json
+import subprocess
+import sys
+
+import click
+
+
+# Packages reported on their own, the rest are grouped under their top level package
+WATCHED_PACKAGES = ['flasgger', 'marshmallow', 'numpy', 'alembic', 'flask_migrate', 'flask_jwt_extended', 'flask_sqlalchemy', 'sqlalchemy', 'src.models', 'src.services', 'src.api', 'src.commands', 'src.utils']
+
+
+def measure(module: str) -> list[dict]:
+    '''
+    Function to import the module in a fresh interpreter and parse the import time lines, times are in microseconds
+    '''
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], capture_output=True, text=True)
+    if process.returncode != 0:
+        raise click.ClickException(process.stderr.strip().splitlines()[-1])
+
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        imports.append({'module': name.strip(), 'depth': (len(name) - len(name.lstrip()) - 1) // 2, 'self': int(own), 'cumulative': int(cumulative)})
+    return imports
+
+def package_of(module: str) -> str:
+    for package in WATCHED_PACKAGES:
+        if module == package or module.startswith(package + '.'):
+            return package
+    return module.split('.')[0]
+
+
+@click.command()
+@click.option('--module', default='app', show_default=True, help='Module to import.')
+@click.option('--top', default=20, show_default=True, help='Number of slowest modules and packages listed.')
+@click.option('--output', type=click.Path(dir_okay=False), help='File to write the full report to as JSON.')
+def report(module: str, top: int, output: str):
+    '''
+    Import a module in a fresh interpreter and report where the import time goes.
+    '''
+    imports = measure(module)
+    total = max(entry['cumulative'] for entry in imports if entry['module'] == module)
+
+    packages = {}
+    for entry in imports:
+        package = package_of(entry['module'])
+        packages[package] = packages.get(package, 0) + entry['self']
+
+    click.echo(f'Importing {module} took {total / 1000:.1f} ms\n')
+    click.echo(f"{'package':<30} {'ms':>8} {'share':>6}")
+    for package, time in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        click.echo(f'{package:<30} {time / 1000:>8.1f} {time / total:>6.1%}')
+
+    click.echo(f"\n{'module (cumulative)':<50} {'ms':>8}")
+    for entry in sorted(imports, key=lambda entry: entry['cumulative'], reverse=True)[:top]:
+        click.echo(f"{entry['module']:<50} {entry['cumulative'] / 1000:>8.1f}")
+
+    if output:
+        with open(output, 'w') as file:
+            json.dump({'module': module, 'total us': total, 'packages us': packages, 'imports': imports}, file, indent=2)
+
+
+if __name__ == '__main__':
+    report()
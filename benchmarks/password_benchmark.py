@@ -0,0 +1,149 @@
+'''
+Login throughput and latency at different password hashing costs, run against a local SQLite or PostgreSQL database
+
+    python -m benchmarks.password_benchmark --cost 16384 --cost 32768 --cost 65536
+    python -m benchmarks.password_benchmark --scheme pbkdf2_sha256 --cost 300000 --cost 600000 --workers 4
+
+For every cost the benchmark users are reseeded with hashes of that cost, the application is served over WSGI in this process and
+the clients only log in, so the numbers are the login capacity of a single worker and its hashing pool
+'''
+import json
+import os
+import random
+import threading
+import time
+from http.client import HTTPConnection
+from urllib.parse import urlencode
+
+import click
+from werkzeug.serving import make_server
+
+from benchmarks.api_benchmark import BENCHMARK_PASSWORD, QuietRequestHandler, configure_environment, summarize, format_ms
+
+
+COST_SETTINGS = {'scrypt': 'PASSWORD_SCRYPT_N', 'pbkdf2_sha256': 'PASSWORD_PBKDF2_ITERATIONS'}
+
+
+def seed_users(db, users: int) -> None:
+    '''
+    Function to recreate the tables with benchmark users sharing one password hashed with the configured parameters
+    '''
+    from datetime import datetime
+    from sqlalchemy import insert
+    from src.models.user_model import User
+    from src.services.user_service import UserService
+
+    db.drop_all()
+    db.create_all()
+
+    salt, password = UserService(db.session).salt_and_hash(BENCHMARK_PASSWORD)
+    db.session.execute(insert(User), [
+        {'id': user, 'username': f'bench{user}', 'email': f'bench{user}@benchmark.test', 'password': password, 'salt': salt, 'first_name': 'bench', 'last_name': 'bench', 'date': datetime.now()}
+        for user in range(1, users + 1)
+    ])
+    db.session.commit()
+
+class LoginClient(threading.Thread):
+    def __init__(self, port: int, users: int, start_at: float, deadline: float, seed: int):
+        super().__init__(daemon=True)
+        self.connection = HTTPConnection('127.0.0.1', port, timeout=60)
+        self.users = users
+        self.start_at = start_at
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.samples = []
+        self.errors = 0
+
+    def run(self):
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        while (now := time.perf_counter()) < self.deadline:
+            body = urlencode({'username': f'bench{self.rng.randint(1, self.users)}', 'password': BENCHMARK_PASSWORD})
+            try:
+                self.connection.request('POST', '/user/login', body=body, headers=headers)
+                response = self.connection.getresponse()
+                response.read()
+                status = response.status
+            except Exception:
+                self.connection.close()
+                status = None
+            elapsed = time.perf_counter() - now
+
+            if now < self.start_at:
+                continue
+            if status != 200:
+                self.errors += 1
+            else:
+                self.samples.append(elapsed)
+
+def measure(scheme: str, cost: int, users: int, clients: int, duration: float, warmup: float) -> dict:
+    '''
+    Function to seed the users with the given cost, serve the application and load its login endpoint, returns the summary of the run
+    '''
+    os.environ['PASSWORD_HASH_SCHEME'] = scheme
+    os.environ[COST_SETTINGS[scheme]] = str(cost)
+    from app import create_app
+    from extensions import db
+    from src.utils.passwords import get_password_hasher
+
+    app = create_app()
+    with app.app_context():
+        seed_users(db, users)
+        hasher = get_password_hasher()
+        # The first hash also starts the pool, the second one measures the derivation alone
+        hasher.hash(BENCHMARK_PASSWORD)
+        start = time.perf_counter()
+        hasher.hash(BENCHMARK_PASSWORD)
+        hash_time = time.perf_counter() - start
+        db.session.remove()
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    start_at = time.perf_counter() + warmup
+    deadline = start_at + duration
+    workers = [LoginClient(server.server_port, users, start_at, deadline, seed) for seed in range(clients)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    server.shutdown()
+    hasher.shutdown()
+
+    summary = summarize([sample for worker in workers for sample in worker.samples], sum(worker.errors for worker in workers), duration)
+    return {'scheme': scheme, 'cost': cost, 'hash ms': hash_time * 1000, **summary}
+
+
+@click.command()
+@click.option('--database-uri', default='sqlite:///benchmark.db', show_default=True, help='Database to run against, it is dropped and recreated for every cost.')
+@click.option('--env', default='production', show_default=True, help='Configuration the application is created with.')
+@click.option('--scheme', type=click.Choice(list(COST_SETTINGS)), default='scrypt', show_default=True, help='Key derivation to measure.')
+@click.option('--cost', 'costs', type=int, multiple=True, default=[16384, 32768, 65536], show_default=True, help='scrypt N or PBKDF2 iterations, repeat to compare several.')
+@click.option('--workers', type=int, help='Processes in the hashing pool, defaults to PASSWORD_HASH_WORKERS.')
+@click.option('--users', default=100, show_default=True, help='Number of seeded users.')
+@click.option('--clients', default=16, show_default=True, help='Number of concurrent clients.')
+@click.option('--duration', default=15.0, show_default=True, help='Seconds during which latencies are recorded, for every cost.')
+@click.option('--warmup', default=3.0, show_default=True, help='Seconds of load before latencies are recorded.')
+@click.option('--output', type=click.Path(dir_okay=False), help='File the results are written to as JSON.')
+def cli(database_uri, env, scheme, costs, workers, users, clients, duration, warmup, output):
+    '''
+    Measure login throughput and latency at different password hashing costs.
+    '''
+    configure_environment(database_uri, env, 'sync')
+    if workers is not None:
+        os.environ['PASSWORD_HASH_WORKERS'] = str(workers)
+
+    results = []
+    click.echo(f"{'scheme':<14} {'cost':>8} {'hash ms':>8} {'logins':>7} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for cost in costs:
+        result = measure(scheme, cost, users, clients, duration, warmup)
+        results.append(result)
+        click.echo(f"{scheme:<14} {cost:>8} {result['hash ms']:>8.1f} {result['requests']:>7} {result['errors']:>7} {result['throughput']:>9.1f} {format_ms(result['p50 ms'])} {format_ms(result['p95 ms'])} {format_ms(result['p99 ms'])}")
+
+    if output:
+        with open(output, 'w') as file:
+            json.dump({'parameters': {'env': env, 'workers': workers, 'users': users, 'clients': clients, 'duration': duration, 'warmup': warmup}, 'results': results}, file, indent=2)
+        click.echo(f'Results written to {output}')
+
+
+if __name__ == '__main__':
+    cli()
@@ -3,6 +3,12 @@ from datetime import timedelta
 from dotenv import load_dotenv
 
 
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
 class Config:
     def __init__(self):
         load_dotenv()
@@ -17,23 +23,111 @@ class Config:
         self.JWT_REFRESH_TOKEN_EXPIRES = timedelta(seconds=int(os.getenv('JWT_REFRESH_TOKEN_EXPIRES', 5)))
         self.JWT_BLOCKLIST_ENABLED = os.getenv('JWT_BLOCKLIST_ENABLED', 'True').lower() in ['true', '1', 't']
         self.JWT_BLOCKLIST_TOKEN_CHECKS = [x for x in os.getenv('JWT_BLOCKLIST_TOKEN_CHECKS', 'access,refresh').split(',')]
+        self.JWT_BLOCKLIST_REFRESH_INTERVAL = float(os.getenv('JWT_BLOCKLIST_REFRESH_INTERVAL', 1))
+        self.DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+        self.DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+        self.DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+        self.DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+        self.DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() in ['true', '1', 't']
+        self.DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', 0))
+        self.SQLALCHEMY_REPLICA_URIS = [uri.strip() for uri in os.getenv('SQLALCHEMY_REPLICA_URIS', '').split(',') if uri.strip()]
+        self.DB_REPLICA_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', 5))
+        self.DB_READ_YOUR_WRITES_WINDOW = float(os.getenv('DB_READ_YOUR_WRITES_WINDOW', 5))
+        self.LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+        self.LOG_JSON = os.getenv('LOG_JSON', 'False').lower() in ['true', '1', 't']
+        self.LOG_FILE = os.getenv('LOG_FILE', 'app.log')
+        self.LOG_FILE_MAX_BYTES = int(os.getenv('LOG_FILE_MAX_BYTES', 10 * 1024 * 1024))
+        self.LOG_FILE_BACKUP_COUNT = int(os.getenv('LOG_FILE_BACKUP_COUNT', 5))
+        self.LOG_INFO_SAMPLE_RATE = float(os.getenv('LOG_INFO_SAMPLE_RATE', 1))
+        self.METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() in ['true', '1', 't']
+        self.METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+        self.SWAGGER_ENABLED = os.getenv('SWAGGER_ENABLED', 'True').lower() in ['true', '1', 't']
+        self.SWAGGER_SPEC_FILE = os.getenv('SWAGGER_SPEC_FILE', '')
+        self.SCHEMA_CHECK = os.getenv('SCHEMA_CHECK', 'warn').lower()
+        self.IDEMPOTENCY_KEY_TTL = timedelta(seconds=int(os.getenv('IDEMPOTENCY_KEY_TTL', 86400)))
+        self.IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv('IDEMPOTENCY_WAIT_TIMEOUT', 10))
+        self.IDEMPOTENCY_PROCESSING_TIMEOUT = timedelta(seconds=int(os.getenv('IDEMPOTENCY_PROCESSING_TIMEOUT', 120)))
+        self.PASSWORD_HASH_SCHEME = os.getenv('PASSWORD_HASH_SCHEME', 'scrypt').lower()
+        self.PASSWORD_SCRYPT_N = int(os.getenv('PASSWORD_SCRYPT_N', 2 ** 15))
+        self.PASSWORD_SCRYPT_R = int(os.getenv('PASSWORD_SCRYPT_R', 8))
+        self.PASSWORD_SCRYPT_P = int(os.getenv('PASSWORD_SCRYPT_P', 1))
+        self.PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', 600000))
+        self.PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+        self.RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() in ['true', '1', 't']
+        self.RATE_LIMIT_DEFAULT = os.getenv('RATE_LIMIT_DEFAULT', '300/minute')
+        self.RATE_LIMITS = os.getenv('RATE_LIMITS', '/user/login 20/minute, /user/register 10/minute, /user/refresh 30/minute, /account/view-all-transaction-history 30/minute, /account/export-all-transaction-history 5/minute, /metrics unlimited, /metrics/pool unlimited')
+        self.RATE_LIMIT_STORAGE_URI = os.getenv('RATE_LIMIT_STORAGE_URI', '')
+        self.RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', 100000))
+        self.TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', 0))
+        self.ASYNC_ENABLED = os.getenv('ASYNC_ENABLED', 'False').lower() in ['true', '1', 't']
+        self.ASYNC_DATABASE_URI = os.getenv('SQLALCHEMY_ASYNC_DATABASE_URI', '')
+
+    @property
+    def SQLALCHEMY_ENGINE_OPTIONS(self) -> dict:
+        if self.SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+            return {}
+
+        options = {
+            'pool_size': self.DB_POOL_SIZE,
+            'max_overflow': self.DB_MAX_OVERFLOW,
+            'pool_timeout': self.DB_POOL_TIMEOUT,
+            'pool_recycle': self.DB_POOL_RECYCLE,
+            'pool_pre_ping': self.DB_POOL_PRE_PING,
+        }
+        if self.DB_STATEMENT_TIMEOUT and self.SQLALCHEMY_DATABASE_URI.startswith('postgresql'):
+            options['connect_args'] = {'options': f'-c statement_timeout={self.DB_STATEMENT_TIMEOUT}'}
+        return options
+
+    @property
+    def SQLALCHEMY_ASYNC_DATABASE_URI(self) -> str:
+        '''
+        URI of the async engine, defaults to the database URI with the async driver of its dialect
+        '''
+        if self.ASYNC_DATABASE_URI:
+            return self.ASYNC_DATABASE_URI
+
+        scheme, separator, rest = self.SQLALCHEMY_DATABASE_URI.partition('://')
+        return ASYNC_DRIVERS.get(scheme.split('+')[0], scheme) + separator + rest
+
+    @property
+    def SQLALCHEMY_ASYNC_ENGINE_OPTIONS(self) -> dict:
+        options = {key: value for key, value in self.SQLALCHEMY_ENGINE_OPTIONS.items() if key != 'connect_args'}
+        if self.DB_STATEMENT_TIMEOUT and self.SQLALCHEMY_ASYNC_DATABASE_URI.startswith('postgresql+asyncpg'):
+            options['connect_args'] = {'server_settings': {'statement_timeout': str(self.DB_STATEMENT_TIMEOUT)}}
+        return options
 
 class DevelopmentConfig(Config):
     def __init__(self):
         super().__init__()
         self.FLASK_DEBUG = True
+        self.LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG').upper()
 
 class ProductionConfig(Config):
     def __init__(self):
         super().__init__()
         self.FLASK_DEBUG = False
+        self.DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+        self.DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+        self.DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+        self.DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', 30000))
+        self.LOG_JSON = os.getenv('LOG_JSON', 'True').lower() in ['true', '1', 't']
+        self.SCHEMA_CHECK = os.getenv('SCHEMA_CHECK', 'strict').lower()
+        self.METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False').lower() in ['true', '1', 't']
 
 class TestingConfig(Config):
     def __init__(self):
         super().__init__()
         self.FLASK_DEBUG = True
         self.TESTING = True
+        self.LOG_LEVEL = os.getenv('LOG_LEVEL', 'WARNING').upper()
+        self.SCHEMA_CHECK = os.getenv('SCHEMA_CHECK', 'off').lower()
         self.SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI_TEST', 'fallback-test-uri')
+        self.SQLALCHEMY_REPLICA_URIS = []
+        # Hashes stay verifiable whatever their cost, tests use a cheap one computed in process
+        self.PASSWORD_SCRYPT_N = int(os.getenv('PASSWORD_SCRYPT_N', 16))
+        self.PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', 1000))
+        self.PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 0))
+        self.RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'False').lower() in ['true', '1', 't']
 
 config = {
     'development': DevelopmentConfig,
@@ -1,13 +1,118 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
+import random
+import uuid
+from flask import g, has_request_context, request
 
 
-logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler('app.log')
-        ]
-    )
-
 logger = logging.getLogger('P2P_APP')
+listener = None
+queue_handler = None
+
+
+class RequestIdFilter(logging.Filter):
+    '''
+    Attaches the id of the current request to each record, it runs in the request thread before the record is queued
+    '''
+    def filter(self, record):
+        record.request_id = g.get('request_id') if has_request_context() else None
+        return True
+
+class SamplingFilter(logging.Filter):
+    '''
+    Keeps only a fraction of the INFO and lower records, warnings and errors are always kept
+    '''
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.INFO or self.rate >= 1 or random.random() < self.rate
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', None),
+            'message': record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        if record.stack_info:
+            entry['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(entry)
+
+class TracebackQueueHandler(logging.handlers.QueueHandler):
+    '''
+    Queues records with their message merged and their traceback formatted apart from it, the base handler formats the whole record into the message which left the JSON lines without traceback fields
+    '''
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def stop_logging() -> None:
+    global listener, queue_handler
+
+    if listener:
+        listener.stop()
+        logging.getLogger().removeHandler(queue_handler)
+        listener = None
+        queue_handler = None
+
+def init_logging(app) -> None:
+    '''
+    Function to route all logging through a queue so that request threads never wait on I/O, a background listener thread writes the records to the console and a rotating file
+    '''
+    global listener, queue_handler
+
+    stop_logging()
+
+    if app.config['LOG_JSON']:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(request_id)s - %(message)s')
+
+    handlers = [logging.StreamHandler()]
+    if app.config['LOG_FILE']:
+        handlers.append(logging.handlers.RotatingFileHandler(app.config['LOG_FILE'], maxBytes=app.config['LOG_FILE_MAX_BYTES'], backupCount=app.config['LOG_FILE_BACKUP_COUNT'], delay=True))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = TracebackQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(SamplingFilter(app.config['LOG_INFO_SAMPLE_RATE']))
+
+    root = logging.getLogger()
+    root.setLevel(app.config['LOG_LEVEL'])
+    root.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get('X-Request-ID', '')[:128] or uuid.uuid4().hex
+
+    @app.after_request
+    def return_request_id(response):
+        if 'request_id' in g:
+            response.headers['X-Request-ID'] = g.request_id
+        return response
+
+
+atexit.register(stop_logging)
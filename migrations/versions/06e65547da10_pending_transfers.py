@@ -0,0 +1,45 @@
+"""pending transfers
+
+Revision ID: 06e65547da10
+Revises: d408232e40a2
+Create Date: 2026-10-18 07:12:04.551203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '06e65547da10'
+down_revision = 'd408232e40a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('pending_transfers',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('username', sa.String(length=100), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('sender_id', sa.Integer(), nullable=False),
+    sa.Column('receiver_username', sa.String(length=100), nullable=False),
+    sa.Column('receiver_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('result_status', sa.Integer(), nullable=True),
+    sa.Column('result', sa.String(length=255), nullable=True),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('claimed_at', sa.DateTime(), nullable=True),
+    sa.Column('settled_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('id')
+    )
+    with op.batch_alter_table('pending_transfers', schema=None) as batch_op:
+        batch_op.create_index('ix_pending_transfers_status_id', ['status', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('pending_transfers', schema=None) as batch_op:
+        batch_op.drop_index('ix_pending_transfers_status_id')
+
+    op.drop_table('pending_transfers')
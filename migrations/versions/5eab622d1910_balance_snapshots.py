@@ -0,0 +1,31 @@
+"""balance snapshots
+
+Revision ID: 5eab622d1910
+Revises: d1447f05f75f
+Create Date: 2026-10-18 06:45:12.318406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5eab622d1910'
+down_revision = 'd1447f05f75f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled as transactions are written, run flask ledger backfill-snapshots once to cover the existing history
+    op.create_table('balance_snapshots',
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('balance', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ),
+    sa.PrimaryKeyConstraint('account_id', 'day')
+    )
+
+
+def downgrade():
+    op.drop_table('balance_snapshots')
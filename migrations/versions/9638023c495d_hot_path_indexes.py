@@ -0,0 +1,33 @@
+"""hot path indexes
+
+Revision ID: 9638023c495d
+Revises: 08ccf98528cd
+Create Date: 2026-10-18 06:22:29.560989
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9638023c495d'
+down_revision = '08ccf98528cd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Built concurrently on PostgreSQL so that live tables are not locked against writes, which needs to run outside of a transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_accounts_user_id_active', 'accounts', ['user_id'], unique=False, postgresql_where=sa.text('active'), sqlite_where=sa.text('active = 1'), postgresql_concurrently=True)
+        op.create_index('ix_accounts_user_id_id', 'accounts', ['user_id', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_transactions_receiver_id_date_id', 'transactions', ['receiver_id', 'date', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_transactions_sender_id_date_id', 'transactions', ['sender_id', 'date', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_transactions_sender_id_date_id', table_name='transactions', postgresql_concurrently=True)
+        op.drop_index('ix_transactions_receiver_id_date_id', table_name='transactions', postgresql_concurrently=True)
+        op.drop_index('ix_accounts_user_id_id', table_name='accounts', postgresql_concurrently=True)
+        op.drop_index('ix_accounts_user_id_active', table_name='accounts', postgresql_concurrently=True)
@@ -0,0 +1,36 @@
+"""account shards
+
+Revision ID: b7e2c41f9a83
+Revises: 06e65547da10
+Create Date: 2026-10-18 09:41:27.318604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2c41f9a83'
+down_revision = '06e65547da10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('accounts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('shards', sa.Integer(), nullable=False, server_default='0'))
+
+    op.create_table('account_shards',
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('balance', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ),
+    sa.PrimaryKeyConstraint('account_id', 'shard')
+    )
+
+
+def downgrade():
+    op.drop_table('account_shards')
+
+    with op.batch_alter_table('accounts', schema=None) as batch_op:
+        batch_op.drop_column('shards')
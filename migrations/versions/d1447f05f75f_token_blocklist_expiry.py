@@ -0,0 +1,38 @@
+"""token blocklist expiry
+
+Revision ID: d1447f05f75f
+Revises: 4659fb10e3ff
+Create Date: 2026-10-18 06:28:48.854846
+
+"""
+from datetime import datetime
+from alembic import op
+from flask import current_app
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1447f05f75f'
+down_revision = '4659fb10e3ff'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('token blocklist', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('expires_at', sa.DateTime(), nullable=True))
+
+    # The expiry of tokens revoked before this revision is unknown, they are kept for one more full token lifetime
+    lifetime = max(current_app.config['JWT_ACCESS_TOKEN_EXPIRES'], current_app.config['JWT_REFRESH_TOKEN_EXPIRES'])
+    blocklist = sa.table('token blocklist', sa.column('expires_at', sa.DateTime()))
+    op.execute(blocklist.update().values(expires_at=datetime.now() + lifetime))
+
+    with op.batch_alter_table('token blocklist', schema=None) as batch_op:
+        batch_op.alter_column('expires_at', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_index(batch_op.f('ix_token blocklist_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('token blocklist', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_token blocklist_expires_at'))
+        batch_op.drop_column('expires_at')
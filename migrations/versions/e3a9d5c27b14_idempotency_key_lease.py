@@ -0,0 +1,33 @@
+"""idempotency key lease
+
+Revision ID: e3a9d5c27b14
+Revises: b7e2c41f9a83
+Create Date: 2026-10-18 11:02:45.871203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a9d5c27b14'
+down_revision = 'b7e2c41f9a83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('claimed_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('applied_at', sa.DateTime(), nullable=True))
+
+    op.execute('UPDATE idempotency_keys SET claimed_at = date')
+
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.alter_column('claimed_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.drop_column('applied_at')
+        batch_op.drop_column('claimed_at')
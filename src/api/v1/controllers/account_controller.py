@@ -1,9 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from marshmallow import ValidationError
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 
-from src.api.v1.schemas.account_schema import CreateAccountSchema, AccountSchema
+from src.api.v1.schemas.account_schema import CreateAccountSchema, AccountSchema, BalanceAtSchema, TransactionHistorySchema, ExportTransactionHistorySchema
 from src.services.account_service import AccountService
+from src.utils.constants import export_mimetypes
+from src.utils.replicas import read_replica
 from extensions import db
 
 
@@ -47,13 +49,15 @@ def create():
         return jsonify(e.messages), 401
     
     username = get_jwt_identity()
+    user_id = get_jwt().get('user_id')
     account_service = AccountService(db_session=db.session)
-    result, status = account_service.create(data, username)
+    result, status = account_service.create(data, username, user_id)
 
     return jsonify(result), status
 
 @account_bp.post('/balance')
 @jwt_required()
+@read_replica
 def balance():
     """
     ---
@@ -89,13 +93,65 @@ def balance():
         return jsonify(e.messages), 401
     
     username = get_jwt_identity()
+    user_id = get_jwt().get('user_id')
     account_service = AccountService(db_session=db.session)
-    result, status = account_service.balance(data, username)
+    result, status = account_service.balance(data, username, user_id)
+
+    return jsonify(result), status
+
+@account_bp.post('/balance-at')
+@jwt_required()
+@read_replica
+def balance_at():
+    """
+    ---
+    tags:
+      - Account
+    summary: Retrieve account balance at a point in time
+    description: Retrieves the balance a specific account had at the given date and time, computed from the last daily balance snapshot before that day and the transactions since.
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Respond with **'Bearer &lt;JWT&gt;'**, where JWT is the access token.
+      - name: id
+        in: formData
+        type: integer
+        required: true
+        description: The ID of the account to retrieve the balance for.
+      - name: at
+        in: formData
+        type: string
+        format: date-time
+        required: true
+        description: The date and time to retrieve the balance at, for example 2024-01-31T23:59:59.
+    security:
+      - BearerAuth: []
+    responses:
+      200:
+        description: Successful retrieval of account balance.
+      401:
+        description: Input data validation error or unauthorized token.
+      404:
+        description: User or Account not found error.
+    """
+    schema = BalanceAtSchema()
+    try:
+        data = schema.load(request.form)
+    except ValidationError as e:
+        return jsonify(e.messages), 401
+    
+    username = get_jwt_identity()
+    user_id = get_jwt().get('user_id')
+    account_service = AccountService(db_session=db.session)
+    result, status = account_service.balance_at(data, username, user_id)
 
     return jsonify(result), status
 
 @account_bp.post('/view-transaction-history')
 @jwt_required()
+@read_replica
 def transaction_history():
     """
     ---
@@ -114,30 +170,42 @@ def transaction_history():
         type: integer
         required: true
         description: The ID of the account to retrieve the transaction history for.
+      - name: limit
+        in: formData
+        type: integer
+        required: false
+        description: The maximum number of transactions to return (default 50, at most 500).
+      - name: cursor
+        in: formData
+        type: string
+        required: false
+        description: The 'next cursor' value returned by the previous page, omit it to start from the most recent transaction.
     security:
       - BearerAuth: []
     responses:
       200:
-        description: Successful retrieval of transaction history for the account.
+        description: Successful retrieval of one page of the transaction history for the account, newest first, along with the cursor of the next page (null on the last page).
       401:
         description: Input data validation error or unauthorized token.
       404:
         description: User or Account not found error.
     """
-    schema = AccountSchema()
+    schema = TransactionHistorySchema()
     try:
         data = schema.load(request.form)
     except ValidationError as e:
         return jsonify(e.messages), 401
     
     username = get_jwt_identity()
+    user_id = get_jwt().get('user_id')
     account_service = AccountService(db_session=db.session)
-    result, status = account_service.transaction_history(data, username)
+    result, status = account_service.transaction_history(data, username, user_id)
 
     return jsonify(result), status
 
 @account_bp.get('/view-all-transaction-history')
 @jwt_required()
+@read_replica
 def view_accounts():
     """
     ---
@@ -160,10 +228,71 @@ def view_accounts():
         description: User not found error.
     """
     username = get_jwt_identity()
+    user_id = get_jwt().get('user_id')
     account_service = AccountService(db_session=db.session)
-    result, status = account_service.all_transaction_history(username)
+    result, status = account_service.all_transaction_history(username, user_id)
     return jsonify(result), status
 
+@account_bp.get('/export-all-transaction-history')
+@jwt_required()
+@read_replica
+def export_all_transaction_history():
+    """
+    ---
+    tags:
+      - Account
+    summary: Export all transaction history
+    description: Streams the transaction history of all accounts associated with the user as NDJSON or CSV, newest first, without building the whole history in memory.
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Respond with **'Bearer &lt;JWT&gt;'**, where JWT is the access token.
+      - name: format
+        in: query
+        type: string
+        required: false
+        description: The export format, either ndjson (default) or csv.
+      - name: start
+        in: query
+        type: string
+        format: date-time
+        required: false
+        description: Only export transactions made at or after this date.
+      - name: end
+        in: query
+        type: string
+        format: date-time
+        required: false
+        description: Only export transactions made at or before this date.
+    security:
+      - BearerAuth: []
+    responses:
+      200:
+        description: Streamed export of all transaction histories for all the user's accounts.
+      401:
+        description: Input data validation error or unauthorized token.
+      404:
+        description: User not found error.
+    """
+    schema = ExportTransactionHistorySchema()
+    try:
+        data = schema.load(request.args)
+    except ValidationError as e:
+        return jsonify(e.messages), 401
+    
+    username = get_jwt_identity()
+    user_id = get_jwt().get('user_id')
+    account_service = AccountService(db_session=db.session)
+    result, status = account_service.export_transaction_history(data, username, user_id)
+
+    if status != 200:
+        return jsonify(result), status
+
+    filename = f"transactions.{data['format']}"
+    return Response(stream_with_context(result), mimetype=export_mimetypes[data['format']], headers={'Content-Disposition': f'attachment; filename={filename}'})
+
 @account_bp.delete('/delete')
 @jwt_required()
 def delete():
@@ -203,7 +332,8 @@ def delete():
         return jsonify(e.messages), 401
     
     username = get_jwt_identity()
+    user_id = get_jwt().get('user_id')
     account_service = AccountService(db_session=db.session)
-    result, status = account_service.delete(data, username)
+    result, status = account_service.delete(data, username, user_id)
 
     return jsonify(result), status
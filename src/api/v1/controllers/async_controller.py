@@ -0,0 +1,355 @@
+from flask import Blueprint, request, jsonify
+from marshmallow import ValidationError
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+
+from src.api.v1.schemas.account_schema import AccountSchema, TransactionHistorySchema
+from src.api.v1.schemas.transaction_schema import TransferSchema, WithdrawDepositSchema
+from src.services.async_account_service import AsyncAccountService
+from src.services.async_transaction_service import AsyncTransactionService
+from src.services.async_user_service import AsyncUserService
+from src.utils.async_db import get_async_session
+from src.utils.idempotency import idempotent
+
+
+async_bp = Blueprint("async", __name__)
+
+
+@async_bp.post('/account/balance')
+@jwt_required()
+async def balance():
+    """
+    ---
+    tags:
+      - Async
+    summary: Retrieve account balance
+    description: Same as /account/balance, served on the async database connection.
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Respond with **'Bearer &lt;JWT&gt;'**, where JWT is the access token.
+      - name: id
+        in: formData
+        type: integer
+        required: true
+        description: The ID of the account to retrieve the balance for.
+    security:
+      - BearerAuth: []
+    responses:
+      200:
+        description: Successful retrieval of account balance.
+      401:
+        description: Input data validation error or unauthorized token.
+      404:
+        description: User or Account not found error.
+    """
+    schema = AccountSchema()
+    try:
+        data = schema.load(request.form)
+    except ValidationError as e:
+        return jsonify(e.messages), 401
+
+    username = get_jwt_identity()
+    user_id = get_jwt().get('user_id')
+    async with get_async_session() as session:
+        result, status = await AsyncAccountService(session).balance(data, username, user_id)
+
+    return jsonify(result), status
+
+@async_bp.post('/account/view-transaction-history')
+@jwt_required()
+async def transaction_history():
+    """
+    ---
+    tags:
+      - Async
+    summary: View account transaction history
+    description: Same as /account/view-transaction-history, served on the async database connection.
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Respond with **'Bearer &lt;JWT&gt;'**, where JWT is the access token.
+      - name: id
+        in: formData
+        type: integer
+        required: true
+        description: The ID of the account to retrieve the transaction history for.
+      - name: limit
+        in: formData
+        type: integer
+        required: false
+        description: The maximum number of transactions to return (default 50, at most 500).
+      - name: cursor
+        in: formData
+        type: string
+        required: false
+        description: The 'next cursor' value returned by the previous page, omit it to start from the most recent transaction.
+    security:
+      - BearerAuth: []
+    responses:
+      200:
+        description: Successful retrieval of one page of the transaction history for the account, newest first, along with the cursor of the next page (null on the last page).
+      401:
+        description: Input data validation error or unauthorized token.
+      404:
+        description: User or Account not found error.
+    """
+    schema = TransactionHistorySchema()
+    try:
+        data = schema.load(request.form)
+    except ValidationError as e:
+        return jsonify(e.messages), 401
+
+    username = get_jwt_identity()
+    user_id = get_jwt().get('user_id')
+    async with get_async_session() as session:
+        result, status = await AsyncAccountService(session).transaction_history(data, username, user_id)
+
+    return jsonify(result), status
+
+@async_bp.put('/transaction/transfer')
+@jwt_required()
+@idempotent
+async def transfer():
+    """
+    ---
+    tags:
+      - Async
+    summary: Transfer transaction
+    description: Same as /transaction/transfer, served on the async database connection.
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Respond with **'Bearer &lt;JWT&gt;'**, where JWT is the access token.
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Unique key of the operation, a retry with the same key returns the stored response instead of moving funds again.
+      - name: id
+        in: formData
+        type: integer
+        required: true
+        description: The account ID of the sender.
+      - name: receiver_username
+        in: formData
+        type: string
+        required: true
+        description: The username of the receiver.
+      - name: receiver_id
+        in: formData
+        type: integer
+        required: true
+        description: The account ID of the receiver.
+      - name: amount
+        in: formData
+        type: number
+        required: true
+        description: The amount to transfer.
+    security:
+      - BearerAuth: []
+    responses:
+      200:
+        description: Successful transfer from sender to receiver.
+      401:
+        description: Input data validation error or unauthorized token.
+      402:
+        description: Invalid transfer request.
+      404:
+        description: User or Account not found error.
+      409:
+        description: A request with the same idempotency key is still being processed.
+      422:
+        description: The idempotency key was already used for a different request.
+    """
+    schema = TransferSchema()
+    try:
+        data = schema.load(request.form)
+    except ValidationError as e:
+        return jsonify(e.messages), 401
+
+    username = get_jwt_identity()
+    user_id = get_jwt().get('user_id')
+    async with get_async_session() as session:
+        result, status = await AsyncTransactionService(session).transfer(data, username, user_id)
+
+    return jsonify(result), status
+
+@async_bp.put('/transaction/deposit')
+@jwt_required()
+@idempotent
+async def deposit():
+    """
+    ---
+    tags:
+      - Async
+    summary: Deposit transaction
+    description: Same as /transaction/deposit, served on the async database connection.
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Respond with **'Bearer &lt;JWT&gt;'**, where JWT is the access token.
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Unique key of the operation, a retry with the same key returns the stored response instead of moving funds again.
+      - name: id
+        in: formData
+        type: integer
+        required: true
+        description: The account ID to deposit into.
+      - name: amount
+        in: formData
+        type: number
+        required: true
+        description: The amount to deposit.
+    security:
+      - BearerAuth: []
+    responses:
+      200:
+        description: Successful deposit.
+      401:
+        description: Input data validation error or unauthorized token.
+      404:
+        description: User or Account not found error.
+      409:
+        description: A request with the same idempotency key is still being processed.
+      422:
+        description: The idempotency key was already used for a different request.
+    """
+    schema = WithdrawDepositSchema()
+    try:
+        data = schema.load(request.form)
+    except ValidationError as e:
+        return jsonify(e.messages), 401
+
+    username = get_jwt_identity()
+    user_id = get_jwt().get('user_id')
+    async with get_async_session() as session:
+        result, status = await AsyncTransactionService(session).deposit(data, username, user_id)
+
+    return jsonify(result), status
+
+@async_bp.put('/transaction/withdraw')
+@jwt_required()
+@idempotent
+async def withdraw():
+    """
+    ---
+    tags:
+      - Async
+    summary: Withdraw transaction
+    description: Same as /transaction/withdraw, served on the async database connection.
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Respond with **'Bearer &lt;JWT&gt;'**, where JWT is the access token.
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Unique key of the operation, a retry with the same key returns the stored response instead of moving funds again.
+      - name: id
+        in: formData
+        type: integer
+        required: true
+        description: The account ID to withdraw from.
+      - name: amount
+        in: formData
+        type: number
+        required: true
+        description: The amount to withdraw.
+    security:
+      - BearerAuth: []
+    responses:
+      200:
+        description: Successful withdrawal.
+      401:
+        description: Input data validation error or unauthorized token.
+      402:
+        description: Insufficient funds.
+      404:
+        description: User or Account not found error.
+      409:
+        description: A request with the same idempotency key is still being processed.
+      422:
+        description: The idempotency key was already used for a different request.
+    """
+    schema = WithdrawDepositSchema()
+    try:
+        data = schema.load(request.form)
+    except ValidationError as e:
+        return jsonify(e.messages), 401
+
+    username = get_jwt_identity()
+    user_id = get_jwt().get('user_id')
+    async with get_async_session() as session:
+        result, status = await AsyncTransactionService(session).withdraw(data, username, user_id)
+
+    return jsonify(result), status
+
+@async_bp.get('/user/view-profile')
+@jwt_required()
+async def profile():
+    """
+    ---
+    tags:
+      - Async
+    summary: View user profile
+    description: Same as /user/view-profile, served on the async database connection.
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Respond with **'Bearer &lt;JWT&gt;'**, where JWT is the access token.
+    security:
+      - BearerAuth: []
+    responses:
+      200:
+        description: Successful retrieval of user profile.
+      404:
+        description: User not found error.
+    """
+    username = get_jwt_identity()
+    async with get_async_session() as session:
+        result, status = await AsyncUserService(session).profile(username)
+    return jsonify(result), status
+
+@async_bp.get('/user/view-accounts')
+@jwt_required()
+async def view_accounts():
+    """
+    ---
+    tags:
+      - Async
+    summary: View user accounts
+    description: Same as /user/view-accounts, served on the async database connection.
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Respond with **'Bearer &lt;JWT&gt;'**, where JWT is the access token.
+    security:
+      - BearerAuth: []
+    responses:
+      200:
+        description: Successful retrieval of user accounts information.
+      404:
+        description: User not found error.
+    """
+    username = get_jwt_identity()
+    async with get_async_session() as session:
+        result, status = await AsyncUserService(session).view_accounts(username)
+    return jsonify(result), status
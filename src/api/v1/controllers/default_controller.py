@@ -1,6 +1,10 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, jsonify
 
 from logger import logger
+from src.utils.pool_metrics import pool_metrics
+from src.utils.request_metrics import get_request_metrics, protected_metrics
+from src.utils.constants import METRICS_MIMETYPE
+from extensions import db
 
 
 default_bp = Blueprint("default", __name__)
@@ -20,3 +24,55 @@ def default():
     """
     logger.info('Deafult router accessed')
     return jsonify({'message': 'Application up and running'}), 200
+
+@default_bp.get('/metrics/pool')
+@protected_metrics
+def pool():
+    """
+    ---
+    tags:
+      - Default
+    summary: Database connection pool metrics
+    description: Returns the state of the database connection pool of this worker, checked out and idle connections, overflow, and the number, time waited and timeouts of connection checkouts since start.
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: false
+        description: Respond with **'Bearer &lt;METRICS_TOKEN&gt;'** when a metrics token is configured.
+    responses:
+      200:
+        description: Connection pool metrics
+      401:
+        description: Missing or invalid metrics token.
+      404:
+        description: Metrics are disabled.
+    """
+    return jsonify({'message': 'Pool metrics retrieved successfully', 'pool': pool_metrics(db.engine)}), 200
+
+@default_bp.get('/metrics')
+@protected_metrics
+def metrics():
+    """
+    ---
+    tags:
+      - Default
+    summary: Prometheus metrics
+    description: Returns the metrics of this worker in the Prometheus text format, request counts by route and status code, latency histograms, the number of SQL statements and the database time per request, and the connection pool state.
+    produces:
+      - text/plain
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: false
+        description: Respond with **'Bearer &lt;METRICS_TOKEN&gt;'** when a metrics token is configured.
+    responses:
+      200:
+        description: Metrics in the Prometheus text format
+      401:
+        description: Missing or invalid metrics token.
+      404:
+        description: Metrics are disabled.
+    """
+    return Response(get_request_metrics().render(db.engine), mimetype=METRICS_MIMETYPE)
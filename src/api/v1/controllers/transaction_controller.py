@@ -1,9 +1,12 @@
 from flask import Blueprint, request, jsonify
 from marshmallow import ValidationError
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 
-from src.api.v1.schemas.transaction_schema import TransferSchema, WithdrawDepositSchema
+from src.api.v1.schemas.transaction_schema import TransferSchema, TransferStatusSchema, WithdrawDepositSchema, BatchTransferSchema
 from src.services.transaction_service import TransactionService
+from src.services.transfer_queue_service import TransferQueueService
+from src.utils.idempotency import idempotent
+from src.utils.replicas import read_replica
 from extensions import db
 
 
@@ -12,6 +15,7 @@ transaction_bp = Blueprint("transaction", __name__)
 
 @transaction_bp.put('/transfer')
 @jwt_required()
+@idempotent
 def transfer():
     """
     ---
@@ -25,6 +29,11 @@ def transfer():
         type: string
         required: true
         description: Respond with **'Bearer &lt;JWT&gt;'**, where JWT is the access token.
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Unique key of the operation, a retry with the same key returns the stored response instead of moving funds again.
       - name: id
         in: formData
         type: integer
@@ -56,6 +65,10 @@ def transfer():
         description: Invalid transfer request.
       404:
         description: User or Account not found error.
+      409:
+        description: A request with the same idempotency key is still being processed.
+      422:
+        description: The idempotency key was already used for a different request.
     """
     schema = TransferSchema()
     try:
@@ -64,13 +77,126 @@ def transfer():
         return jsonify(e.messages), 401
     
     username = get_jwt_identity()
+    user_id = get_jwt().get('user_id')
     transaction_service = TransactionService(db_session=db.session)
-    result, status = transaction_service.transfer(data, username)
+    result, status = transaction_service.transfer(data, username, user_id)
+
+    return jsonify(result), status
+
+@transaction_bp.put('/transfer-async')
+@jwt_required()
+@idempotent
+def transfer_async():
+    """
+    ---
+    tags:
+      - Transaction
+    summary: Queue a transfer
+    description: Accepts a transfer to another user account and settles it shortly after, the returned transfer id is used to poll its status. The accounts, receiver and funds are checked when the transfer is settled.
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Respond with **'Bearer &lt;JWT&gt;'**, where JWT is the access token.
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Unique key of the operation, a retry with the same key returns the stored response instead of queueing the transfer again.
+      - name: id
+        in: formData
+        type: integer
+        required: true
+        description: The account ID of the sender.
+      - name: receiver_username
+        in: formData
+        type: string
+        required: true
+        description: The username of the receiver.
+      - name: receiver_id
+        in: formData
+        type: integer
+        required: true
+        description: The account ID of the receiver.
+      - name: amount
+        in: formData
+        type: number
+        required: true
+        description: The amount to transfer.
+    security:
+      - BearerAuth: []
+    responses:
+      202:
+        description: Transfer accepted, returns its id.
+      401:
+        description: Input data validation error or unauthorized token.
+      402:
+        description: Invalid transfer request.
+      409:
+        description: A request with the same idempotency key is still being processed.
+      422:
+        description: The idempotency key was already used for a different request.
+    """
+    schema = TransferSchema()
+    try:
+        data = schema.load(request.form)
+    except ValidationError as e:
+        return jsonify(e.messages), 401
+    
+    username = get_jwt_identity()
+    user_id = get_jwt().get('user_id')
+    transfer_queue_service = TransferQueueService(db_session=db.session)
+    result, status = transfer_queue_service.enqueue(data, username, user_id)
+
+    return jsonify(result), status
+
+@transaction_bp.get('/transfer-status')
+@jwt_required()
+@read_replica
+def transfer_status():
+    """
+    ---
+    tags:
+      - Transaction
+    summary: Queued transfer status
+    description: Retrieves the status of a transfer accepted by transfer-async, PENDING or PROCESSING until it is settled, then SETTLED or FAILED with the reason.
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Respond with **'Bearer &lt;JWT&gt;'**, where JWT is the access token.
+      - name: id
+        in: query
+        type: integer
+        required: true
+        description: The transfer id returned by transfer-async.
+    security:
+      - BearerAuth: []
+    responses:
+      200:
+        description: Successful retrieval of the transfer status.
+      401:
+        description: Input data validation error or unauthorized token.
+      404:
+        description: Transfer not found.
+    """
+    schema = TransferStatusSchema()
+    try:
+        data = schema.load(request.args)
+    except ValidationError as e:
+        return jsonify(e.messages), 401
+    
+    username = get_jwt_identity()
+    transfer_queue_service = TransferQueueService(db_session=db.session)
+    result, status = transfer_queue_service.transfer_status(data, username)
 
     return jsonify(result), status
 
 @transaction_bp.put('/deposit')
 @jwt_required()
+@idempotent
 def deposit():
     """
     ---
@@ -84,6 +210,11 @@ def deposit():
         type: string
         required: true
         description: Respond with **'Bearer &lt;JWT&gt;'**, where JWT is the access token.
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Unique key of the operation, a retry with the same key returns the stored response instead of moving funds again.
       - name: id
         in: formData
         type: integer
@@ -103,6 +234,10 @@ def deposit():
         description: Input data validation error or unauthorized token.
       404:
           description: User or Account not found.
+      409:
+        description: A request with the same idempotency key is still being processed.
+      422:
+        description: The idempotency key was already used for a different request.
     """
     schema = WithdrawDepositSchema()
     try:
@@ -111,13 +246,15 @@ def deposit():
         return jsonify(e.messages), 401
     
     username = get_jwt_identity()
+    user_id = get_jwt().get('user_id')
     transaction_service = TransactionService(db_session=db.session)
-    result, status = transaction_service.deposit(data, username)
+    result, status = transaction_service.deposit(data, username, user_id)
 
     return jsonify(result), status
 
 @transaction_bp.put('/withdraw')
 @jwt_required()
+@idempotent
 def withdraw():
     """
     ---
@@ -131,6 +268,11 @@ def withdraw():
         type: string
         required: true
         description: Respond with **'Bearer &lt;JWT&gt;'**, where JWT is the access token.
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Unique key of the operation, a retry with the same key returns the stored response instead of moving funds again.
       - name: id
         in: formData
         type: integer
@@ -152,6 +294,10 @@ def withdraw():
           description: Insufficient funds.
       404:
           description: User or Account not found.            
+      409:
+        description: A request with the same idempotency key is still being processed.
+      422:
+        description: The idempotency key was already used for a different request.
     """
     schema = WithdrawDepositSchema()
     try:
@@ -160,7 +306,86 @@ def withdraw():
         return jsonify(e.messages), 401
     
     username = get_jwt_identity()
+    user_id = get_jwt().get('user_id')
+    transaction_service = TransactionService(db_session=db.session)
+    result, status = transaction_service.withdraw(data, username, user_id)
+
+    return jsonify(result), status
+
+@transaction_bp.put('/batch-transfer')
+@jwt_required()
+@idempotent
+def batch_transfer():
+    """
+    ---
+    tags:
+      - Transaction
+    summary: Batch transfer transaction
+    description: Transfer funds from one account to many user accounts in a single database transaction. Invalid items are reported individually and skipped, the source account is debited once with the total of the valid ones.
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Respond with **'Bearer &lt;JWT&gt;'**, where JWT is the access token.
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Unique key of the operation, a retry with the same key returns the stored response instead of moving funds again.
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required:
+            - id
+            - transfers
+          properties:
+            id:
+              type: integer
+              description: The account ID of the sender.
+            transfers:
+              type: array
+              description: The transfers to make, at most 1000.
+              items:
+                type: object
+                required:
+                  - receiver_username
+                  - receiver_id
+                  - amount
+                properties:
+                  receiver_username:
+                    type: string
+                  receiver_id:
+                    type: integer
+                  amount:
+                    type: number
+    security:
+      - BearerAuth: []
+    responses:
+      200:
+        description: Batch processed, returns the total debited and a result for each transfer.
+      401:
+        description: Input data validation error or unauthorized token.
+      402:
+        description: Insufficient funds for the valid transfers of the batch.
+      404:
+        description: User or Account not found error.
+      409:
+        description: A request with the same idempotency key is still being processed.
+      422:
+        description: The idempotency key was already used for a different request.
+    """
+    schema = BatchTransferSchema()
+    try:
+        data = schema.load(request.get_json(silent=True) or {})
+    except ValidationError as e:
+        return jsonify(e.messages), 401
+    
+    username = get_jwt_identity()
+    user_id = get_jwt().get('user_id')
     transaction_service = TransactionService(db_session=db.session)
-    result, status = transaction_service.withdraw(data, username)
+    result, status = transaction_service.batch_transfer(data, username, user_id)
 
     return jsonify(result), status
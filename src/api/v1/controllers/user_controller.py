@@ -1,9 +1,11 @@
+from datetime import datetime
 from flask import Blueprint, request, jsonify
 from marshmallow import ValidationError
 from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token, create_refresh_token, get_jwt
 
 from src.api.v1.schemas.user_schema import UserLoginSchema, UserRegisterSchema, UserUpdateSchema
 from src.services.user_service import UserService
+from src.utils.replicas import read_replica
 from extensions import db
 
 
@@ -168,6 +170,7 @@ def update():
 
 @user_bp.get('/view-profile')
 @jwt_required()
+@read_replica
 def profile():
     """
     ---
@@ -196,6 +199,7 @@ def profile():
 
 @user_bp.get('/view-accounts')
 @jwt_required()
+@read_replica
 def view_accounts():
     """
     ---
@@ -276,9 +280,10 @@ def logout():
         description: User not found error.
     """
     username = get_jwt_identity()
-    jti = get_jwt()["jti"]
+    token = get_jwt()
+    expires_at = datetime.fromtimestamp(token["exp"])
     user_service = UserService(db_session=db.session)
-    result, status = user_service.logout(username, jti)
+    result, status = user_service.logout(username, token["jti"], expires_at)
     return jsonify(result), status
 
 @user_bp.delete('/logout-refresh')
@@ -305,9 +310,10 @@ def logout_refresh():
         description: User not found error.
     """
     username = get_jwt_identity()
-    jti = get_jwt()["jti"]
+    token = get_jwt()
+    expires_at = datetime.fromtimestamp(token["exp"])
     user_service = UserService(db_session=db.session)
-    result, status = user_service.logout(username, jti)
+    result, status = user_service.logout(username, token["jti"], expires_at)
     return jsonify(result), status
 
 @user_bp.post('/refresh')
@@ -334,7 +340,8 @@ def refresh():
         description: User not found error.
     """
     username = get_jwt_identity()
-    jti = get_jwt()["jti"]
+    token = get_jwt()
+    expires_at = datetime.fromtimestamp(token["exp"])
     user_service = UserService(db_session=db.session)
-    result, status = user_service.refresh(username, jti)
+    result, status = user_service.refresh(username, token["jti"], expires_at)
     return result, status
@@ -1,8 +1,33 @@
-from marshmallow import Schema, fields, validate
-from src.utils.constants import Currency
+from marshmallow import Schema, fields, validate, validates_schema, ValidationError
+from src.utils.constants import Currency, DEFAULT_HISTORY_PAGE_SIZE, MAX_HISTORY_PAGE_SIZE, export_mimetypes
+from src.utils.pagination import decode_cursor
+
+class Cursor(fields.Field):
+    def _deserialize(self, value, attr, data, **kwargs):
+        try:
+            return decode_cursor(value)
+        except ValueError as error:
+            raise ValidationError('Invalid cursor') from error
 
 class CreateAccountSchema(Schema):
     currency = fields.String(required = True, validate = validate.OneOf([currency.name for currency in Currency]))
 
 class AccountSchema(Schema):
     id = fields.Integer(required = True)
+
+class BalanceAtSchema(AccountSchema):
+    at = fields.NaiveDateTime(required = True)
+
+class TransactionHistorySchema(AccountSchema):
+    limit = fields.Integer(load_default = DEFAULT_HISTORY_PAGE_SIZE, validate = validate.Range(min = 1, max = MAX_HISTORY_PAGE_SIZE))
+    cursor = Cursor()
+
+class ExportTransactionHistorySchema(Schema):
+    format = fields.String(load_default = 'ndjson', validate = validate.OneOf(list(export_mimetypes)))
+    start = fields.NaiveDateTime()
+    end = fields.NaiveDateTime()
+
+    @validates_schema
+    def check(self, data, **kwargs):
+        if 'start' in data and 'end' in data and data['start'] > data['end']:
+            raise ValidationError('Start date must be before end date')
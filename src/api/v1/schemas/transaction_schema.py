@@ -1,11 +1,24 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
+from src.utils.constants import MAX_BATCH_TRANSFER_SIZE
 
 class TransferSchema(Schema):
     id = fields.Integer(required = True)
     receiver_username = fields.String(required = True)
     receiver_id = fields.Integer(required = True)
-    amount = fields.Float(required = True)
+    amount = fields.Float(required = True, validate = validate.Range(min = 0, min_inclusive = False))
     
+class TransferStatusSchema(Schema):
+    id = fields.Integer(required = True)
+
 class WithdrawDepositSchema(Schema):
     id = fields.Integer(required = True)
-    amount = fields.Float(required = True)
+    amount = fields.Float(required = True, validate = validate.Range(min = 0, min_inclusive = False))
+
+class BatchTransferItemSchema(Schema):
+    receiver_username = fields.String(required = True)
+    receiver_id = fields.Integer(required = True)
+    amount = fields.Float(required = True, validate = validate.Range(min = 0, min_inclusive = False))
+
+class BatchTransferSchema(Schema):
+    id = fields.Integer(required = True)
+    transfers = fields.List(fields.Nested(BatchTransferItemSchema), required = True, validate = validate.Length(min = 1, max = MAX_BATCH_TRANSFER_SIZE))
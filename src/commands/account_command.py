@@ -0,0 +1,48 @@
+import time
+from datetime import date, timedelta
+import click
+from flask.cli import AppGroup
+
+from extensions import db
+from src.services.hot_account_service import HotAccountService
+
+
+account_cli = AppGroup('accounts', help='Account maintenance commands.')
+
+
+@account_cli.command('hot')
+@click.argument('account_id', type=int)
+@click.option('--shards', default=8, show_default=True, type=click.IntRange(min=0), help='Number of sub-balances credits are spread over, 0 turns hot account mode off.')
+def hot(account_id: int, shards: int):
+    '''
+    Spread the credits of an account that receives many transfers over several sub-balances.
+    '''
+    if not HotAccountService(db.session).set_shards(account_id, shards):
+        raise click.ClickException(f'Account {account_id} not found')
+
+    click.echo(f'Account {account_id} now has {shards} shards')
+
+@account_cli.command('merge-shards')
+@click.option('--interval', default=60.0, show_default=True, help='Seconds between merges.')
+@click.option('--once', is_flag=True, help='Merge once and exit instead of merging every interval.')
+def merge_shards(interval: float, once: bool):
+    '''
+    Move the sub-balances of hot accounts into their balance and write their end of day snapshots.
+    '''
+    service = HotAccountService(db.session)
+    closed = None
+
+    while True:
+        start = time.perf_counter()
+        merged = service.merge_all()
+
+        yesterday = date.today() - timedelta(days=1)
+        if closed != yesterday:
+            service.close_day(yesterday)
+            closed = yesterday
+
+        click.echo(f'Merged {merged} hot accounts in {time.perf_counter() - start:.2f}s')
+
+        if once:
+            return
+        time.sleep(interval)
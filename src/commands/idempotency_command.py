@@ -0,0 +1,18 @@
+import click
+from flask.cli import AppGroup
+
+from extensions import db
+from src.services.idempotency_service import prune_expired_keys
+
+
+idempotency_cli = AppGroup('idempotency', help='Idempotency key maintenance commands.')
+
+
+@idempotency_cli.command('prune')
+@click.option('--batch-size', default=1000, show_default=True, help='Largest number of keys deleted per transaction.')
+def prune(batch_size: int):
+    '''
+    Delete the idempotency keys and stored responses that have expired.
+    '''
+    deleted = prune_expired_keys(db.session, batch_size)
+    click.echo(f'Deleted {deleted} expired idempotency keys')
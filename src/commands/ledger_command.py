@@ -0,0 +1,44 @@
+import time
+import click
+from flask.cli import AppGroup
+
+from extensions import db
+from src.services.balance_snapshot_service import BalanceSnapshotService
+
+
+ledger_cli = AppGroup('ledger', help='Ledger maintenance commands.')
+
+
+@ledger_cli.command('reconcile')
+@click.option('--chunk-size', default=100000, show_default=True, help='Number of rows fetched per chunk.')
+@click.option('--tolerance', default=1e-6, show_default=True, help='Largest accepted difference between stored and computed balances.')
+@click.option('--checkpoint', type=click.Path(dir_okay=False), help='File holding the balances computed up to the last reconciled transaction, read for incremental runs and updated afterwards.')
+@click.option('--full', is_flag=True, help='Ignore the checkpoint and replay every transaction.')
+def reconcile(chunk_size: int, tolerance: float, checkpoint: str, full: bool):
+    '''
+    Recompute account balances from the transactions and report accounts whose stored balance differs.
+    '''
+    # Imported here so that NumPy is only loaded when the command runs, not on every application start
+    from src.services.reconciliation_service import ReconciliationService
+
+    start = time.perf_counter()
+    report = ReconciliationService(db.session).reconcile(chunk_size, tolerance, checkpoint, full)
+    elapsed = time.perf_counter() - start
+
+    for mismatch in report['mismatches']:
+        click.echo(f"Account {mismatch['account id']}: stored {mismatch['stored balance']}, expected {mismatch['expected balance']} ({mismatch['difference']:+})")
+
+    click.echo(f"Reconciled {report['transactions']} transactions up to id {report['last transaction id']} over {report['accounts']} accounts in {elapsed:.2f}s ({report['transactions'] / max(elapsed, 1e-9):.0f} transactions/s)")
+
+    if report['mismatches']:
+        raise click.ClickException(f"{len(report['mismatches'])} accounts do not match their transactions")
+
+@ledger_cli.command('backfill-snapshots')
+@click.option('--batch-size', default=1000, show_default=True, help='Number of accounts rebuilt per transaction.')
+def backfill_snapshots(batch_size: int):
+    '''
+    Rebuild the daily balance snapshots of every account from its transactions.
+    '''
+    start = time.perf_counter()
+    written = BalanceSnapshotService(db.session).backfill(batch_size)
+    click.echo(f'Wrote {written} balance snapshots in {time.perf_counter() - start:.2f}s')
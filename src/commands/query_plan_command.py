@@ -0,0 +1,25 @@
+import click
+from flask.cli import with_appcontext
+
+from extensions import db
+from src.utils.query_plan import hot_queries, find_full_scans
+
+
+@click.command('check-query-plans')
+@with_appcontext
+def check_query_plans():
+    '''
+    Explain every hot query against the configured database and fail if any of them reads a whole table.
+    '''
+    failed = False
+
+    for name, statement in hot_queries(db.session).items():
+        full_scans = find_full_scans(db.session, statement)
+        if full_scans:
+            failed = True
+            click.echo(f'FAIL {name}: {", ".join(full_scans)}')
+        else:
+            click.echo(f'OK   {name}')
+
+    if failed:
+        raise click.ClickException('Hot queries regressed to full table scans')
@@ -0,0 +1,26 @@
+import json
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+@click.command('export-apispec')
+@click.option('--output', type=click.Path(dir_okay=False), help='File to write the spec to, defaults to SWAGGER_SPEC_FILE.')
+@with_appcontext
+def export_apispec(output: str):
+    '''
+    Build the OpenAPI spec from the controller docstrings and write it to a file that the application can serve instead.
+    '''
+    swagger = getattr(current_app, 'swag', None)
+    if swagger is None:
+        raise click.ClickException('The API docs are disabled, set SWAGGER_ENABLED to export the spec')
+
+    output = output or current_app.config['SWAGGER_SPEC_FILE']
+    if not output:
+        raise click.ClickException('No output file given and SWAGGER_SPEC_FILE is not set')
+
+    spec = swagger.build_apispecs(swagger.endpoints[0])
+    with open(output, 'w') as file:
+        json.dump(spec, file, indent=2, default=str)
+
+    click.echo(f"Wrote the spec of {len(spec.get('paths', {}))} paths to {output}")
@@ -0,0 +1,18 @@
+import click
+from flask.cli import AppGroup
+
+from extensions import db
+from src.services.token_blocklist_service import prune_expired_tokens
+
+
+token_cli = AppGroup('tokens', help='Token blocklist maintenance commands.')
+
+
+@token_cli.command('prune')
+@click.option('--batch-size', default=1000, show_default=True, help='Largest number of entries deleted per transaction.')
+def prune(batch_size: int):
+    '''
+    Delete the blocklist entries of tokens that have already expired.
+    '''
+    deleted = prune_expired_tokens(db.session, batch_size)
+    click.echo(f'Deleted {deleted} expired blocklist entries')
@@ -0,0 +1,43 @@
+import threading
+import time
+from datetime import timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from extensions import db
+from src.services.transfer_queue_service import TransferWorker
+
+
+transfer_cli = AppGroup('transfers', help='Queued transfer commands.')
+
+
+@transfer_cli.command('work')
+@click.option('--workers', default=4, show_default=True, help='Number of worker threads.')
+@click.option('--batch-size', default=50, show_default=True, help='Number of transfers claimed at once by a worker.')
+@click.option('--poll-interval', default=0.5, show_default=True, help='Seconds a worker waits when the queue is empty.')
+@click.option('--claim-timeout', default=300, show_default=True, help='Seconds after which transfers claimed by a worker that died are claimed again.')
+@click.option('--once', is_flag=True, help='Exit once the queue is empty instead of waiting for new transfers.')
+def work(workers: int, batch_size: int, poll_interval: float, claim_timeout: int, once: bool):
+    '''
+    Settle the transfers accepted by /transaction/transfer-async. Several of these can run at the same time, also on different machines.
+    '''
+    stop = threading.Event()
+    app = current_app._get_current_object()
+    threads = [TransferWorker(app, db, batch_size, poll_interval, timedelta(seconds=claim_timeout), stop, once) for _ in range(workers)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        click.echo('Stopping, waiting for the current batches to finish')
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    processed = sum(thread.processed for thread in threads)
+    click.echo(f'Processed {processed} transfers in {time.perf_counter() - start:.2f}s')
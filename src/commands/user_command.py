@@ -0,0 +1,40 @@
+import json
+import os
+import time
+import click
+from flask.cli import AppGroup
+
+from extensions import db
+from src.services.import_service import ImportService, read_rows
+
+
+user_cli = AppGroup('users', help='User maintenance commands.')
+
+
+@user_cli.command('import')
+@click.argument('file', type=click.File('r', encoding='utf-8'))
+@click.option('--format', type=click.Choice(['csv', 'ndjson']), help='Format of the file, guessed from its extension by default.')
+@click.option('--batch-size', default=5000, show_default=True, help='Number of users inserted per transaction.')
+@click.option('--workers', default=os.cpu_count(), show_default=True, help='Number of processes hashing passwords, 1 hashes in this process.')
+@click.option('--rejects', type=click.File('w', encoding='utf-8'), help='File the rejected rows are written to as NDJSON, with their line number and errors.')
+def import_users(file, format: str, batch_size: int, workers: int, rejects):
+    '''
+    Register the users of a CSV or NDJSON file with the accounts listed in their currencies field.
+
+    Rows have the first_name, last_name, username, email and password fields of /user/register. In CSV files currencies are separated by spaces, in NDJSON files they are a list.
+    '''
+    format = format or ('csv' if file.name.lower().endswith('.csv') else 'ndjson')
+    start = time.perf_counter()
+
+    def on_reject(line: int, errors) -> None:
+        if rejects:
+            rejects.write(json.dumps({'line': line, 'errors': errors}) + '\n')
+
+    def on_progress(report: dict) -> None:
+        elapsed = time.perf_counter() - start
+        click.echo(f"{report['users']} users and {report['accounts']} accounts imported, {report['rejected']} rows rejected ({report['users'] / max(elapsed, 1e-9):.0f} users/s)")
+
+    report = ImportService(db.session).import_users(read_rows(file, format), batch_size, workers, on_reject, on_progress)
+    elapsed = time.perf_counter() - start
+
+    click.echo(f"Imported {report['users']} users and {report['accounts']} accounts in {elapsed:.2f}s ({report['users'] / max(elapsed, 1e-9):.0f} users/s), {report['rejected']} rows rejected")
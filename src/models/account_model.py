@@ -13,4 +13,11 @@ class Account(db.Model):
 
     currency = db.Column(db.Integer, nullable=False, default=Currency.LBP.value)
     balance = db.Column(db.Float, nullable=False, default=0.0)
+    # Number of account_shards rows that credits are spread over, 0 unless the account receives enough transfers to be marked hot
+    shards = db.Column(db.Integer, nullable=False, default=0)
     date = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_accounts_user_id_id', 'user_id', 'id'),
+        db.Index('ix_accounts_user_id_active', 'user_id', postgresql_where=db.text('active'), sqlite_where=db.text('active = 1')),
+    )
@@ -0,0 +1,8 @@
+from extensions import db
+
+class AccountShard(db.Model):
+    __tablename__ = 'account_shards'
+
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), primary_key=True)
+    shard = db.Column(db.Integer, primary_key=True)
+    balance = db.Column(db.Float, nullable=False, default=0.0)
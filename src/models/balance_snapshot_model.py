@@ -0,0 +1,8 @@
+from extensions import db
+
+class BalanceSnapshot(db.Model):
+    __tablename__ = 'balance_snapshots'
+
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    balance = db.Column(db.Float, nullable=False)
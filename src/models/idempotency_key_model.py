@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from extensions import db
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+
+    id = db.Column(db.Integer, primary_key=True, unique=True, autoincrement=True)
+    username = db.Column(db.String(100), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)
+
+    # Status and response stay empty while the first request is being processed
+    status = db.Column(db.Integer, nullable=True)
+    response = db.Column(db.Text, nullable=True)
+    mimetype = db.Column(db.String(100), nullable=True)
+
+    # A claim not completed within the processing timeout of claimed_at was abandoned, it is taken over by a retry unless the request committed, which applied_at records
+    claimed_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    applied_at = db.Column(db.DateTime, nullable=True)
+
+    date = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('username', 'key', name='uq_idempotency_keys_username_key'),
+    )
@@ -0,0 +1,27 @@
+from extensions import db
+from src.utils.constants import PendingTransferStatus
+
+class PendingTransfer(db.Model):
+    __tablename__ = 'pending_transfers'
+
+    id = db.Column(db.Integer, primary_key=True, unique=True, autoincrement=True)
+    username = db.Column(db.String(100), nullable=False)
+    user_id = db.Column(db.Integer, nullable=True)
+
+    # Checked when the transfer is settled, not when it is accepted
+    sender_id = db.Column(db.Integer, nullable=False)
+    receiver_username = db.Column(db.String(100), nullable=False)
+    receiver_id = db.Column(db.Integer, nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+
+    status = db.Column(db.String(20), nullable=False, default=PendingTransferStatus.PENDING.value)
+    result_status = db.Column(db.Integer, nullable=True)
+    result = db.Column(db.String(255), nullable=True)
+
+    date = db.Column(db.DateTime, nullable=False)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    settled_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_pending_transfers_status_id', 'status', 'id'),
+    )
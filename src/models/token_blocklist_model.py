@@ -5,4 +5,5 @@ class TokenBlocklist(db.Model):
 
     id = db.Column(db.Integer, primary_key=True, nullable=False, unique=True, autoincrement=True)
     jti = db.Column(db.String(36), nullable=False, index=True)
-    date = db.Column(db.DateTime, nullable=False)
+    date = db.Column(db.DateTime, nullable=False, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -12,3 +12,8 @@ class Transaction(db.Model):
 
     amount = db.Column(db.Float, nullable=False)
     date = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_transactions_sender_id_date_id', 'sender_id', 'date', 'id'),
+        db.Index('ix_transactions_receiver_id_date_id', 'receiver_id', 'date', 'id'),
+    )
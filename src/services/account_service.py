@@ -1,30 +1,44 @@
 from datetime import datetime
+from typing import Iterator
+from sqlalchemy import select, or_, and_
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import Select
 
 from logger import logger
 from src.models.account_model import Account
+from src.models.transaction_model import Transaction
 from src.models.user_model import User
 from src.services.user_service import UserService
-from src.utils.constants import currency_map, TransactionType
+from src.services.balance_snapshot_service import BalanceSnapshotService
+from src.services.hot_account_service import HotAccountService
+from src.utils.constants import currency_map, TransactionType, EXPORT_CHUNK_SIZE
 from src.utils.constants import inverse_currency_map
+from src.utils.export import ndjson_lines, csv_lines
+from src.utils.pagination import encode_cursor
+
+
+SenderAccount = aliased(Account)
+ReceiverAccount = aliased(Account)
+SenderUser = aliased(User)
+ReceiverUser = aliased(User)
 
 
 class AccountService():
     def __init__(self, db_session):
         self.db_session = db_session
         self.user_service = UserService(db_session)
+        self.snapshot_service = BalanceSnapshotService(db_session)
+        self.hot_account_service = HotAccountService(db_session)
     
-    def get_account_from_user(self, user: User, id: str) -> Account:
-        account = user.accounts.filter_by(id=id).first()
-        if account and account.active:
-            return account
-        return None
+    def get_account(self, user_id: int, id: int) -> Account:
+        return self.db_session.query(Account).filter_by(id=id, user_id=user_id, active=True).first()
     
-    def create(self, data: dict, username: str) -> dict:
+    def create(self, data: dict, username: str, user_id: int = None) -> dict:
         currency = data['currency']
 
         logger.info('User creating account')
 
-        user = self.user_service.get_user_by_username(username)
+        user = self.user_service.get_user_by_id(user_id) if user_id is not None else self.user_service.get_user_by_username(username)
 
         if not user:
             return {'error': 'User not found'}, 404
@@ -41,22 +55,22 @@ class AccountService():
 
         return {'message': 'Account created successfully', 'account id': account.id}, 200
 
-    def delete(self, data: dict, username: str) -> dict:
+    def delete(self, data: dict, username: str, user_id: int = None) -> dict:
         id = data['id']
 
         logger.info('User deleting account')
 
-        user = self.user_service.get_user_by_username(username)
+        user_id = self.user_service.get_user_id(username, user_id)
 
-        if not user:
+        if not user_id:
             return {'error': 'User not found'}, 404
         
-        account = self.get_account_from_user(user, id)
+        account = self.get_account(user_id, id)
         
         if not account:
             return {'error': 'Account not found'}, 404
         
-        if account.balance != 0:
+        if self.hot_account_service.total_balance(account) != 0:
             return {'error': 'Please withdraw all funds before deleting account', 'account id': account.id}, 402
         
         account.active = False
@@ -66,78 +80,185 @@ class AccountService():
 
         return {'message': 'Account deleted successfully'}, 200
     
-    def balance(self, data: dict, username:str) -> dict:
+    def balance(self, data: dict, username: str, user_id: int = None) -> dict:
         id = data['id']
 
         logger.info('User checking account balance')
 
-        user = self.user_service.get_user_by_username(username)
+        user_id = self.user_service.get_user_id(username, user_id)
 
-        if not user:
+        if not user_id:
             return {'error': 'User not found'}, 404
         
-        account = self.get_account_from_user(user, id)
+        account = self.get_account(user_id, id)
         
         if not account:
             return {'error': 'Account not found'}, 404
         
         logger.info('Account balance retrieved successfully')
         
-        return {'message': 'Account balance retrieved successfully', 'account': {'id': account.id, 'balance': account.balance, 'currency': currency_map.get(account.currency)}}, 200
+        return {'message': 'Account balance retrieved successfully', 'account': {'id': account.id, 'balance': self.hot_account_service.total_balance(account), 'currency': currency_map.get(account.currency)}}, 200
+    
+    def balance_at(self, data: dict, username: str, user_id: int = None) -> dict:
+        id = data['id']
+        at = data['at']
+
+        logger.info('User checking account balance at a point in time')
+
+        user_id = self.user_service.get_user_id(username, user_id)
+
+        if not user_id:
+            return {'error': 'User not found'}, 404
+        
+        account = self.get_account(user_id, id)
+        
+        if not account:
+            return {'error': 'Account not found'}, 404
+        
+        balance = self.snapshot_service.balance_at(id, at)
+
+        logger.info('Account balance at a point in time retrieved successfully')
+        
+        return {'message': 'Account balance retrieved successfully', 'account': {'id': account.id, 'balance': balance, 'currency': currency_map.get(account.currency), 'at': at}}, 200
     
-    def get_transactions(self, account: Account) -> list[dict]:
-        transactions = account.transactions_sent.all() + account.transactions_received.all()
-        transactions = {transaction.id: transaction for transaction in transactions}
-        transactions_view = []
-
-        for transaction_id in transactions:
-            transaction = transactions[transaction_id]
-            match transaction.type:
-                case TransactionType.TRANSFER.value:
-                    transactions_view.append({'type': 'transfer', 'amount': transaction.amount, 'transaction date': transaction.date, 'sender': transaction.sender_account.user.username, 'sender account id': transaction.sender_account.id, 'receiver': transaction.receiver_account.user.username, 'receiver account id': transaction.receiver_account.id})
-                case TransactionType.DEPOSIT.value:
-                    transactions_view.append({'type': 'deposit', 'amount': transaction.amount, 'transaction date': transaction.date, 'account id': transaction.receiver_account.id})
-                case TransactionType.WITHDRAW.value:
-                    transactions_view.append({'type': 'withdraw', 'amount': transaction.amount, 'transaction date': transaction.date, 'account id': transaction.receiver_account.id})
-                case _:
-                    raise ValueError(f'Invalid transaction type: {transaction.type}')
-                
-        transactions_view.sort(key=lambda x: x['transaction date'], reverse=True)
-        return transactions_view
-
-    def transaction_history(self, data: dict, username: str) -> dict:
+    def history_statement(self, account_ids) -> Select:
+        '''
+        Function to build a single query returning the transactions sent or received by the given accounts, newest first, with the counterparty usernames joined in
+        '''
+        return (
+            select(
+                Transaction.id,
+                Transaction.type,
+                Transaction.amount,
+                Transaction.date,
+                Transaction.sender_id,
+                Transaction.receiver_id,
+                SenderUser.username.label('sender'),
+                ReceiverUser.username.label('receiver'),
+            )
+            .join(SenderAccount, Transaction.sender_id == SenderAccount.id)
+            .join(SenderUser, SenderAccount.user_id == SenderUser.id)
+            .join(ReceiverAccount, Transaction.receiver_id == ReceiverAccount.id)
+            .join(ReceiverUser, ReceiverAccount.user_id == ReceiverUser.id)
+            .where(or_(Transaction.sender_id.in_(account_ids), Transaction.receiver_id.in_(account_ids)))
+            .order_by(Transaction.date.desc(), Transaction.id.desc())
+        )
+
+    def transaction_view(self, transaction) -> dict:
+        match transaction.type:
+            case TransactionType.TRANSFER.value:
+                return {'type': 'transfer', 'amount': transaction.amount, 'transaction date': transaction.date, 'sender': transaction.sender, 'sender account id': transaction.sender_id, 'receiver': transaction.receiver, 'receiver account id': transaction.receiver_id}
+            case TransactionType.DEPOSIT.value:
+                return {'type': 'deposit', 'amount': transaction.amount, 'transaction date': transaction.date, 'account id': transaction.receiver_id}
+            case TransactionType.WITHDRAW.value:
+                return {'type': 'withdraw', 'amount': transaction.amount, 'transaction date': transaction.date, 'account id': transaction.receiver_id}
+            case _:
+                raise ValueError(f'Invalid transaction type: {transaction.type}')
+
+    def get_transactions(self, account_ids) -> list[dict]:
+        transactions = self.db_session.execute(self.history_statement(account_ids))
+        return [self.transaction_view(transaction) for transaction in transactions]
+
+    def stream_transactions(self, statement: Select) -> Iterator[dict]:
+        '''
+        Function to lazily yield transaction views through a server-side cursor, fetching EXPORT_CHUNK_SIZE rows at a time
+        '''
+        transactions = self.db_session.execute(statement.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        for transaction in transactions:
+            yield self.transaction_view(transaction)
+
+        logger.info('All transaction history exported successfully')
+
+    def history_page_statement(self, account_ids, limit: int, cursor: tuple = None) -> Select:
+        '''
+        Function to build the keyset pagination query on (date, id), one extra row is fetched to know whether a next page exists
+        '''
+        statement = self.history_statement(account_ids)
+
+        if cursor:
+            date, id = cursor
+            statement = statement.where(or_(Transaction.date < date, and_(Transaction.date == date, Transaction.id < id)))
+
+        return statement.limit(limit + 1)
+
+    def get_transactions_page(self, account_ids, limit: int, cursor: tuple = None) -> tuple[list[dict], str]:
+        '''
+        Function to fetch one page of transactions, returns the page and the cursor of the next one
+        '''
+        transactions = self.db_session.execute(self.history_page_statement(account_ids, limit, cursor)).all()
+        next_cursor = None
+
+        if len(transactions) > limit:
+            transactions = transactions[:limit]
+            next_cursor = encode_cursor(transactions[-1].date, transactions[-1].id)
+
+        return [self.transaction_view(transaction) for transaction in transactions], next_cursor
+
+    def transaction_history(self, data: dict, username: str, user_id: int = None) -> dict:
         id = data['id']
 
         logger.info('User viewing transaction history')
 
-        user = self.user_service.get_user_by_username(username)
+        user_id = self.user_service.get_user_id(username, user_id)
 
-        if not user:
+        if not user_id:
             return {'error': 'User not found'}, 404
         
-        account = self.get_account_from_user(user, id)
+        account = self.get_account(user_id, id)
         
         if not account:
             return {'error': 'Account not found'}, 404
         
-        transactions_view = self.get_transactions(account)
+        transactions_view, next_cursor = self.get_transactions_page([account.id], data['limit'], data.get('cursor'))
 
         logger.info('Transaction history retrieved successfully')
 
-        return {'message': 'Transaction history retrieved successfully', 'transactions': transactions_view}, 200
+        return {'message': 'Transaction history retrieved successfully', 'transactions': transactions_view, 'next cursor': next_cursor}, 200
     
-    def all_transaction_history(self, username: str) -> dict:
+    def user_account_ids(self, user_id: int) -> Select:
+        '''
+        Function to select the ids of every account of the user, closed ones included, joined on the user being active since the id taken from the token claims is not checked against a deleted user
+        '''
+        return select(Account.id).join(User, User.id == Account.user_id).where(Account.user_id == user_id, User.active)
+
+    def all_transaction_history(self, username: str, user_id: int = None) -> dict:
         logger.info('User viewing all transaction history')
 
-        user = self.user_service.get_user_by_username(username)
+        user_id = self.user_service.get_user_id(username, user_id)
 
-        if not user:
+        if not user_id:
             return {'error': 'User not found'}, 404
         
-        transactions_view = []
-        for account in user.accounts:
-            transactions_view.extend(self.get_transactions(account))
+        account_ids = self.user_account_ids(user_id)
+        transactions_view = self.get_transactions(account_ids)
 
         logger.info('All transaction history retrieved successfully')
 
-        return {'message': 'All transaction history retrieved successfully', 'transactions': transactions_view}, 200
\ No newline at end of file
+        return {'message': 'All transaction history retrieved successfully', 'transactions': transactions_view}, 200
+
+    def export_transaction_history(self, data: dict, username: str, user_id: int = None) -> tuple[Iterator[str] | dict, int]:
+        start = data.get('start')
+        end = data.get('end')
+
+        logger.info('User exporting all transaction history')
+
+        user_id = self.user_service.get_user_id(username, user_id)
+
+        if not user_id:
+            return {'error': 'User not found'}, 404
+        
+        account_ids = self.user_account_ids(user_id)
+        statement = self.history_statement(account_ids)
+
+        if start:
+            statement = statement.where(Transaction.date >= start)
+        if end:
+            statement = statement.where(Transaction.date <= end)
+
+        transactions = self.stream_transactions(statement)
+
+        match data['format']:
+            case 'csv':
+                return csv_lines(transactions), 200
+            case _:
+                return ndjson_lines(transactions), 200
@@ -0,0 +1,15 @@
+from src.services.account_service import AccountService
+
+
+class AsyncAccountService():
+    '''
+    Async counterpart of AccountService for the /async endpoints, see AsyncUserService
+    '''
+    def __init__(self, async_session):
+        self.async_session = async_session
+
+    async def balance(self, data: dict, username: str, user_id: int = None) -> dict:
+        return await self.async_session.run_sync(lambda session: AccountService(session).balance(data, username, user_id))
+
+    async def transaction_history(self, data: dict, username: str, user_id: int = None) -> dict:
+        return await self.async_session.run_sync(lambda session: AccountService(session).transaction_history(data, username, user_id))
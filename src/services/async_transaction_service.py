@@ -0,0 +1,19 @@
+from src.services.transaction_service import TransactionService
+
+
+class AsyncTransactionService():
+    '''
+    Async counterpart of TransactionService for the /async endpoints, see AsyncUserService
+    Transfers keep the guarded updates and lock order of the sync path
+    '''
+    def __init__(self, async_session):
+        self.async_session = async_session
+
+    async def transfer(self, data: dict, username: str, user_id: int = None) -> dict:
+        return await self.async_session.run_sync(lambda session: TransactionService(session).transfer(data, username, user_id))
+
+    async def deposit(self, data: dict, username: str, user_id: int = None) -> dict:
+        return await self.async_session.run_sync(lambda session: TransactionService(session).deposit(data, username, user_id))
+
+    async def withdraw(self, data: dict, username: str, user_id: int = None) -> dict:
+        return await self.async_session.run_sync(lambda session: TransactionService(session).withdraw(data, username, user_id))
@@ -0,0 +1,16 @@
+from src.services.user_service import UserService
+
+
+class AsyncUserService():
+    '''
+    Async counterpart of UserService for the /async endpoints
+    The methods run the UserService logic on the async connection through run_sync, so both paths share it
+    '''
+    def __init__(self, async_session):
+        self.async_session = async_session
+
+    async def profile(self, username: str) -> dict:
+        return await self.async_session.run_sync(lambda session: UserService(session).profile(username))
+
+    async def view_accounts(self, username: str) -> dict:
+        return await self.async_session.run_sync(lambda session: UserService(session).view_accounts(username))
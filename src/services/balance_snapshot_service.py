@@ -0,0 +1,123 @@
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import select, func, case, and_, or_, literal, Date
+from sqlalchemy.sql import Select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from logger import logger
+from src.models.account_model import Account
+from src.models.balance_snapshot_model import BalanceSnapshot
+from src.models.transaction_model import Transaction
+from src.utils.constants import TransactionType
+
+
+CREDIT_TYPES = [TransactionType.DEPOSIT.value, TransactionType.TRANSFER.value]
+DEBIT_TYPES = [TransactionType.WITHDRAW.value, TransactionType.TRANSFER.value]
+
+
+class BalanceSnapshotService():
+    '''
+    Keeps the balance of every account at the end of each day it had transactions, so that historical balances only replay the transactions of one day
+    '''
+    def __init__(self, db_session):
+        self.db_session = db_session
+
+    def upsert(self):
+        dialect = self.db_session.get_bind().dialect.name
+        match dialect:
+            case 'postgresql':
+                return postgresql.insert(BalanceSnapshot)
+            case 'sqlite':
+                return sqlite.insert(BalanceSnapshot)
+            case _:
+                raise ValueError(f'Unsupported dialect: {dialect}')
+
+    def record(self, account_ids: list[int], day: date) -> None:
+        '''
+        Function to store the current balance of the accounts as their balance at the end of the day, in the transaction that changed them
+        The balances are copied by a single INSERT ... SELECT once the account rows are updated and locked, so concurrent writers can not interleave
+        Hot accounts are skipped, their credits do not lock the account row, so their snapshots are written by close_day once the day is over
+        '''
+        statement = self.upsert().from_select(
+            ['account_id', 'day', 'balance'],
+            select(Account.id, literal(day, Date), Account.balance).where(Account.id.in_(sorted(set(account_ids))), Account.shards == 0).order_by(Account.id),
+        )
+        statement = statement.on_conflict_do_update(index_elements=['account_id', 'day'], set_={'balance': statement.excluded.balance})
+        self.db_session.execute(statement)
+
+    def close_day(self, account_ids: list[int], day: date) -> int:
+        '''
+        Function to store the balance of the accounts at the end of a past day computed from their transactions, used for hot accounts
+        Returns the number of snapshots written
+        '''
+        end = datetime.combine(day, time.max)
+        snapshots = [{'account_id': account_id, 'day': day, 'balance': self.balance_at(account_id, end)} for account_id in sorted(set(account_ids))]
+
+        if snapshots:
+            statement = self.upsert()
+            statement = statement.on_conflict_do_update(index_elements=['account_id', 'day'], set_={'balance': statement.excluded.balance})
+            self.db_session.execute(statement, snapshots)
+
+        return len(snapshots)
+
+    def daily_changes(self, first_account_id: int, last_account_id: int) -> Select:
+        '''
+        Function to build the query summing the balance change of every account in the id range for every day it had transactions
+        '''
+        day = func.date(Transaction.date, type_=Date)
+        credits = select(Transaction.receiver_id.label('account_id'), day.label('day'), Transaction.amount.label('amount')).where(Transaction.type.in_(CREDIT_TYPES), Transaction.receiver_id.between(first_account_id, last_account_id))
+        debits = select(Transaction.sender_id.label('account_id'), day.label('day'), (-Transaction.amount).label('amount')).where(Transaction.type.in_(DEBIT_TYPES), Transaction.sender_id.between(first_account_id, last_account_id))
+        changes = credits.union_all(debits).subquery()
+
+        return (
+            select(changes.c.account_id, changes.c.day, func.sum(changes.c.amount))
+            .group_by(changes.c.account_id, changes.c.day)
+            .order_by(changes.c.account_id, changes.c.day)
+        )
+
+    def backfill(self, batch_size: int = 1000) -> int:
+        '''
+        Function to rebuild the snapshots of every account from its transactions, batch_size accounts at a time with one commit per batch
+        Returns the number of snapshots written
+        '''
+        last_account_id = self.db_session.scalar(select(func.max(Account.id))) or 0
+        written = 0
+
+        for first in range(1, last_account_id + 1, batch_size):
+            last = first + batch_size - 1
+            snapshots = []
+            balances = {}
+
+            for account_id, day, change in self.db_session.execute(self.daily_changes(first, last)):
+                balances[account_id] = balances.get(account_id, 0) + change
+                snapshots.append({'account_id': account_id, 'day': day, 'balance': balances[account_id]})
+
+            if snapshots:
+                statement = self.upsert()
+                statement = statement.on_conflict_do_update(index_elements=['account_id', 'day'], set_={'balance': statement.excluded.balance})
+                self.db_session.execute(statement, snapshots)
+            self.db_session.commit()
+
+            written += len(snapshots)
+            logger.info('Backfilled balance snapshots up to account %s', min(last, last_account_id))
+
+        return written
+
+    def balance_at(self, account_id: int, at: datetime) -> float:
+        '''
+        Function to compute the balance of an account at a point in time from the last snapshot taken before that day and the transactions since
+        '''
+        snapshot = self.db_session.execute(
+            select(BalanceSnapshot.day, BalanceSnapshot.balance)
+            .where(BalanceSnapshot.account_id == account_id, BalanceSnapshot.day < at.date())
+            .order_by(BalanceSnapshot.day.desc())
+            .limit(1)
+        ).first()
+
+        credit = case((and_(Transaction.receiver_id == account_id, Transaction.type.in_(CREDIT_TYPES)), Transaction.amount), else_=0.0)
+        debit = case((and_(Transaction.sender_id == account_id, Transaction.type.in_(DEBIT_TYPES)), Transaction.amount), else_=0.0)
+        statement = select(func.coalesce(func.sum(credit - debit), 0.0)).where(or_(Transaction.sender_id == account_id, Transaction.receiver_id == account_id), Transaction.date <= at)
+
+        if snapshot:
+            statement = statement.where(Transaction.date >= datetime.combine(snapshot.day + timedelta(days=1), time.min))
+
+        return (snapshot.balance if snapshot else 0.0) + self.db_session.scalar(statement)
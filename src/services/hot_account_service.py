@@ -0,0 +1,113 @@
+import random
+from datetime import date
+from sqlalchemy import select, update, delete, insert, func, bindparam
+from sqlalchemy.sql import ColumnElement
+
+from logger import logger
+from src.models.account_model import Account
+from src.models.account_shard_model import AccountShard
+from src.models.balance_snapshot_model import BalanceSnapshot
+from src.services.balance_snapshot_service import BalanceSnapshotService
+
+
+def total_balance() -> ColumnElement:
+    '''
+    Function to build the SQL expression of the balance of an account including the credits not yet merged from its shards
+    '''
+    shard_balance = select(func.sum(AccountShard.balance)).where(AccountShard.account_id == Account.id).scalar_subquery()
+    return Account.balance + func.coalesce(shard_balance, 0.0)
+
+
+class HotAccountService():
+    '''
+    Spreads the credits of hot accounts over several shard rows so that concurrent transfers to them do not all wait on the account row
+    Debits always go to the account row, shard balances are merged into it periodically and whenever a debit needs them
+    Locks on the shards of an account are always taken after the lock on the account row, which keeps the ascending account id lock order free of deadlocks
+    '''
+    def __init__(self, db_session):
+        self.db_session = db_session
+        self.snapshot_service = BalanceSnapshotService(db_session)
+
+    def total_balance(self, account: Account) -> float:
+        if not account.shards:
+            return account.balance
+        return account.balance + self.db_session.scalar(select(func.coalesce(func.sum(AccountShard.balance), 0.0)).where(AccountShard.account_id == account.id))
+
+    def credit(self, account_id: int, shards: int, amount: float) -> None:
+        '''
+        Function to add funds to one shard of the account picked at random
+        '''
+        statement = update(AccountShard).where(AccountShard.account_id == account_id, AccountShard.shard == random.randrange(shards)).values(balance=AccountShard.balance + amount)
+        self.db_session.execute(statement, execution_options={'synchronize_session': False})
+
+    def credit_many(self, credits: dict[int, tuple[int, float]]) -> None:
+        '''
+        Function to add funds to a random shard of several accounts with a single executemany, credits maps account ids to their shard count and amount
+        '''
+        if not credits:
+            return
+
+        shards = AccountShard.__table__
+        statement = shards.update().where(shards.c.account_id == bindparam('account_id'), shards.c.shard == bindparam('shard')).values(balance=shards.c.balance + bindparam('amount'))
+        self.db_session.execute(statement, [{'account_id': account_id, 'shard': random.randrange(count), 'amount': amount} for account_id, (count, amount) in sorted(credits.items())])
+
+    def merge(self, account_id: int) -> float:
+        '''
+        Function to move the shard balances of an account into its row, in the current transaction, returns the amount moved
+        '''
+        self.db_session.execute(select(Account.id).where(Account.id == account_id).with_for_update())
+        total = sum(self.db_session.scalars(select(AccountShard.balance).where(AccountShard.account_id == account_id).with_for_update()))
+
+        if total:
+            self.db_session.execute(update(AccountShard).where(AccountShard.account_id == account_id).values(balance=0.0), execution_options={'synchronize_session': False})
+            self.db_session.execute(update(Account).where(Account.id == account_id).values(balance=Account.balance + total), execution_options={'synchronize_session': False})
+
+        return total
+
+    def merge_all(self) -> int:
+        '''
+        Function to merge the shards of every hot account, one transaction per account so that each holds its row lock briefly, returns the number of accounts merged
+        '''
+        account_ids = self.db_session.scalars(select(Account.id).where(Account.shards > 0).order_by(Account.id)).all()
+
+        for account_id in account_ids:
+            self.merge(account_id)
+            self.db_session.commit()
+
+        logger.info('Merged the shards of %s hot accounts', len(account_ids))
+
+        return len(account_ids)
+
+    def close_day(self, day: date) -> int:
+        '''
+        Function to write the end of day balance snapshots of the hot accounts, which their transactions skip, returns the number of snapshots written
+        '''
+        account_ids = self.db_session.scalars(select(Account.id).where(Account.shards > 0)).all()
+        written = self.snapshot_service.close_day(account_ids, day)
+        self.db_session.commit()
+
+        logger.info('Closed %s for %s hot accounts', day, written)
+
+        return written
+
+    def set_shards(self, account_id: int, shards: int) -> bool:
+        '''
+        Function to spread the credits of an account over the given number of shards, 0 turns hot account mode off, returns False if the account does not exist
+        '''
+        account = self.db_session.get(Account, account_id, with_for_update=True)
+        if not account:
+            return False
+
+        self.merge(account_id)
+        self.db_session.execute(delete(AccountShard).where(AccountShard.account_id == account_id))
+        if shards:
+            # Today's snapshot would go stale once transactions stop recording it, without it balances are replayed from the day before
+            self.db_session.execute(delete(BalanceSnapshot).where(BalanceSnapshot.account_id == account_id, BalanceSnapshot.day == date.today()))
+            self.db_session.execute(insert(AccountShard), [{'account_id': account_id, 'shard': shard, 'balance': 0.0} for shard in range(shards)])
+
+        account.shards = shards
+        self.db_session.commit()
+
+        logger.info('Account %s now has %s shards', account_id, shards)
+
+        return True
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete, insert
+from sqlalchemy.exc import IntegrityError
+
+from logger import logger
+from src.models.idempotency_key_model import IdempotencyKey
+
+
+class IdempotencyService():
+    def __init__(self, db_session):
+        self.db_session = db_session
+
+    def get_key(self, username: str, key: str) -> IdempotencyKey:
+        return self.db_session.scalars(select(IdempotencyKey).where(IdempotencyKey.username == username, IdempotencyKey.key == key)).first()
+
+    def claim(self, username: str, key: str, fingerprint: str, ttl: timedelta) -> IdempotencyKey:
+        '''
+        Function to record that a request with this key is being processed, returns None if another request already claimed the key
+        The claim is committed straight away so that concurrent duplicates see it
+        '''
+        date = datetime.now()
+        try:
+            id = self.db_session.execute(
+                insert(IdempotencyKey).values(username=username, key=key, fingerprint=fingerprint, claimed_at=date, date=date, expires_at=date + ttl).returning(IdempotencyKey.id)
+            ).scalar()
+            self.db_session.commit()
+        except IntegrityError:
+            self.db_session.rollback()
+            return None
+        return id
+
+    def take_over(self, stored: IdempotencyKey) -> int:
+        '''
+        Function to claim again a key whose request was abandoned before it committed anything, returns None if another retry took it over first
+        '''
+        id = stored.id
+        taken = self.db_session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.id == id, IdempotencyKey.claimed_at == stored.claimed_at, IdempotencyKey.status.is_(None), IdempotencyKey.applied_at.is_(None))
+            .values(claimed_at=datetime.now())
+        )
+        self.db_session.commit()
+        if not taken.rowcount:
+            return None
+
+        logger.warning('Took over the abandoned claim of idempotency key %s', id)
+        return id
+
+    def mark_applied(self, id: int) -> None:
+        '''
+        Function to record, in the transaction the request commits, that the request may have had effects, its claim is then never taken over
+        '''
+        self.db_session.execute(update(IdempotencyKey).where(IdempotencyKey.id == id, IdempotencyKey.applied_at.is_(None)).values(applied_at=datetime.now()))
+
+    def complete(self, id: int, status: int, response: str, mimetype: str) -> None:
+        self.db_session.execute(update(IdempotencyKey).where(IdempotencyKey.id == id).values(status=status, response=response, mimetype=mimetype))
+        self.db_session.commit()
+
+    def release(self, id: int) -> None:
+        '''
+        Function to drop a claim whose request failed, so that a retry runs the request again, unless the request committed before failing
+        '''
+        self.db_session.rollback()
+        self.db_session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == id, IdempotencyKey.applied_at.is_(None)))
+        self.db_session.commit()
+
+    def expire(self, id: int) -> None:
+        self.db_session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == id, IdempotencyKey.expires_at <= datetime.now()))
+        self.db_session.commit()
+
+
+def prune_expired_keys(db_session, batch_size: int) -> int:
+    '''
+    Function to delete the idempotency keys that have expired, in batches of at most batch_size rows per transaction, returns the number of deleted keys
+    '''
+    now = datetime.now()
+    deleted = 0
+
+    while True:
+        ids = db_session.scalars(select(IdempotencyKey.id).where(IdempotencyKey.expires_at <= now).limit(batch_size)).all()
+        if not ids:
+            break
+
+        db_session.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(ids)), execution_options={'synchronize_session': False})
+        db_session.commit()
+        deleted += len(ids)
+
+    logger.info('Pruned %s expired idempotency keys', deleted)
+
+    return deleted
@@ -0,0 +1,172 @@
+import csv
+import json
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Iterable, Iterator, TextIO
+from marshmallow import ValidationError
+from sqlalchemy import select, insert, or_
+
+from logger import logger
+from src.api.v1.schemas.account_schema import CreateAccountSchema
+from src.api.v1.schemas.user_schema import UserRegisterSchema
+from src.models.account_model import Account
+from src.models.user_model import User
+from src.utils.constants import inverse_currency_map
+from src.utils.passwords import get_password_hasher, salt_and_hash
+
+
+USER_COLUMNS = ['first_name', 'last_name', 'username', 'email', 'password']
+
+
+def read_rows(file: TextIO, format: str) -> Iterator[tuple[int, dict]]:
+    '''
+    Function to stream the rows of a CSV or NDJSON file along with the line of the file they end on, CSV rows list the currencies of the accounts to open separated by spaces
+    '''
+    match format:
+        case 'csv':
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield reader.line_num, {**row, 'currencies': (row.get('currencies') or '').split()}
+        case _:
+            for line, text in enumerate(file, 1):
+                if text.strip():
+                    yield line, json.loads(text)
+
+
+class ImportService():
+    '''
+    Loads users and their accounts in bulk, with one multi row insert per table and one commit per batch instead of one per user
+    '''
+    def __init__(self, db_session):
+        self.db_session = db_session
+        self.user_schema = UserRegisterSchema()
+        self.account_schema = CreateAccountSchema()
+
+    def validate(self, row: dict) -> dict:
+        '''
+        Function to validate a row with the registration and account creation schemas, raises a ValidationError listing the problems
+        '''
+        fields = {column: row[column] for column in USER_COLUMNS if column in row}
+        errors = {}
+        try:
+            user = self.user_schema.load({**fields, 'confirm_password': fields.get('password')})
+        except ValidationError as e:
+            user = {}
+            errors = {field: messages for field, messages in e.messages.items() if field != 'confirm_password'}
+
+        for column in ['username', 'email', 'first_name', 'last_name']:
+            if len(user.get(column, '')) > User.__table__.c[column].type.length:
+                errors[column] = [f'Longer than {User.__table__.c[column].type.length} characters.']
+
+        currencies = row.get('currencies') or []
+        for currency in currencies:
+            try:
+                self.account_schema.load({'currency': currency})
+            except ValidationError as e:
+                errors.setdefault('currencies', []).extend(e.messages['currency'])
+
+        if errors:
+            raise ValidationError(errors)
+
+        return {**user, 'email': user['email'].lower(), 'currencies': currencies}
+
+    def batches(self, rows: Iterable[tuple[int, dict]], batch_size: int, reject: Callable) -> Iterator[list[tuple[int, dict]]]:
+        '''
+        Function to validate the rows and group the valid ones in batches of batch_size, with their line numbers
+        '''
+        batch = []
+        for line, row in rows:
+            try:
+                batch.append((line, self.validate(row)))
+            except ValidationError as e:
+                reject(line, e.messages)
+                continue
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def deduplicate(self, batch: list[tuple[int, dict]], pending: list[dict], reject: Callable) -> list[dict]:
+        '''
+        Function to drop the users of the batch whose username or email is taken, by a stored user, the pending batch that is not inserted yet or an earlier row of the batch
+        '''
+        usernames = [user['username'] for _, user in batch]
+        emails = [user['email'] for _, user in batch]
+        taken = self.db_session.execute(select(User.username, User.email).where(or_(User.username.in_(usernames), User.email.in_(emails))))
+        seen = {value for row in taken for value in row} | {value for user in pending for value in (user['username'], user['email'])}
+
+        users = []
+        for line, user in batch:
+            if user['username'] in seen or user['email'] in seen:
+                reject(line, {'_schema': ['Username or email already exists']})
+                continue
+            seen.update((user['username'], user['email']))
+            users.append(user)
+        return users
+
+    def insert(self, users: list[dict], hashes: Iterable[tuple[str, str]]) -> int:
+        '''
+        Function to insert a batch of users and their accounts and commit it, returns the number of accounts created
+        '''
+        date = datetime.now()
+        rows = [
+            {'username': user['username'], 'email': user['email'], 'first_name': user['first_name'], 'last_name': user['last_name'], 'password': hash_hex, 'salt': salt, 'date': date}
+            for user, (salt, hash_hex) in zip(users, hashes)
+        ]
+
+        ids = self.db_session.scalars(insert(User).returning(User.id, sort_by_parameter_order=True), rows).all()
+        accounts = [
+            {'user_id': id, 'currency': inverse_currency_map[currency], 'date': date}
+            for id, user in zip(ids, users) for currency in user['currencies']
+        ]
+        if accounts:
+            self.db_session.execute(insert(Account), accounts)
+
+        self.db_session.commit()
+
+        return len(accounts)
+
+    def import_users(self, rows: Iterable[tuple[int, dict]], batch_size: int = 5000, workers: int = None, on_reject: Callable = None, on_progress: Callable = None) -> dict:
+        '''
+        Function to validate, hash and insert users with their accounts, batch_size rows at a time, rows are given with their line number as read_rows yields them
+        Passwords are hashed in a pool of worker processes, one batch ahead of the inserts so that hashing and writing overlap
+        Rows that fail validation or whose username or email is taken are passed to on_reject with their line number and errors, on_progress gets the report after each batch
+        '''
+        report = {'users': 0, 'accounts': 0, 'rejected': 0}
+
+        def reject(line: int, errors) -> None:
+            report['rejected'] += 1
+            if on_reject:
+                on_reject(line, errors)
+
+        def flush(users: list[dict], hashes) -> None:
+            if not users:
+                return
+            report['accounts'] += self.insert(users, hashes)
+            report['users'] += len(users)
+            logger.info('Imported %s users', report['users'])
+            if on_progress:
+                on_progress(report)
+
+        hash_password = partial(salt_and_hash, parameters=get_password_hasher().parameters)
+        executor = ProcessPoolExecutor(workers) if workers != 1 else None
+        pending = []
+        pending_hashes = []
+        try:
+            for batch in self.batches(rows, batch_size, reject):
+                users = self.deduplicate(batch, pending, reject)
+                passwords = [user['password'] for user in users]
+                # Executor.map submits every password right away, so the batch is hashed while the previous one is inserted
+                hashes = executor.map(hash_password, passwords, chunksize=max(1, len(passwords) // 64)) if executor else map(hash_password, passwords)
+
+                flush(pending, pending_hashes)
+                pending, pending_hashes = users, hashes
+
+            flush(pending, pending_hashes)
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+
+        return report
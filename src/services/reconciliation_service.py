@@ -0,0 +1,121 @@
+import os
+import itertools
+from contextlib import contextmanager
+import numpy as np
+from sqlalchemy import select, func, case
+
+from logger import logger
+from src.models.account_model import Account
+from src.models.transaction_model import Transaction
+from src.services.hot_account_service import total_balance
+from src.utils.constants import TransactionType
+
+
+class ReconciliationService():
+    def __init__(self, db_session):
+        self.db_session = db_session
+
+    def load_checkpoint(self, path: str) -> tuple[int, np.ndarray]:
+        '''
+        Function to load the last reconciled transaction id and the balances computed up to it, starts from scratch if there is no checkpoint
+        '''
+        if not path or not os.path.exists(path):
+            return 0, np.zeros(0)
+
+        with np.load(path) as checkpoint:
+            return int(checkpoint['last_transaction_id']), checkpoint['balances']
+
+    def save_checkpoint(self, path: str, last_transaction_id: int, balances: np.ndarray) -> None:
+        with open(path, 'wb') as file:
+            np.savez(file, last_transaction_id=last_transaction_id, balances=balances)
+
+    @contextmanager
+    def snapshot(self):
+        '''
+        Function to open a connection whose reads all happen in one transaction, raised to REPEATABLE READ on PostgreSQL so they see the database as of the first one
+        Otherwise the transactions and balances committed between the reads of a reconciliation would be reported as mismatches
+        '''
+        engine = self.db_session.get_bind()
+        with engine.connect() as connection:
+            if engine.dialect.name == 'postgresql':
+                connection = connection.execution_options(isolation_level='REPEATABLE READ')
+            with connection.begin():
+                yield connection
+
+    def stream_arrays(self, connection, statement, columns: int, chunk_size: int):
+        '''
+        Function to stream a numeric query in chunks of chunk_size rows, each chunk yielded as a 2D float array
+        Rows go through a Core connection and straight into NumPy, which avoids the ORM and per row tuple overhead
+        '''
+        for chunk in connection.execution_options(yield_per=chunk_size).execute(statement).partitions():
+            values = np.fromiter(itertools.chain.from_iterable(chunk), dtype=np.float64, count=len(chunk) * columns)
+            yield values.reshape(len(chunk), columns)
+
+    def expected_balances(self, connection, chunk_size: int, last_transaction_id: int = 0, balances: np.ndarray = None) -> tuple[np.ndarray, int, int]:
+        '''
+        Function to stream the transactions after last_transaction_id in chunks and add their effect to the balances, indexed by account id
+        Returns the balances, the id of the last transaction processed and the number of transactions processed
+        '''
+        size = (connection.scalar(select(func.max(Account.id))) or 0) + 1
+        expected = np.zeros(size)
+        if balances is not None:
+            expected[:len(balances)] = balances[:size]
+
+        credit = case((Transaction.type.in_([TransactionType.DEPOSIT.value, TransactionType.TRANSFER.value]), Transaction.amount), else_=0.0)
+        debit = case((Transaction.type.in_([TransactionType.WITHDRAW.value, TransactionType.TRANSFER.value]), Transaction.amount), else_=0.0)
+        statement = (
+            select(Transaction.id, Transaction.sender_id, Transaction.receiver_id, credit, debit)
+            .where(Transaction.id > last_transaction_id)
+            .order_by(Transaction.id)
+        )
+
+        count = 0
+        for rows in self.stream_arrays(connection, statement, 5, chunk_size):
+            senders = rows[:, 1].astype(np.int64)
+            receivers = rows[:, 2].astype(np.int64)
+
+            expected += np.bincount(receivers, weights=rows[:, 3], minlength=size)[:size]
+            expected -= np.bincount(senders, weights=rows[:, 4], minlength=size)[:size]
+
+            last_transaction_id = int(rows[-1, 0])
+            count += len(rows)
+
+        return expected, last_transaction_id, count
+
+    def find_mismatches(self, connection, expected: np.ndarray, chunk_size: int, tolerance: float) -> list[dict]:
+        '''
+        Function to compare the stored balance of every account with the expected one, returns the accounts that differ by more than the tolerance
+        '''
+        mismatches = []
+        statement = select(Account.id, total_balance()).order_by(Account.id)
+
+        for rows in self.stream_arrays(connection, statement, 2, chunk_size):
+            ids = rows[:, 0].astype(np.int64)
+            stored = rows[:, 1]
+            computed = expected[ids]
+
+            for index in np.flatnonzero(~np.isclose(stored, computed, rtol=1e-9, atol=tolerance)):
+                mismatches.append({'account id': int(ids[index]), 'stored balance': float(stored[index]), 'expected balance': float(computed[index]), 'difference': float(stored[index] - computed[index])})
+
+        return mismatches
+
+    def reconcile(self, chunk_size: int = 100000, tolerance: float = 1e-6, checkpoint: str = None, full: bool = False) -> dict:
+        '''
+        Function to recompute every account balance from the transactions and report the accounts whose stored balance differs
+        When a checkpoint path is given, only the transactions after the checkpointed one are read, unless a full run is requested, and the checkpoint is then moved forward
+        Transactions committed out of id order after a checkpoint was taken are not picked up by incremental runs, a periodic full run covers them
+        '''
+        last_transaction_id, balances = (0, None) if full else self.load_checkpoint(checkpoint)
+
+        logger.info('Reconciling ledger from transaction %s', last_transaction_id)
+
+        with self.snapshot() as connection:
+            expected, last_transaction_id, count = self.expected_balances(connection, chunk_size, last_transaction_id, balances)
+            mismatches = self.find_mismatches(connection, expected, chunk_size, tolerance)
+
+        if checkpoint:
+            self.save_checkpoint(checkpoint, last_transaction_id, expected)
+
+        logger.info('Ledger reconciled, %s mismatches found', len(mismatches))
+
+        return {'transactions': count, 'accounts': len(expected) - 1, 'last transaction id': last_transaction_id, 'mismatches': mismatches}
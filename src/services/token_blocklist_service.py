@@ -1,12 +1,84 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, delete
+
 from logger import logger
 from extensions import db
 from src.models.token_blocklist_model import TokenBlocklist
 
 
-def check_if_token_revoked(jwt_header, jwt_payload: dict) -> bool:
-    logger.info('Checking if token is revoked')
+# Blocklist rows are dated before they are committed, so each refresh re-reads this many seconds before the previous one
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+
+class RevokedTokenCache():
+    '''
+    In-process copy of the revoked jtis of tokens that have not expired yet, loaded on first use and then refreshed incrementally at most once per refresh interval
+    '''
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self.revoked = {}
+        self.last_refresh = None
+        self.next_refresh = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, jti: str, expires_at: datetime) -> None:
+        with self.lock:
+            self.revoked[jti] = expires_at
+
+    def refresh(self, db_session) -> None:
+        now = datetime.now()
+        statement = select(TokenBlocklist.jti, TokenBlocklist.expires_at)
+
+        if self.last_refresh is None:
+            statement = statement.where(TokenBlocklist.expires_at > now)
+        else:
+            statement = statement.where(TokenBlocklist.date >= self.last_refresh - REFRESH_OVERLAP)
+
+        for jti, expires_at in db_session.execute(statement):
+            self.revoked[jti] = expires_at
+
+        self.revoked = {jti: expires_at for jti, expires_at in self.revoked.items() if expires_at > now}
+        self.last_refresh = now
+
+        logger.debug('Revoked token cache refreshed')
 
+    def is_revoked(self, db_session, jti: str) -> bool:
+        with self.lock:
+            if time.monotonic() >= self.next_refresh:
+                self.refresh(db_session)
+                self.next_refresh = time.monotonic() + self.refresh_interval
+            return jti in self.revoked
+
+
+def init_revoked_token_cache(app) -> None:
+    app.extensions['revoked_token_cache'] = RevokedTokenCache(app.config['JWT_BLOCKLIST_REFRESH_INTERVAL'])
+
+def get_revoked_token_cache() -> RevokedTokenCache:
+    return current_app.extensions['revoked_token_cache']
+
+def check_if_token_revoked(jwt_header, jwt_payload: dict) -> bool:
     jti = jwt_payload["jti"]
-    token = db.session.query(TokenBlocklist).filter_by(jti=jti).first()
+    return get_revoked_token_cache().is_revoked(db.session, jti)
+
+def prune_expired_tokens(db_session, batch_size: int) -> int:
+    '''
+    Function to delete the blocklist entries of tokens that have expired, in batches of at most batch_size rows per transaction, returns the number of deleted entries
+    '''
+    now = datetime.now()
+    deleted = 0
+
+    while True:
+        ids = db_session.scalars(select(TokenBlocklist.id).where(TokenBlocklist.expires_at <= now).limit(batch_size)).all()
+        if not ids:
+            break
+
+        db_session.execute(delete(TokenBlocklist).where(TokenBlocklist.id.in_(ids)), execution_options={'synchronize_session': False})
+        db_session.commit()
+        deleted += len(ids)
+
+    logger.info('Pruned %s expired blocklist entries', deleted)
 
-    return token is not None
+    return deleted
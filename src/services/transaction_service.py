@@ -1,8 +1,14 @@
 from datetime import datetime
+from itertools import groupby
+from sqlalchemy import select, update, insert, bindparam, and_
 
 from logger import logger
+from src.models.account_model import Account
 from src.models.transaction_model import Transaction
+from src.models.user_model import User
 from src.services.account_service import AccountService
+from src.services.balance_snapshot_service import BalanceSnapshotService
+from src.services.hot_account_service import HotAccountService
 from src.services.user_service import UserService
 from src.utils.constants import TransactionType
 
@@ -12,11 +18,66 @@ class TransactionService():
         self.db_session = db_session
         self.account_service = AccountService(db_session)
         self.user_service = UserService(db_session)
+        self.snapshot_service = BalanceSnapshotService(db_session)
+        self.hot_account_service = HotAccountService(db_session)
 
     def get_transaction(self, id: str) -> Transaction:
         return self.db_session.query(Transaction).filter_by(id=id).first()
+
+    def get_receiver(self, username: str, id: int) -> tuple[int, Account]:
+        '''
+        Function to resolve the receiver user and account of a transfer in a single query, returns a None user id if the user does not exist and a None account if the account does not belong to them
+        '''
+        receiver = (
+            self.db_session.query(User.id, Account)
+            .outerjoin(Account, and_(Account.user_id == User.id, Account.id == id, Account.active))
+            .filter(User.username == username, User.active)
+            .first()
+        )
+        return tuple(receiver) if receiver else (None, None)
+
+    def debit(self, account_id: int, amount: float, shards: int = 0) -> bool:
+        '''
+        Function to atomically take funds out of an account in a single guarded UPDATE, returns False without changing anything if the balance does not cover the amount
+        Hot accounts that fall short have their shards merged into the account row and the debit is tried again
+        '''
+        # The guard holds for any negative amount, which would credit the account and debit the other side instead
+        if amount <= 0:
+            return False
+
+        statement = update(Account).where(Account.id == account_id, Account.balance >= amount).values(balance=Account.balance - amount)
+        result = self.db_session.execute(statement, execution_options={'synchronize_session': False})
+        if result.rowcount == 0 and shards and self.hot_account_service.merge(account_id):
+            result = self.db_session.execute(statement, execution_options={'synchronize_session': False})
+        return result.rowcount == 1
+
+    def credit(self, account_id: int, amount: float, shards: int = 0) -> None:
+        '''
+        Function to atomically add funds to an account without reading its balance first, credits to hot accounts go to one of their shards
+        '''
+        if shards:
+            self.hot_account_service.credit(account_id, shards, amount)
+            return
+
+        statement = update(Account).where(Account.id == account_id).values(balance=Account.balance + amount)
+        self.db_session.execute(statement, execution_options={'synchronize_session': False})
+
+    def credit_many(self, credits: dict[int, float], shards: dict[int, int] = None) -> None:
+        '''
+        Function to atomically add funds to several accounts with a single executemany, in ascending account id order
+        shards maps the ids of hot accounts to their shard count, runs of hot accounts are credited to their shards in between so the lock order is kept
+        '''
+        shards = shards or {}
+        accounts = Account.__table__
+        statement = accounts.update().where(accounts.c.id == bindparam('account_id')).values(balance=accounts.c.balance + bindparam('amount'))
+
+        for hot, run in groupby(sorted(credits.items()), key=lambda credit: bool(shards.get(credit[0]))):
+            if hot:
+                self.hot_account_service.credit_many({account_id: (shards[account_id], amount) for account_id, amount in run})
+            else:
+                self.db_session.execute(statement, [{'account_id': account_id, 'amount': amount} for account_id, amount in run])
     
-    def transfer(self, data: dict, username: str) -> dict: 
+    def transfer(self, data: dict, username: str, user_id: int = None) -> dict: 
         id = data['id']
         receiver_username = data['receiver_username']
         receiver_id = data['receiver_id']
@@ -27,15 +88,14 @@ class TransactionService():
         if id == receiver_id or username == receiver_username:
             return {'error': 'Cannot transfer to self'}, 402
         
-        user = self.user_service.get_user_by_username(username)
-        receiver_user = self.user_service.get_user_by_username(receiver_username)
-        if not user:
+        user_id = self.user_service.get_user_id(username, user_id)
+        receiver_user_id, receiver = self.get_receiver(receiver_username, receiver_id)
+        if not user_id:
             return {'error': 'User not found'}, 404
-        if not receiver_user:
+        if not receiver_user_id:
             return {'error': 'Receiver not found'}, 404
     
-        account = self.account_service.get_account_from_user(user, id)
-        receiver = self.account_service.get_account_from_user(receiver_user, receiver_id)
+        account = self.account_service.get_account(user_id, id)
         if not account:
             return {'error': 'Account not found'}, 404
         if not receiver:
@@ -43,73 +103,147 @@ class TransactionService():
         
         if account.currency != receiver.currency:
             return {'error': 'Currency mismatch'}, 402
-        if account.balance < amount:
+        
+        # Rows are always locked in ascending account id order so that opposite transfers cannot deadlock
+        if id < receiver_id:
+            debited = self.debit(id, amount, account.shards)
+            if debited:
+                self.credit(receiver_id, amount, receiver.shards)
+        else:
+            self.credit(receiver_id, amount, receiver.shards)
+            debited = self.debit(id, amount, account.shards)
+
+        if not debited:
+            self.db_session.rollback()
             return {'error': 'Insufficient funds'}, 402
         
-        account.balance -= amount
-        receiver.balance += amount
         date = datetime.now()
 
         transaction = Transaction(type=TransactionType.TRANSFER.value, sender_id=id, receiver_id=receiver_id, amount=amount, date=date)
 
         self.db_session.add(transaction)
+        self.snapshot_service.record([id, receiver_id], date.date())
         self.db_session.commit()
 
         logger.info('Transfer successful')
 
         return {'message': 'Transfer successful'}, 200
     
-    def deposit(self, data: dict, username: str) -> dict:
+    def deposit(self, data: dict, username: str, user_id: int = None) -> dict:
         id = data['id']
         amount = data['amount']
 
         logger.info('User depositing funds')
 
-        user = self.user_service.get_user_by_username(username)
-        if not user:
+        user_id = self.user_service.get_user_id(username, user_id)
+        if not user_id:
             return {'error': 'User not found'}, 404
     
-        account = self.account_service.get_account_from_user(user, id)
+        account = self.account_service.get_account(user_id, id)
         if not account:
             return {'error': 'Account not found'}, 404
         
-        account.balance += amount
+        self.credit(id, amount, account.shards)
         date = datetime.now()
 
         transaction = Transaction(type=TransactionType.DEPOSIT.value, sender_id=id, receiver_id=id, amount=amount, date=date)
 
         self.db_session.add(transaction)
+        self.snapshot_service.record([id], date.date())
         self.db_session.commit()
 
         logger.info('Deposit successful')
 
         return {'message': 'Deposit successful'}, 200
     
-    def withdraw(self, data: dict, username: str) -> dict:
+    def withdraw(self, data: dict, username: str, user_id: int = None) -> dict:
         id = data['id']
         amount = data['amount']
 
         logger.info('User withdrawing funds')
 
-        user = self.user_service.get_user_by_username(username)
-        if not user:
+        user_id = self.user_service.get_user_id(username, user_id)
+        if not user_id:
             return {'error': 'User not found'}, 404
         
-        account = self.account_service.get_account_from_user(user, id)
+        account = self.account_service.get_account(user_id, id)
         if not account:
             return {'error': 'Account not found'}, 404
         
-        if account.balance < amount:
+        if not self.debit(id, amount, account.shards):
+            self.db_session.rollback()
             return {'error': 'Insufficient funds'}, 402
         
-        account.balance -= amount
         date = datetime.now()
 
         transaction = Transaction(type=TransactionType.WITHDRAW.value, sender_id=id, receiver_id=id, amount=amount, date=date)
 
         self.db_session.add(transaction)
+        self.snapshot_service.record([id], date.date())
         self.db_session.commit()
 
         logger.info('Withdrawal successful')
 
         return {'message': 'Withdrawal successful'}, 200
+
+    def batch_transfer(self, data: dict, username: str, user_id: int = None) -> dict:
+        id = data['id']
+        transfers = data['transfers']
+
+        logger.info('User batch transferring funds')
+
+        user_id = self.user_service.get_user_id(username, user_id)
+        if not user_id:
+            return {'error': 'User not found'}, 404
+        
+        account = self.account_service.get_account(user_id, id)
+        if not account:
+            return {'error': 'Account not found'}, 404
+        
+        receiver_usernames = {transfer['receiver_username'] for transfer in transfers}
+        receiver_ids = {transfer['receiver_id'] for transfer in transfers}
+        receiver_users = dict(self.db_session.execute(select(User.username, User.id).where(User.username.in_(receiver_usernames), User.active)).all())
+        receivers = {receiver.id: receiver for receiver in self.db_session.execute(select(Account.id, Account.user_id, Account.currency, Account.shards).where(Account.id.in_(receiver_ids), Account.active))}
+
+        date = datetime.now()
+        results = []
+        credits = {}
+        shards = {}
+        transactions = []
+
+        for index, transfer in enumerate(transfers):
+            receiver_id = transfer['receiver_id']
+            receiver = receivers.get(receiver_id)
+            receiver_user_id = receiver_users.get(transfer['receiver_username'])
+
+            if receiver_id == id or transfer['receiver_username'] == username:
+                results.append({'index': index, 'status': 402, 'error': 'Cannot transfer to self'})
+            elif not receiver_user_id:
+                results.append({'index': index, 'status': 404, 'error': 'Receiver not found'})
+            elif not receiver or receiver.user_id != receiver_user_id:
+                results.append({'index': index, 'status': 404, 'error': 'Receiver account not found'})
+            elif receiver.currency != account.currency:
+                results.append({'index': index, 'status': 402, 'error': 'Currency mismatch'})
+            else:
+                credits[receiver_id] = credits.get(receiver_id, 0) + transfer['amount']
+                shards[receiver_id] = receiver.shards
+                transactions.append({'type': TransactionType.TRANSFER.value, 'sender_id': id, 'receiver_id': receiver_id, 'amount': transfer['amount'], 'date': date})
+                results.append({'index': index, 'status': 200, 'message': 'Transfer successful'})
+
+        total = sum(transaction['amount'] for transaction in transactions)
+
+        if transactions:
+            # Same ascending id lock order as single transfers: lower receivers, then the source, then higher receivers
+            self.credit_many({receiver_id: amount for receiver_id, amount in credits.items() if receiver_id < id}, shards)
+            if not self.debit(id, total, account.shards):
+                self.db_session.rollback()
+                return {'error': 'Insufficient funds', 'total': total}, 402
+            self.credit_many({receiver_id: amount for receiver_id, amount in credits.items() if receiver_id > id}, shards)
+
+            self.db_session.execute(insert(Transaction), transactions)
+            self.snapshot_service.record([id, *credits], date.date())
+            self.db_session.commit()
+
+        logger.info('Batch transfer processed')
+
+        return {'message': 'Batch transfer processed', 'total': total, 'results': results}, 200
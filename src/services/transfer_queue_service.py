@@ -0,0 +1,149 @@
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, or_, and_
+
+from logger import logger
+from src.models.pending_transfer_model import PendingTransfer
+from src.services.transaction_service import TransactionService
+from src.utils.constants import PendingTransferStatus
+
+
+class TransferQueueService():
+    def __init__(self, db_session):
+        self.db_session = db_session
+        self.transaction_service = TransactionService(db_session)
+
+    def enqueue(self, data: dict, username: str, user_id: int = None) -> dict:
+        '''
+        Function to accept a transfer for later settlement, only the checks that need no query are done before it is stored
+        '''
+        logger.info('User queueing transfer')
+
+        if data['id'] == data['receiver_id'] or username == data['receiver_username']:
+            return {'error': 'Cannot transfer to self'}, 402
+
+        pending = PendingTransfer(username=username, user_id=user_id, sender_id=data['id'], receiver_username=data['receiver_username'], receiver_id=data['receiver_id'], amount=data['amount'], status=PendingTransferStatus.PENDING.value, date=datetime.now())
+
+        self.db_session.add(pending)
+        self.db_session.commit()
+
+        logger.info('Transfer queued')
+
+        return {'message': 'Transfer accepted', 'transfer id': pending.id, 'status': pending.status}, 202
+
+    def transfer_status(self, data: dict, username: str) -> dict:
+        pending = self.db_session.scalars(select(PendingTransfer).where(PendingTransfer.id == data['id'], PendingTransfer.username == username)).first()
+
+        if not pending:
+            return {'error': 'Transfer not found'}, 404
+
+        transfer = {'id': pending.id, 'status': pending.status, 'account id': pending.sender_id, 'receiver username': pending.receiver_username, 'receiver id': pending.receiver_id, 'amount': pending.amount, 'date': pending.date, 'settled at': pending.settled_at}
+        if pending.result:
+            transfer['result status'] = pending.result_status
+            transfer['error' if pending.status == PendingTransferStatus.FAILED.value else 'message'] = pending.result
+
+        return {'message': 'Transfer status retrieved successfully', 'transfer': transfer}, 200
+
+    def claim(self, batch_size: int, claim_timeout: timedelta) -> list:
+        '''
+        Function to claim up to batch_size pending transfers, oldest first, in one UPDATE
+        Rows locked by other workers are skipped on PostgreSQL, SQLite runs one writer at a time anyway, transfers claimed longer than claim_timeout ago by a worker that died are claimed again
+        '''
+        now = datetime.now()
+        claimable = (
+            select(PendingTransfer.id)
+            .where(or_(
+                PendingTransfer.status == PendingTransferStatus.PENDING.value,
+                and_(PendingTransfer.status == PendingTransferStatus.PROCESSING.value, PendingTransfer.claimed_at < now - claim_timeout),
+            ))
+            .order_by(PendingTransfer.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        statement = (
+            update(PendingTransfer)
+            .where(PendingTransfer.id.in_(claimable.scalar_subquery()))
+            .values(status=PendingTransferStatus.PROCESSING.value, claimed_at=now)
+            .returning(*PendingTransfer.__table__.c)
+        )
+        # Plain rows rather than model instances, which the commit would expire and reload one by one
+        claimed = self.db_session.execute(statement, execution_options={'synchronize_session': False}).all()
+        self.db_session.commit()
+
+        return sorted(claimed, key=lambda pending: pending.id)
+
+    def still_claimed(self, pending):
+        '''
+        Function to match the row of a claimed transfer only while the claim is still the one it was handed out with, not one taken over by another worker after claim_timeout
+        '''
+        return and_(PendingTransfer.id == pending.id, PendingTransfer.status == PendingTransferStatus.PROCESSING.value, PendingTransfer.claimed_at == pending.claimed_at)
+
+    def settle(self, pending) -> bool:
+        '''
+        Function to run a claimed transfer through the regular transfer, returns whether it succeeded
+        The settled status is written in the same database transaction as the transfer itself, and only while the claim is still ours, so a transfer can never be applied twice
+        '''
+        data = {'id': pending.sender_id, 'receiver_username': pending.receiver_username, 'receiver_id': pending.receiver_id, 'amount': pending.amount}
+
+        settled = self.db_session.execute(update(PendingTransfer).where(self.still_claimed(pending)).values(status=PendingTransferStatus.SETTLED.value, result_status=200, result='Transfer successful', settled_at=datetime.now()))
+        if not settled.rowcount:
+            self.db_session.rollback()
+            logger.warning('Queued transfer %s was claimed again by another worker, skipping it', pending.id)
+            return False
+
+        result, status = self.transaction_service.transfer(data, pending.username, pending.user_id)
+
+        if status == 200:
+            return True
+
+        # The transfer was rolled back or never written, the settled status is replaced in a new transaction
+        self.db_session.rollback()
+        self.db_session.execute(update(PendingTransfer).where(self.still_claimed(pending)).values(status=PendingTransferStatus.FAILED.value, result_status=status, result=result.get('error'), settled_at=datetime.now()))
+        self.db_session.commit()
+        return False
+
+    def process(self, batch_size: int, claim_timeout: timedelta) -> int:
+        '''
+        Function to claim and settle one batch of transfers, returns the number of transfers processed
+        '''
+        claimed = self.claim(batch_size, claim_timeout)
+        for pending in claimed:
+            self.settle(pending)
+
+        if claimed:
+            logger.info('Settled a batch of %s queued transfers', len(claimed))
+
+        return len(claimed)
+
+
+class TransferWorker(threading.Thread):
+    '''
+    Thread settling queued transfers in batches until stopped, or until the queue is empty when run once
+    '''
+    def __init__(self, app, db, batch_size: int, poll_interval: float, claim_timeout: timedelta, stop: threading.Event, once: bool = False):
+        super().__init__(daemon=True)
+        self.app = app
+        self.db = db
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        self.stop = stop
+        self.once = once
+        self.processed = 0
+
+    def run(self):
+        with self.app.app_context():
+            while not self.stop.is_set():
+                try:
+                    processed = TransferQueueService(self.db.session).process(self.batch_size, self.claim_timeout)
+                except Exception:
+                    logger.exception('Settling queued transfers failed')
+                    self.db.session.rollback()
+                    processed = 0
+
+                self.processed += processed
+                if not processed:
+                    if self.once:
+                        break
+                    self.stop.wait(self.poll_interval)
+            self.db.session.remove()
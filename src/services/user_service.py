@@ -1,12 +1,14 @@
 from datetime import datetime
-import hashlib
-import secrets
 from flask_jwt_extended import create_access_token, create_refresh_token
 
 from logger import logger
 from src.models.user_model import User
+from src.models.account_model import Account
 from src.models.token_blocklist_model import TokenBlocklist
+from src.services.hot_account_service import total_balance
+from src.services.token_blocklist_service import get_revoked_token_cache
 from src.utils.constants import currency_map
+from src.utils.passwords import get_password_hasher
 
 
 class UserService():
@@ -15,20 +17,15 @@ class UserService():
 
     def salt_and_hash(self, password: str) -> tuple[str, str]:
         '''
-        Function to generate a salt and hash a password
+        Function to generate a salt and hash a password with the configured key derivation, in the hashing process pool
         '''
-        salt = secrets.token_hex(16)
-        hash_object = hashlib.sha256((password + salt).encode())
-        hash_hex = hash_object.hexdigest()
-        return salt, hash_hex
+        return get_password_hasher().hash(password)
 
     def authenticate_user(self, password: str, salt: str, hash_hex: str) -> bool:
         '''
-        Function to authenticate a user through hashing and salting the given password and comparing it to the stored hash
+        Function to authenticate a user by hashing the given password with the salt and parameters of the stored hash and comparing the two
         '''
-        hash_object = hashlib.sha256((password + salt).encode())
-        hash_hex_check = hash_object.hexdigest()
-        return hash_hex == hash_hex_check
+        return get_password_hasher().verify(password, salt, hash_hex)
 
     def get_user_by_username(self, username:str) -> User:
         user = self.db_session.query(User).filter_by(username=username).first()
@@ -36,6 +33,21 @@ class UserService():
             return user
         return None
 
+    def get_user_by_id(self, id: int) -> User:
+        user = self.db_session.get(User, id)
+        if user and user.active:
+            return user
+        return None
+
+    def get_user_id(self, username: str, user_id: int = None) -> int:
+        '''
+        Function to get the id of the authenticated user, taken from the token claims when present so that no query is needed, older tokens without it fall back to a lookup by username
+        '''
+        if user_id is not None:
+            return user_id
+        user = self.get_user_by_username(username)
+        return user.id if user else None
+
     def get_user_by_email(self, email: str) -> User:
         user = self.db_session.query(User).filter_by(email=email).first()
         if user and user.active:
@@ -47,9 +59,10 @@ class UserService():
             return self.get_user_by_username(username)
         return self.get_user_by_email(email.lower())
     
-    def create_response(self, username: str, message: str) -> dict:
-        access = create_access_token(identity=username, fresh=True)
-        refresh = create_refresh_token(identity=username)
+    def create_response(self, user: User, message: str) -> dict:
+        claims = {'user_id': user.id}
+        access = create_access_token(identity=user.username, fresh=True, additional_claims=claims)
+        refresh = create_refresh_token(identity=user.username, additional_claims=claims)
         return {'user': {'access': access, 'refresh': refresh}, 'message': message}, 200
 
     def login(self, data: dict) -> dict:
@@ -67,10 +80,16 @@ class UserService():
 
         if not valid:
             return {'error': 'Invalid username or password'}, 402
+
+        # The password is only known here, so hashes made with older parameters, or the legacy SHA-256, are upgraded on login
+        if get_password_hasher().needs_rehash(user.password):
+            user.salt, user.password = self.salt_and_hash(password)
+            self.db_session.commit()
+            logger.info('User password hash upgraded')
         
         logger.info('User logged in successfully')
 
-        return self.create_response(user.username, 'User logged in successfully')
+        return self.create_response(user, 'User logged in successfully')
 
     def register(self, data: dict) -> dict:
         username = data['username']
@@ -94,7 +113,7 @@ class UserService():
 
         logger.info('User registered successfully')
         
-        return self.create_response(username, 'User registered successfully')
+        return self.create_response(user, 'User registered successfully')
     
     def update(self, data: dict, username: str) -> dict:
         logger.info('User updating information')
@@ -145,11 +164,12 @@ class UserService():
         if not user:
             return {'error': 'User not found'}, 404
         
-        accounts = user.accounts.all()
+        # The shard sums of hot accounts are selected along with the accounts, rather than queried once per account
+        accounts = user.accounts.with_entities(Account.id, Account.currency, total_balance(), Account.date).order_by(Account.id).all()
         if not accounts:
             return {'message': 'No accounts found'}, 200
         
-        accounts_view = [{'id': account.id, 'currency': currency_map.get(account.currency), 'balance': account.balance, 'date created': account.date} for account in accounts]
+        accounts_view = [{'id': id, 'currency': currency_map.get(currency), 'balance': balance, 'date created': date} for id, currency, balance, date in accounts]
 
         logger.info('Accounts viewed successfully')
 
@@ -163,12 +183,12 @@ class UserService():
         if not user:
             return {'error': 'User not found'}, 404
         
-        for account in user.accounts:
-            if account.balance != 0:
-                return {'error': 'Please withdraw all funds before deleting account', 'account id': account.id}, 402
+        funded_account = user.accounts.filter(total_balance() != 0).order_by(Account.id).first()
+        if funded_account:
+            return {'error': 'Please withdraw all funds before deleting account', 'account id': funded_account.id}, 402
         
-        for account in user.accounts:
-            account.active = False
+        # A single UPDATE for all the accounts instead of loading them and flushing one UPDATE per account
+        user.accounts.update({'active': False}, synchronize_session=False)
         
         user.active = False
         self.db_session.commit()
@@ -177,7 +197,7 @@ class UserService():
 
         return {'message': 'User deleted successfully'}, 200
     
-    def logout(self, username: str, jti: str) -> dict:
+    def logout(self, username: str, jti: str, expires_at: datetime) -> dict:
         logger.info('Logging out user')
 
         user = self.get_user_by_username(username)
@@ -186,15 +206,16 @@ class UserService():
             return {'error': 'User not found'}, 404
         
         date = datetime.now()
-        token = TokenBlocklist(jti=jti, date=date)
+        token = TokenBlocklist(jti=jti, date=date, expires_at=expires_at)
         self.db_session.add(token)
         self.db_session.commit()
+        get_revoked_token_cache().add(jti, expires_at)
 
         logger.info('User logged out successfully')
         
         return {'message': 'User logged out successfully'}, 200
     
-    def refresh(self, username: str, jti: str) -> dict:
+    def refresh(self, username: str, jti: str, expires_at: datetime) -> dict:
         logger.info('Refreshing token')
 
         user = self.get_user_by_username(username)
@@ -203,10 +224,11 @@ class UserService():
             return {'error': 'User not found'}, 404
         
         date = datetime.now()
-        token = TokenBlocklist(jti=jti, date=date)
+        token = TokenBlocklist(jti=jti, date=date, expires_at=expires_at)
         self.db_session.add(token)
         self.db_session.commit()
+        get_revoked_token_cache().add(jti, expires_at)
 
         logger.info('Token refreshed successfully')
 
-        return self.create_response(username, 'Token refreshed successfully')
+        return self.create_response(user, 'Token refreshed successfully')
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+from functools import wraps
+from flask import current_app
+
+
+class AsyncDatabase():
+    '''
+    Async engine and session factory of a worker, with the event loop they are bound to running in a background thread
+    Async views are run on that loop, as an async connection pool can not be shared across the loops Flask would otherwise start per request
+    The request thread waits for its view to finish, so a worker serves no more requests at once than with the sync views
+    '''
+    def __init__(self, uri: str, engine_options: dict):
+        # Imported here so that the async drivers are only needed when the async endpoints are enabled
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        self.engine = create_async_engine(uri, **engine_options)
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='async-db', daemon=True)
+        self.thread.start()
+
+    def async_to_sync(self, func):
+        '''
+        Function to wrap a coroutine function so that calling it from a request thread runs it on the loop and waits for its result
+        The coroutine keeps the context of the calling thread, so the request and application contexts are available in it
+        '''
+        @wraps(func)
+        def run(*args, **kwargs):
+            return asyncio.run_coroutine_threadsafe(func(*args, **kwargs), self.loop).result()
+        return run
+
+    def dispose(self) -> None:
+        asyncio.run_coroutine_threadsafe(self.engine.dispose(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+def init_async_db(app) -> None:
+    '''
+    Function to create the async engine of the worker and run the async views of the application on its event loop
+    '''
+    if not app.config['ASYNC_ENABLED']:
+        return
+
+    async_db = AsyncDatabase(app.config['SQLALCHEMY_ASYNC_DATABASE_URI'], app.config['SQLALCHEMY_ASYNC_ENGINE_OPTIONS'])
+    app.extensions['async_db'] = async_db
+    app.async_to_sync = async_db.async_to_sync
+
+def get_async_session():
+    return current_app.extensions['async_db'].sessionmaker()
@@ -11,3 +11,27 @@ class TransactionType(Enum):
 
 currency_map = {currency.value: currency.name for currency in Currency}
 inverse_currency_map = {currency.name: currency.value for currency in Currency}
+
+DEFAULT_HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 500
+
+EXPORT_CHUNK_SIZE = 1000
+export_mimetypes = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+MAX_BATCH_TRANSFER_SIZE = 1000
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+METRICS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+READ_YOUR_WRITES_COOKIE = 'read_your_writes'
+
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+IDEMPOTENCY_POLL_INTERVAL = 0.05
+
+class PendingTransferStatus(Enum):
+    PENDING = "PENDING"
+    PROCESSING = "PROCESSING"
+    SETTLED = "SETTLED"
+    FAILED = "FAILED"
@@ -0,0 +1,37 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterable, Iterator
+
+
+CSV_COLUMNS = ['type', 'amount', 'transaction date', 'sender', 'sender account id', 'receiver', 'receiver account id', 'account id']
+
+
+def serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'Cannot serialize {type(value).__name__}')
+
+def ndjson_lines(rows: Iterable[dict]) -> Iterator[str]:
+    '''
+    Function to lazily encode rows as newline delimited JSON, one line per row
+    '''
+    for row in rows:
+        yield json.dumps(row, default=serialize) + '\n'
+
+def csv_lines(rows: Iterable[dict]) -> Iterator[str]:
+    '''
+    Function to lazily encode rows as CSV with a header line, reusing a single buffer so memory does not grow with the number of rows
+    '''
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, restval='')
+    writer.writeheader()
+
+    for row in rows:
+        writer.writerow({key: serialize(value) if isinstance(value, datetime) else value for key, value in row.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    yield buffer.getvalue()
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from flask import Response, current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import db
+from src.services.idempotency_service import IdempotencyService
+from src.utils.constants import IDEMPOTENCY_KEY_HEADER, MAX_IDEMPOTENCY_KEY_LENGTH, IDEMPOTENCY_POLL_INTERVAL
+
+
+current_claim = ContextVar('idempotency_claim', default=None)
+
+
+def mark_claim_applied(session) -> None:
+    '''
+    Function to mark the claim of the idempotent view being run as applied in every transaction the view commits, along with its writes
+    Async views commit on their own session, so the claim id is taken from the context rather than from the request session
+    '''
+    id = current_claim.get()
+    if id is not None:
+        IdempotencyService(session).mark_applied(id)
+
+event.listen(Session, 'before_commit', mark_claim_applied)
+
+def request_fingerprint() -> str:
+    '''
+    Function to hash the method, path and payload of the current request, to detect a key reused for a different request
+    '''
+    payload = request.get_json(silent=True) if request.is_json else sorted(request.form.items(multi=True))
+    return hashlib.sha256(json.dumps([request.method, request.path, payload], sort_keys=True, default=str).encode()).hexdigest()
+
+def replay(stored) -> Response:
+    response = Response(stored.response, stored.status, mimetype=stored.mimetype)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def idempotent(view):
+    '''
+    Decorator to run a view at most once per user and Idempotency-Key header, repeated requests get the stored response back and concurrent ones wait for it
+    A claim left pending for IDEMPOTENCY_PROCESSING_TIMEOUT by a worker that died is taken over if its request committed nothing, otherwise its outcome is reported as unknown
+    Responses with a server error are not stored so that the request can be retried, must be applied below jwt_required, async views are supported
+    '''
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if key is None:
+            return current_app.ensure_sync(view)(*args, **kwargs)
+        if not key or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            return jsonify({IDEMPOTENCY_KEY_HEADER: [f'Length must be between 1 and {MAX_IDEMPOTENCY_KEY_LENGTH}.']}), 401
+
+        username = get_jwt_identity()
+        fingerprint = request_fingerprint()
+        idempotency_service = IdempotencyService(db.session)
+        deadline = time.monotonic() + current_app.config['IDEMPOTENCY_WAIT_TIMEOUT']
+
+        while True:
+            stored = idempotency_service.get_key(username, key)
+            if stored and stored.expires_at <= datetime.now():
+                idempotency_service.expire(stored.id)
+                stored = None
+
+            if not stored:
+                id = idempotency_service.claim(username, key, fingerprint, current_app.config['IDEMPOTENCY_KEY_TTL'])
+            elif stored.fingerprint != fingerprint:
+                return jsonify({'error': 'Idempotency key already used for a different request'}), 422
+            elif stored.status is not None:
+                return replay(stored)
+            elif stored.claimed_at > datetime.now() - current_app.config['IDEMPOTENCY_PROCESSING_TIMEOUT']:
+                id = None
+            elif stored.applied_at is None:
+                # The request holding the claim died before committing anything, running it again can not apply it twice
+                id = idempotency_service.take_over(stored)
+            else:
+                return jsonify({'error': 'The outcome of the request with this idempotency key is unknown, check the transaction history before retrying with a new key'}), 409
+
+            if id:
+                break
+            if time.monotonic() >= deadline:
+                return jsonify({'error': 'A request with this idempotency key is still being processed'}), 409
+
+            # Ending the transaction expires the loaded key, so the next pass reads the latest committed state
+            db.session.rollback()
+            time.sleep(IDEMPOTENCY_POLL_INTERVAL)
+
+        token = current_claim.set(id)
+        try:
+            response = current_app.make_response(current_app.ensure_sync(view)(*args, **kwargs))
+        except Exception:
+            idempotency_service.release(id)
+            raise
+        finally:
+            current_claim.reset(token)
+
+        if response.status_code >= 500:
+            idempotency_service.release(id)
+        else:
+            idempotency_service.complete(id, response.status_code, response.get_data(as_text=True), response.mimetype)
+
+        return response
+    return wrapper
@@ -0,0 +1,21 @@
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(date: datetime, id: int) -> str:
+    '''
+    Function to encode the (date, id) position of the last returned row into an opaque cursor
+    '''
+    payload = json.dumps([date.isoformat(), id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    '''
+    Function to decode a cursor produced by encode_cursor, raises ValueError if it is malformed
+    '''
+    try:
+        date, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(date), int(id)
+    except (TypeError, ValueError) as error:
+        raise ValueError('Invalid cursor') from error
@@ -0,0 +1,118 @@
+import hashlib
+import hmac
+import multiprocessing
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from flask import current_app
+
+
+@dataclass(frozen=True)
+class HashParameters():
+    '''
+    Key derivation settings, stored with every hash as <scheme>$<parameters>$<hex digest>, the single SHA-256 hashes stored before have no scheme
+    '''
+    scheme: str = 'scrypt'
+    scrypt_n: int = 2 ** 15
+    scrypt_r: int = 8
+    scrypt_p: int = 1
+    pbkdf2_iterations: int = 600000
+
+    def encode(self) -> str:
+        match self.scheme:
+            case 'scrypt':
+                return f'scrypt${self.scrypt_n}${self.scrypt_r}${self.scrypt_p}'
+            case 'pbkdf2_sha256':
+                return f'pbkdf2_sha256${self.pbkdf2_iterations}'
+            case _:
+                raise ValueError(f'Unsupported password hash scheme: {self.scheme}')
+
+
+def derive(password: str, salt: str, parameters: str) -> str:
+    '''
+    Function to run the key derivation described by encoded parameters, returns the hex digest
+    '''
+    scheme, *values = parameters.split('$')
+    match scheme:
+        case 'scrypt':
+            n, r, p = map(int, values)
+            return hashlib.scrypt(password.encode(), salt=salt.encode(), n=n, r=r, p=p, maxmem=256 * n * r, dklen=32).hex()
+        case 'pbkdf2_sha256':
+            return hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), int(values[0])).hex()
+        case _:
+            raise ValueError(f'Unsupported password hash scheme: {scheme}')
+
+def salt_and_hash(password: str, parameters: HashParameters) -> tuple[str, str]:
+    '''
+    Function to generate a salt and hash a password with the given parameters, returns the salt and the encoded hash to store
+    '''
+    salt = secrets.token_hex(16)
+    encoded = parameters.encode()
+    return salt, f'{encoded}${derive(password, salt, encoded)}'
+
+def verify(password: str, salt: str, stored: str) -> bool:
+    '''
+    Function to check a password against a stored hash, with the parameters it was created with
+    '''
+    encoded, separator, digest = stored.rpartition('$')
+    if not separator:
+        digest, computed = stored, hashlib.sha256((password + salt).encode()).hexdigest()
+    else:
+        computed = derive(password, salt, encoded)
+    return hmac.compare_digest(digest, computed)
+
+
+class PasswordHasher():
+    '''
+    Runs the key derivations in a pool of processes sized to the cores, request threads only wait on the result
+    However many logins arrive at once, only as many derivations as there are processes run, which bounds the CPU and memory they take from the other requests
+    The pool is started on first use with spawned processes, forking a worker that already runs threads is not safe
+    '''
+    def __init__(self, parameters: HashParameters, workers: int):
+        self.parameters = parameters
+        self.workers = workers
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def run(self, function, *args):
+        if not self.workers:
+            return function(*args)
+
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self.executor.submit(function, *args).result()
+
+    def hash(self, password: str) -> tuple[str, str]:
+        return self.run(salt_and_hash, password, self.parameters)
+
+    def verify(self, password: str, salt: str, stored: str) -> bool:
+        return self.run(verify, password, salt, stored)
+
+    def needs_rehash(self, stored: str) -> bool:
+        '''
+        Function to tell whether a stored hash was made with other parameters than the current ones, including the legacy SHA-256 hashes
+        '''
+        return stored.rpartition('$')[0] != self.parameters.encode()
+
+    def shutdown(self) -> None:
+        if self.executor:
+            self.executor.shutdown()
+            self.executor = None
+
+
+def init_password_hasher(app) -> None:
+    parameters = HashParameters(
+        scheme=app.config['PASSWORD_HASH_SCHEME'],
+        scrypt_n=app.config['PASSWORD_SCRYPT_N'],
+        scrypt_r=app.config['PASSWORD_SCRYPT_R'],
+        scrypt_p=app.config['PASSWORD_SCRYPT_P'],
+        pbkdf2_iterations=app.config['PASSWORD_PBKDF2_ITERATIONS'],
+    )
+    # Fails on start up rather than on the first registration when the scheme is unknown
+    parameters.encode()
+    app.extensions['password_hasher'] = PasswordHasher(parameters, app.config['PASSWORD_HASH_WORKERS'])
+
+def get_password_hasher() -> PasswordHasher:
+    return current_app.extensions['password_hasher']
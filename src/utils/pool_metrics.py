@@ -0,0 +1,65 @@
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+
+class MeteredQueuePool(QueuePool):
+    '''
+    QueuePool that also records how long checkouts wait for a connection, opening it included, and how many of them time out
+    The public connect is timed since the checkout and connect pool events only fire once the connection is handed over, after the wait
+    '''
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            with self.metrics_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            wait = time.perf_counter() - start
+            with self.metrics_lock:
+                self.checkouts += 1
+                self.wait_time += wait
+                self.max_wait_time = max(self.max_wait_time, wait)
+
+
+def configure_pool_metrics(app) -> None:
+    '''
+    Function to make pooled engines use the metered pool, must run before the database extension creates its engines
+    '''
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    if 'pool_size' in options:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**options, 'poolclass': MeteredQueuePool}
+
+def pool_metrics(engine) -> dict:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {'pool': type(pool).__name__, 'status': pool.status()}
+
+    metrics = {
+        'pool': type(pool).__name__,
+        'size': pool.size(),
+        'checked out': pool.checkedout(),
+        'idle': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+    }
+    if isinstance(pool, MeteredQueuePool):
+        with pool.metrics_lock:
+            metrics.update({
+                'checkouts': pool.checkouts,
+                'timeouts': pool.timeouts,
+                'wait time': pool.wait_time,
+                'average wait time': pool.wait_time / pool.checkouts if pool.checkouts else 0.0,
+                'max wait time': pool.max_wait_time,
+            })
+    return metrics
@@ -0,0 +1,61 @@
+from datetime import datetime
+from sqlalchemy import select, text, func, and_, or_
+from sqlalchemy.sql import Select
+
+from src.models.account_model import Account
+from src.models.account_shard_model import AccountShard
+from src.models.balance_snapshot_model import BalanceSnapshot
+from src.models.idempotency_key_model import IdempotencyKey
+from src.models.token_blocklist_model import TokenBlocklist
+from src.models.transaction_model import Transaction
+from src.models.user_model import User
+from src.services.account_service import AccountService
+
+
+def hot_queries(db_session) -> dict[str, Select]:
+    '''
+    Function to build the statements issued on the hot request paths, with representative parameters
+    '''
+    account_service = AccountService(db_session)
+    account_ids = select(Account.id).where(Account.user_id == 1)
+
+    return {
+        'user by username': select(User).where(User.username == 'username'),
+        'account by user': select(Account).where(Account.id == 1, Account.user_id == 1, Account.active),
+        'transfer receiver': select(User.id, Account).outerjoin(Account, and_(Account.user_id == User.id, Account.id == 1, Account.active)).where(User.username == 'username', User.active),
+        'hot account shard balance': select(func.sum(AccountShard.balance)).where(AccountShard.account_id == 1),
+        'active accounts by user': select(Account.id).where(Account.user_id == 1, Account.active),
+        'unexpired revoked tokens': select(TokenBlocklist.jti, TokenBlocklist.expires_at).where(TokenBlocklist.expires_at > datetime.now()),
+        'idempotency key by user': select(IdempotencyKey).where(IdempotencyKey.username == 'username', IdempotencyKey.key == 'key'),
+        'recently revoked tokens': select(TokenBlocklist.jti, TokenBlocklist.expires_at).where(TokenBlocklist.date >= datetime.now()),
+        'transaction history page': account_service.history_page_statement([1], 50),
+        'transaction history next page': account_service.history_page_statement([1], 50, (datetime.now(), 1)),
+        'all transaction history': account_service.history_statement(account_ids),
+        'balance snapshot before day': select(BalanceSnapshot.day, BalanceSnapshot.balance).where(BalanceSnapshot.account_id == 1, BalanceSnapshot.day < datetime.now().date()).order_by(BalanceSnapshot.day.desc()).limit(1),
+        'transactions since snapshot': select(Transaction.amount).where(or_(Transaction.sender_id == 1, Transaction.receiver_id == 1), Transaction.date >= datetime.now(), Transaction.date <= datetime.now()),
+    }
+
+def find_full_scans(db_session, statement: Select) -> list[str]:
+    '''
+    Function to explain a statement against the bound database and return the plan steps that read a whole table instead of using an index
+    '''
+    dialect = db_session.get_bind().dialect
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+    match dialect.name:
+        case 'sqlite':
+            steps = [row.detail for row in db_session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+            return [step for step in steps if step.startswith('SCAN ')]
+        case 'postgresql':
+            # Small tables are cheaper to read sequentially, disabling seq scans makes the planner only choose one when no index is usable
+            db_session.execute(text('SET LOCAL enable_seqscan = off'))
+            plan = db_session.execute(text(f'EXPLAIN (FORMAT JSON) {sql}')).scalar()[0]['Plan']
+            db_session.rollback()
+            return [f"{node['Node Type']} on {node['Relation Name']}" for node in walk_plan(plan) if node['Node Type'] == 'Seq Scan']
+        case _:
+            raise ValueError(f'Unsupported dialect: {dialect.name}')
+
+def walk_plan(node: dict):
+    yield node
+    for child in node.get('Plans', []):
+        yield from walk_plan(child)
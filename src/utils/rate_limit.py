@@ -0,0 +1,184 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from flask import current_app, request, jsonify
+from flask_jwt_extended import decode_token
+
+from logger import logger
+
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+@dataclass(frozen=True)
+class Limit():
+    '''
+    Token bucket holding up to capacity tokens and refilled with rate tokens per second, every request takes one
+    '''
+    capacity: int
+    rate: float
+
+def parse_limit(value: str) -> Limit | None:
+    '''
+    Function to parse a limit written as <requests>/<second|minute|hour|day>, returns None for unlimited
+    '''
+    value = value.strip().lower()
+    if value == 'unlimited':
+        return None
+
+    count, _, period = value.partition('/')
+    if not count.isdigit() or int(count) < 1 or period not in PERIODS:
+        raise ValueError(f'Invalid rate limit: {value}, expected <requests>/<second|minute|hour|day> or unlimited')
+    return Limit(int(count), int(count) / PERIODS[period])
+
+def parse_limits(value: str) -> dict:
+    '''
+    Function to parse the per route limits, written as comma separated <route> <limit> pairs
+    '''
+    limits = {}
+    for entry in value.split(','):
+        if entry.strip():
+            route, _, limit = entry.strip().rpartition(' ')
+            limits[route.strip()] = parse_limit(limit)
+    return limits
+
+
+class MemoryBackend():
+    '''
+    Buckets of the worker process, each one is its token count and the time it was last updated, and is refilled lazily when taken from
+    Buckets are kept in least recently used order and the oldest ones are evicted past max_keys, so memory and the work done under the lock stay bounded however many clients there are
+    '''
+    def __init__(self, max_keys: int = 100000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def take(self, key: str, limit: Limit) -> float:
+        '''
+        Function to take a token from the bucket of key, returns 0 when there was one or else the seconds until there is
+        '''
+        now = self.clock()
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - updated) * limit.rate)
+            retry_after = 0.0
+            if tokens < 1:
+                retry_after = (1 - tokens) / limit.rate
+            else:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return retry_after
+
+class RedisBackend():
+    '''
+    Buckets shared by every worker in Redis, each one is taken from by a script so that the refill and the take are atomic
+    Any client with the redis-py interface can be given, such as a fakeredis one standing in for the server locally
+    When Redis can not be reached requests are let through, the limits are lifted rather than the API taken down with it
+    '''
+    SCRIPT = '''
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = math.min(capacity, (tonumber(bucket[1]) or capacity) + (now - (tonumber(bucket[2]) or now)) * rate)
+local retry_after = 0
+if tokens < 1 then
+    retry_after = (1 - tokens) / rate
+else
+    tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1)
+return tostring(retry_after)
+'''
+
+    def __init__(self, client):
+        # Imported here so that the redis package is only needed when the buckets are shared
+        from redis import RedisError
+
+        self.errors = RedisError
+        self.client = client
+        self.script = client.register_script(self.SCRIPT)
+        self.available = True
+
+    @classmethod
+    def from_url(cls, uri: str) -> 'RedisBackend':
+        import redis
+
+        return cls(redis.Redis.from_url(uri, socket_timeout=0.1, socket_connect_timeout=0.1))
+
+    def take(self, key: str, limit: Limit) -> float:
+        try:
+            retry_after = float(self.script(keys=[f'rate-limit:{key}'], args=[limit.capacity, limit.rate]))
+        except self.errors:
+            if self.available:
+                logger.warning('Rate limit storage is unreachable, requests are not limited')
+            self.available = False
+            return 0.0
+
+        if not self.available:
+            logger.warning('Rate limit storage is back up')
+        self.available = True
+        return retry_after
+
+
+class RateLimiter():
+    '''
+    Limits the requests of every route per client address and per JWT identity, each with its own bucket holding the limit of the route
+    Runs before the view, so a rejected request does no database work, the identity is read from the token signature alone without the blocklist
+    '''
+    def __init__(self, backend, default: Limit | None, limits: dict):
+        self.backend = backend
+        self.default = default
+        self.limits = limits
+
+    def identity(self) -> str | None:
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme != 'Bearer' or not token:
+            return None
+        try:
+            return decode_token(token)['sub']
+        except Exception:
+            # Invalid and expired tokens are rejected by the view, only the address bucket applies to them
+            return None
+
+    def check(self):
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        limit = self.limits.get(route, self.default)
+        if limit is None:
+            return None
+
+        retry_after = self.backend.take(f'{route}:ip:{request.remote_addr}', limit)
+        if not retry_after and (identity := self.identity()) is not None:
+            retry_after = self.backend.take(f'{route}:user:{identity}', limit)
+        if not retry_after:
+            return None
+
+        response = jsonify({'error': 'Too many requests'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+
+def init_rate_limiting(app) -> None:
+    '''
+    Function to check the rate limits of every request before it is dispatched to its view
+    '''
+    if not app.config['RATE_LIMIT_ENABLED']:
+        return
+
+    uri = app.config['RATE_LIMIT_STORAGE_URI']
+    backend = RedisBackend.from_url(uri) if uri else MemoryBackend(app.config['RATE_LIMIT_MAX_KEYS'])
+    limiter = RateLimiter(backend, parse_limit(app.config['RATE_LIMIT_DEFAULT']), parse_limits(app.config['RATE_LIMITS']))
+    app.extensions['rate_limiter'] = limiter
+    app.before_request(limiter.check)
+
+def get_rate_limiter() -> RateLimiter:
+    return current_app.extensions['rate_limiter']
@@ -0,0 +1,164 @@
+import itertools
+import math
+import threading
+import time
+from functools import wraps
+from flask import current_app, has_app_context, request
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from flask_sqlalchemy.session import Session
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import create_engine, event, text
+
+from logger import logger
+from src.utils.constants import READ_YOUR_WRITES_COOKIE
+
+
+class Replica():
+    '''
+    Read replica engine with its health, checked with a ping at most once per check interval by the first request that finds the check due
+    '''
+    def __init__(self, engine, check_interval: float):
+        self.engine = engine
+        self.check_interval = check_interval
+        self.healthy = True
+        self.next_check = 0.0
+        self.lock = threading.Lock()
+
+        event.listen(engine, 'handle_error', self.on_error)
+
+    def on_error(self, context) -> None:
+        if context.is_disconnect:
+            self.mark(False)
+
+    def mark(self, healthy: bool) -> None:
+        if healthy != self.healthy:
+            logger.warning('Read replica %s is %s', self.engine.url.render_as_string(hide_password=True), 'back up' if healthy else 'down')
+        self.healthy = healthy
+        self.next_check = time.monotonic() + self.check_interval
+
+    def check(self) -> None:
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+            self.mark(True)
+        except Exception:
+            self.mark(False)
+
+    def is_healthy(self) -> bool:
+        # Only one thread runs a due check, the others keep using the last known state instead of waiting on it
+        if time.monotonic() >= self.next_check and self.lock.acquire(blocking=False):
+            try:
+                self.check()
+            finally:
+                self.lock.release()
+        return self.healthy
+
+class ReplicaRouter():
+    '''
+    Hands out the healthy read replicas in turn and signs the write markers of the users who wrote recently, whose reads must stay on the primary until the replicas caught up
+    The marker travels with the client in a cookie, so that it holds whichever worker serves the next request, tokens issued within the window also read from the primary which covers logins and registrations
+    '''
+    def __init__(self, uris: list[str], engine_options: dict, check_interval: float, read_your_writes_window: float, secret_key: str):
+        self.replicas = [Replica(create_engine(uri, **engine_options), check_interval) for uri in uris]
+        self.read_your_writes_window = read_your_writes_window
+        self.turn = itertools.count()
+        self.serializer = URLSafeTimedSerializer(secret_key, salt='read-your-writes')
+
+    def replica(self):
+        '''
+        Function to return the engine of the next healthy replica, or None when all of them are down
+        '''
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self.turn) % len(self.replicas)]
+            if replica.is_healthy():
+                return replica.engine
+        return None
+
+    def write_marker(self, identity: str) -> str:
+        return self.serializer.dumps(identity)
+
+    def wrote_recently(self, marker: str, identity: str) -> bool:
+        '''
+        Function to check that a write marker was signed for this user within the read your writes window
+        '''
+        if not marker:
+            return False
+        try:
+            return self.serializer.loads(marker, max_age=self.read_your_writes_window) == identity
+        except BadSignature:
+            return False
+
+    def dispose(self) -> None:
+        for replica in self.replicas:
+            replica.engine.dispose()
+
+class RoutingSession(Session):
+    '''
+    Session that sends reads to a replica while the replica flag is set in its info, writes, flushes and locking reads always go to the primary
+    The replica is picked on the first read and kept until the flag is cleared, so that the reads of a request see one point of the replication and hold one connection
+    '''
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        writes = self._flushing or getattr(clause, 'is_dml', False) or getattr(clause, '_for_update_arg', None) is not None
+        if writes:
+            self.info['wrote'] = True
+        elif bind is None and self.info.get('replica') and has_app_context():
+            if 'replica_engine' not in self.info:
+                router = current_app.extensions.get('replica_router')
+                self.info['replica_engine'] = router.replica() if router else None
+            if self.info['replica_engine'] is not None:
+                return self.info['replica_engine']
+
+        return super().get_bind(mapper, clause, bind, **kwargs)
+
+
+def init_replicas(app) -> None:
+    '''
+    Function to create the engines of the configured read replicas and give the users whose requests wrote to the primary a write marker cookie
+    '''
+    if not app.config['SQLALCHEMY_REPLICA_URIS']:
+        return
+
+    router = ReplicaRouter(app.config['SQLALCHEMY_REPLICA_URIS'], app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}), app.config['DB_REPLICA_CHECK_INTERVAL'], app.config['DB_READ_YOUR_WRITES_WINDOW'], app.config['JWT_SECRET_KEY'])
+    app.extensions['replica_router'] = router
+
+    @app.after_request
+    def remember_writer(response):
+        if app.extensions['sqlalchemy'].session.info.pop('wrote', False):
+            try:
+                identity = get_jwt_identity()
+            except RuntimeError:
+                identity = None
+            if identity:
+                response.set_cookie(READ_YOUR_WRITES_COOKIE, router.write_marker(identity), max_age=math.ceil(router.read_your_writes_window), secure=request.is_secure, httponly=True, samesite='Strict')
+        return response
+
+def read_replica(view):
+    '''
+    Decorator to run a read only view against a read replica, unless the user wrote or logged in within the read your writes window
+    Streamed responses keep reading from the replica until they are closed, must be applied below jwt_required and the view must not write
+    '''
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        router = current_app.extensions.get('replica_router')
+        if not router or router.wrote_recently(request.cookies.get(READ_YOUR_WRITES_COOKIE), get_jwt_identity()) or get_jwt().get('iat', 0) > time.time() - router.read_your_writes_window:
+            return view(*args, **kwargs)
+
+        info = current_app.extensions['sqlalchemy'].session.info
+
+        def use_primary():
+            info.pop('replica', None)
+            info.pop('replica_engine', None)
+
+        info['replica'] = True
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except BaseException:
+            use_primary()
+            raise
+
+        if response.is_streamed:
+            response.call_on_close(use_primary)
+        else:
+            use_primary()
+        return response
+    return wrapper
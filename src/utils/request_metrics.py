@@ -0,0 +1,138 @@
+import bisect
+import hmac
+import threading
+import time
+from functools import wraps
+from flask import abort, current_app, g, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.utils.constants import LATENCY_BUCKETS, QUERY_COUNT_BUCKETS
+from src.utils.pool_metrics import pool_metrics
+
+
+class Histogram():
+    '''
+    Cumulative histogram keyed by label values, rendered in the Prometheus text format
+    '''
+    def __init__(self, name: str, description: str, labels: tuple[str, ...], buckets: tuple[float, ...]):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, values: tuple[str, ...], amount: float) -> None:
+        counts, total = self.series.get(values, ([0] * (len(self.buckets) + 1), 0.0))
+        counts[bisect.bisect_left(self.buckets, amount)] += 1
+        self.series[values] = (counts, total + amount)
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        for values, (counts, total) in sorted(self.series.items()):
+            labels = format_labels(self.labels, values)
+            cumulative = 0
+            for bound, count in zip([*map(str, self.buckets), '+Inf'], counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+class RequestMetrics():
+    '''
+    Request counts, latencies and database usage per route of this worker, every worker process keeps and exposes its own
+    '''
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.latency = Histogram('p2p_http_request_duration_seconds', 'Time spent handling a request.', ('endpoint', 'method'), LATENCY_BUCKETS)
+        self.statements = Histogram('p2p_db_statements_per_request', 'Number of SQL statements executed by a request.', ('endpoint', 'method'), QUERY_COUNT_BUCKETS)
+        self.db_time = Histogram('p2p_db_time_per_request_seconds', 'Time a request spent executing SQL statements.', ('endpoint', 'method'), LATENCY_BUCKETS)
+
+    def record(self, endpoint: str, method: str, status: int, duration: float, statements: int, db_time: float) -> None:
+        with self.lock:
+            key = (endpoint, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.observe((endpoint, method), duration)
+            self.statements.observe((endpoint, method), statements)
+            self.db_time.observe((endpoint, method), db_time)
+
+    def render(self, engine=None) -> str:
+        with self.lock:
+            lines = ['# HELP p2p_http_requests_total Requests handled, by route and status code.', '# TYPE p2p_http_requests_total counter']
+            for values, count in sorted(self.requests.items()):
+                lines.append(f"p2p_http_requests_total{{{format_labels(('endpoint', 'method', 'status'), values)}}} {count}")
+            lines += self.latency.render() + self.statements.render() + self.db_time.render()
+
+        if engine is not None:
+            for name, value in pool_metrics(engine).items():
+                if isinstance(value, (int, float)):
+                    metric = 'p2p_db_pool_' + name.replace(' ', '_')
+                    lines += [f'# TYPE {metric} gauge', f'{metric} {value}']
+
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    return ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values))
+
+def escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def count_statement_start(conn, cursor, statement, parameters, context, executemany):
+    # The start is kept on the execution context, which is dropped with the statement even when it fails and after_cursor_execute never runs
+    if context is not None and has_request_context() and 'sql_statements' in g:
+        context.p2p_statement_start = time.perf_counter()
+
+def count_statement_end(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, 'p2p_statement_start', None)
+    if start is not None and has_request_context() and 'sql_statements' in g:
+        g.sql_statements += 1
+        g.sql_time += time.perf_counter() - start
+        context.p2p_statement_start = None
+
+def init_request_metrics(app) -> None:
+    '''
+    Function to time every request and count the SQL statements it executes, the statements are counted with cursor execute events on every engine
+    '''
+    app.extensions['request_metrics'] = RequestMetrics()
+
+    if not event.contains(Engine, 'before_cursor_execute', count_statement_start):
+        event.listen(Engine, 'before_cursor_execute', count_statement_start)
+        event.listen(Engine, 'after_cursor_execute', count_statement_end)
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_start = time.perf_counter()
+        g.sql_statements = 0
+        g.sql_time = 0.0
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'request_start' in g:
+            # Unmatched urls share one label so that scanners can not create a series per path
+            endpoint = request.endpoint or 'unmatched'
+            app.extensions['request_metrics'].record(endpoint, request.method, response.status_code, time.perf_counter() - g.pop('request_start'), g.pop('sql_statements'), g.pop('sql_time'))
+        return response
+
+def get_request_metrics() -> RequestMetrics:
+    return current_app.extensions['request_metrics']
+
+def protected_metrics(view):
+    '''
+    Decorator to serve a metrics view only when METRICS_ENABLED is set, and only to requests bearing METRICS_TOKEN when one is configured
+    '''
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config['METRICS_ENABLED']:
+            abort(404)
+
+        token = current_app.config['METRICS_TOKEN']
+        if token:
+            scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+            if scheme != 'Bearer' or not hmac.compare_digest(credentials.encode(), token.encode()):
+                return jsonify({'error': 'Invalid metrics token'}), 401
+
+        return view(*args, **kwargs)
+    return wrapper
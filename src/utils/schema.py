@@ -0,0 +1,82 @@
+import ast
+import os
+import sys
+import click
+from sqlalchemy import text
+
+from logger import logger
+from extensions import db
+
+
+MIGRATIONS_DIRECTORY = 'migrations'
+# flask db has to work on a database that is behind, export-apispec runs at deploy time without one
+UNCHECKED_COMMANDS = {'db', 'export-apispec'}
+
+
+def migrations_directory(app) -> str:
+    return os.path.join(app.root_path, MIGRATIONS_DIRECTORY)
+
+def cli_command() -> str | None:
+    '''
+    Function to return the name of the flask command being run, None outside of the CLI
+    The app is created while the group resolves the command, before its context exists, so the name is parsed from the arguments with the options of the group
+    '''
+    context = click.get_current_context(silent=True)
+    if context is None:
+        return None
+
+    root = context.find_root()
+    _, args, _ = root.command.make_parser(root).parse_args(sys.argv[1:])
+    return args[0] if args else None
+
+def database_revisions(engine) -> set[str]:
+    with engine.connect() as connection:
+        if not engine.dialect.has_table(connection, 'alembic_version'):
+            return set()
+        return set(connection.execute(text('SELECT version_num FROM alembic_version')).scalars())
+
+def migration_heads(directory: str) -> set[str]:
+    '''
+    Function to find the head revisions from the revision identifiers declared by the migration scripts, parsed without importing them or loading alembic
+    '''
+    revisions, parents = set(), set()
+    versions = os.path.join(directory, 'versions')
+
+    for name in os.listdir(versions):
+        if not name.endswith('.py'):
+            continue
+        with open(os.path.join(versions, name)) as file:
+            tree = ast.parse(file.read())
+
+        for node in tree.body:
+            target = node.targets[0] if isinstance(node, ast.Assign) else getattr(node, 'target', None)
+            if not isinstance(target, ast.Name) or node.value is None:
+                continue
+            if target.id == 'revision':
+                revisions.add(ast.literal_eval(node.value))
+            elif target.id == 'down_revision':
+                parent = ast.literal_eval(node.value)
+                parents.update(parent if isinstance(parent, (tuple, list)) else [parent] if parent else [])
+
+    return revisions - parents
+
+def check_schema(app) -> None:
+    '''
+    Function to compare the revision the database was migrated to with the head of the migrations, a single query instead of creating the missing tables at every start
+    SCHEMA_CHECK set to strict refuses to start on a mismatch, warn only logs it and off skips the check
+    '''
+    mode = app.config['SCHEMA_CHECK']
+    if mode == 'off' or cli_command() in UNCHECKED_COMMANDS:
+        return
+
+    with app.app_context():
+        current = database_revisions(db.engine)
+    heads = migration_heads(migrations_directory(app))
+
+    if current == heads:
+        return
+
+    message = f"Database schema is at revision {', '.join(sorted(current)) or 'none'} but the migrations head is {', '.join(sorted(heads))}, run flask db upgrade"
+    if mode == 'strict':
+        raise RuntimeError(message)
+    logger.warning(message)
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+import threading
+from flasgger import Swagger
+from flask import Response, current_app, request
+
+
+class CachedSwagger(Swagger):
+    '''
+    Swagger extension that builds each spec once, from the controller docstrings or from a prebuilt spec file, and serves it with an ETag
+    flasgger rebuilds the spec on every request in debug mode and serializes it on every request otherwise
+    '''
+    def __init__(self, *args, spec_file: str = None, **kwargs):
+        self.spec_file = spec_file
+        self.spec_responses = {}
+        self.spec_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def init_app(self, app, decorators=None):
+        super().init_app(app, decorators)
+
+        if self.spec_file and not os.path.isabs(self.spec_file):
+            self.spec_file = os.path.join(app.root_path, self.spec_file)
+
+        blueprint = self.config.get('endpoint', 'flasgger')
+        for endpoint in self.endpoints:
+            app.view_functions[f'{blueprint}.{endpoint}'] = self.spec_view(endpoint)
+
+    def get_apispecs(self, endpoint: str = 'apispec_1') -> dict:
+        '''
+        Function to get a spec, read from the spec file for the main spec when the file exists and built from the docstrings otherwise, either way only once
+        '''
+        if endpoint not in self.apispecs:
+            if self.spec_file and endpoint == self.endpoints[0] and os.path.exists(self.spec_file):
+                with open(self.spec_file) as file:
+                    self.apispecs[endpoint] = json.load(file)
+            else:
+                return super().get_apispecs(endpoint)
+        return self.apispecs[endpoint]
+
+    def build_apispecs(self, endpoint: str = 'apispec_1') -> dict:
+        '''
+        Function to build a spec from the docstrings, ignoring the spec file and the cache
+        '''
+        self.apispecs.pop(endpoint, None)
+        return super().get_apispecs(endpoint)
+
+    def spec_view(self, endpoint: str):
+        # flasgger inspects the source of every view function, so the view must be a plain function
+        def view():
+            return self.spec_response(endpoint)
+        return view
+
+    def spec_response(self, endpoint: str) -> Response:
+        if endpoint not in self.spec_responses:
+            with self.spec_lock:
+                if endpoint not in self.spec_responses:
+                    body = current_app.json.dumps(self.get_apispecs(endpoint)).encode()
+                    self.spec_responses[endpoint] = (body, hashlib.sha256(body).hexdigest())
+
+        body, etag = self.spec_responses[endpoint]
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        # Clients keep the spec but check that it is still current, which costs a 304 without a body
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
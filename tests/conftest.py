@@ -1,5 +1,7 @@
 import pytest
 import os
+from contextlib import contextmanager
+from sqlalchemy import event
 
 
 from app import create_app
@@ -22,3 +24,38 @@ def app():
 @pytest.fixture()
 def client(app):
     return app.test_client()
+
+@pytest.fixture()
+def access_token(client):
+    response = client.put('/user/register', data={'username': 'owner', 'email': 'owner@test.test', 'first_name': 'owner', 'last_name': 'owner', 'password': 'owner', 'confirm_password': 'owner'})
+    return response.json['user']['access']
+
+@pytest.fixture()
+def account_id(client, access_token):
+    response = client.put('/account/create', data={'currency': 'USD'}, headers={'Authorization': f'Bearer {access_token}'})
+    return response.json['account id']
+
+@pytest.fixture()
+def query_budget(app):
+    '''
+    Fixture to fail a test when a block issues more SQL statements than its budget, the statements issued are listed in the failure
+    Usage: with query_budget(3): client.get(...)
+    '''
+    @contextmanager
+    def budget(limit: int):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        if len(statements) > limit:
+            listing = '\n'.join(f'{number}. {statement}' for number, statement in enumerate(statements, 1))
+            pytest.fail(f'{len(statements)} SQL statements issued, the budget is {limit}:\n{listing}', pytrace=False)
+
+    return budget
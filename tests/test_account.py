@@ -1,3 +1,4 @@
+import json
 import pytest
 from tests.conftest import client
 from tests.test_user import response
@@ -74,3 +75,97 @@ def test_delete(client, response, account_response):
     response = client.get('/account/balance', data={'id': account_id}, headers={'Authorization': f'Bearer {access_token}'})
     assert response.status_code == 404
     assert response.json['error'] == 'Account not found'
+
+def test_transaction_history_pagination(client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    for amount in range(1, 6):
+        client.put('/transaction/deposit', data={'id': account_id, 'amount': amount}, headers=headers)
+
+    amounts = []
+    cursor = None
+    while True:
+        data = {'id': account_id, 'limit': 2}
+        if cursor:
+            data['cursor'] = cursor
+        response = client.post('/account/view-transaction-history', data=data, headers=headers)
+        assert response.status_code == 200
+        assert len(response.json['transactions']) <= 2
+        amounts.extend(transaction['amount'] for transaction in response.json['transactions'])
+        cursor = response.json['next cursor']
+        if not cursor:
+            break
+
+    assert amounts == [5, 4, 3, 2, 1]
+
+    response = client.post('/account/view-transaction-history', data={'id': account_id, 'cursor': 'not-a-cursor'}, headers=headers)
+    assert response.status_code == 401
+
+def test_export_all_transaction_history(client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    for amount in range(1, 4):
+        client.put('/transaction/deposit', data={'id': account_id, 'amount': amount}, headers=headers)
+
+    response = client.get('/account/export-all-transaction-history', headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)['amount'] for line in lines] == [3, 2, 1]
+
+    response = client.get('/account/export-all-transaction-history', query_string={'format': 'csv'}, headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0].startswith('type,amount,transaction date')
+    assert len(lines) == 4
+
+    response = client.get('/account/export-all-transaction-history', query_string={'end': '2000-01-01T00:00:00'}, headers=headers)
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == ''
+
+    response = client.get('/account/export-all-transaction-history', query_string={'start': '2001-01-01T00:00:00', 'end': '2000-01-01T00:00:00'}, headers=headers)
+    assert response.status_code == 401
+
+def test_legacy_token_without_user_id(app, client, access_token, account_id):
+    from flask_jwt_extended import create_access_token, decode_token
+
+    assert decode_token(access_token)['user_id'] == 1
+
+    legacy_token = create_access_token(identity='owner')
+    response = client.post('/account/balance', data={'id': account_id}, headers={'Authorization': f'Bearer {legacy_token}'})
+    assert response.status_code == 200
+    assert response.json['account']['id'] == account_id
+
+    legacy_token = create_access_token(identity='nobody')
+    response = client.post('/account/balance', data={'id': account_id}, headers={'Authorization': f'Bearer {legacy_token}'})
+    assert response.status_code == 404
+    assert response.json['error'] == 'User not found'
+
+def test_history_query_budget(client, access_token, account_id, query_budget):
+    headers = {'Authorization': f'Bearer {access_token}'}
+
+    # One statement for the history, plus one when the revoked token cache is due for a refresh
+    for deposits in [1, 30]:
+        for _ in range(deposits):
+            client.put('/transaction/deposit', data={'id': account_id, 'amount': 1}, headers=headers)
+
+        with query_budget(2):
+            response = client.get('/account/view-all-transaction-history', headers=headers)
+        assert len(response.json['transactions']) in [1, 31]
+
+        with query_budget(3):
+            response = client.post('/account/view-transaction-history', data={'id': account_id, 'limit': 500}, headers=headers)
+        assert len(response.json['transactions']) in [1, 31]
+
+def test_history_of_deleted_user(client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 5}, headers=headers)
+    client.put('/transaction/withdraw', data={'id': account_id, 'amount': 5}, headers=headers)
+    assert client.delete('/user/delete', headers=headers).status_code == 200
+
+    response = client.get('/account/view-all-transaction-history', headers=headers)
+    assert response.status_code == 200
+    assert response.json['transactions'] == []
+
+    response = client.get('/account/export-all-transaction-history', headers=headers)
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == ''
@@ -0,0 +1,48 @@
+import os
+import pytest
+
+from app import create_app
+from extensions import db
+from src.models.idempotency_key_model import IdempotencyKey
+
+
+@pytest.fixture()
+def async_app(tmp_path, monkeypatch):
+    # The sync and async engines must share a database, which in memory SQLite databases can not
+    monkeypatch.setenv('FLASK_ENV', 'testing')
+    monkeypatch.setenv('SQLALCHEMY_DATABASE_URI_TEST', f"sqlite:///{tmp_path / 'async.db'}")
+    monkeypatch.setenv('ASYNC_ENABLED', 'True')
+    app = create_app()
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
+    app.extensions['async_db'].dispose()
+
+def test_async_endpoints(async_app):
+    client = async_app.test_client()
+    response = client.put('/user/register', data={'username': 'owner', 'email': 'owner@test.test', 'first_name': 'owner', 'last_name': 'owner', 'password': 'owner', 'confirm_password': 'owner'})
+    headers = {'Authorization': f"Bearer {response.json['user']['access']}"}
+    account_id = client.put('/account/create', data={'currency': 'USD'}, headers=headers).json['account id']
+
+    response = client.put('/user/register', data={'username': 'receiver', 'email': 'receiver@test.test', 'first_name': 'receiver', 'last_name': 'receiver', 'password': 'receiver', 'confirm_password': 'receiver'})
+    receiver_headers = {'Authorization': f"Bearer {response.json['user']['access']}"}
+    receiver_id = client.put('/account/create', data={'currency': 'USD'}, headers=receiver_headers).json['account id']
+
+    assert client.put('/async/transaction/deposit', data={'id': account_id, 'amount': 100}, headers=headers).status_code == 200
+    assert client.put('/async/transaction/withdraw', data={'id': account_id, 'amount': 500}, headers=headers).status_code == 402
+    response = client.put('/async/transaction/transfer', data={'id': account_id, 'receiver_username': 'receiver', 'receiver_id': receiver_id, 'amount': 30}, headers={**headers, 'Idempotency-Key': 'transfer-1'})
+    assert response.status_code == 200
+    response = client.put('/async/transaction/transfer', data={'id': account_id, 'receiver_username': 'receiver', 'receiver_id': receiver_id, 'amount': 30}, headers={**headers, 'Idempotency-Key': 'transfer-1'})
+    assert response.headers['Idempotent-Replayed'] == 'true'
+    assert db.session.get(IdempotencyKey, 1).applied_at is not None
+
+    assert client.post('/async/account/balance', data={'id': account_id}, headers=headers).json['account']['balance'] == 70
+    assert client.post('/account/balance', data={'id': receiver_id}, headers=receiver_headers).json['account']['balance'] == 30
+    assert client.get('/async/user/view-accounts', headers=receiver_headers).json['accounts'][0]['balance'] == 30
+    assert client.get('/async/user/view-profile', headers=headers).status_code == 200
+    assert len(client.post('/async/account/view-transaction-history', data={'id': account_id}, headers=headers).json['transactions']) == 2
+
+def test_async_endpoints_are_disabled_by_default(client, access_token):
+    assert client.get('/async/user/view-profile', headers={'Authorization': f'Bearer {access_token}'}).status_code == 404
@@ -0,0 +1,47 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert, select
+
+from extensions import db
+from src.models.balance_snapshot_model import BalanceSnapshot
+from src.models.transaction_model import Transaction
+from src.services.balance_snapshot_service import BalanceSnapshotService
+from src.utils.constants import TransactionType
+
+
+def test_snapshots_follow_transactions(client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 100}, headers=headers)
+    client.put('/transaction/withdraw', data={'id': account_id, 'amount': 30}, headers=headers)
+    client.put('/transaction/withdraw', data={'id': account_id, 'amount': 1000}, headers=headers)
+
+    snapshots = db.session.execute(select(BalanceSnapshot.account_id, BalanceSnapshot.day, BalanceSnapshot.balance)).all()
+    assert snapshots == [(account_id, date.today(), 70)]
+
+def test_balance_at(client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    start = datetime(2024, 1, 1, 12)
+    db.session.execute(insert(Transaction), [
+        {'type': TransactionType.DEPOSIT.value, 'sender_id': account_id, 'receiver_id': account_id, 'amount': 100, 'date': start},
+        {'type': TransactionType.WITHDRAW.value, 'sender_id': account_id, 'receiver_id': account_id, 'amount': 10, 'date': start + timedelta(hours=1)},
+        {'type': TransactionType.DEPOSIT.value, 'sender_id': account_id, 'receiver_id': account_id, 'amount': 50, 'date': start + timedelta(days=2)},
+        {'type': TransactionType.WITHDRAW.value, 'sender_id': account_id, 'receiver_id': account_id, 'amount': 5, 'date': start + timedelta(days=2, hours=1)},
+    ])
+    db.session.commit()
+
+    expected = {start - timedelta(days=1): 0, start: 100, start + timedelta(hours=2): 90, start + timedelta(days=1): 90, start + timedelta(days=2): 140, start + timedelta(days=3): 135}
+
+    service = BalanceSnapshotService(db.session)
+    for at, balance in expected.items():
+        assert service.balance_at(account_id, at) == balance
+
+    assert service.backfill(batch_size=1) == 2
+    assert db.session.scalars(select(BalanceSnapshot.balance).order_by(BalanceSnapshot.day)).all() == [90, 135]
+    for at, balance in expected.items():
+        assert service.balance_at(account_id, at) == balance
+
+    response = client.post('/account/balance-at', data={'id': account_id, 'at': (start + timedelta(days=2, minutes=30)).isoformat()}, headers=headers)
+    assert response.status_code == 200
+    assert response.json['account']['balance'] == 140
+
+    response = client.post('/account/balance-at', data={'id': account_id}, headers=headers)
+    assert response.status_code == 401
@@ -25,6 +25,7 @@ def test_config(environment: str):
         "JWT_REFRESH_TOKEN_EXPIRES": "7200",
         "JWT_BLOCKLIST_ENABLED": "True",
         "JWT_BLOCKLIST_TOKEN_CHECKS": "access,refresh",
+        "JWT_BLOCKLIST_REFRESH_INTERVAL": "2.5",
         "FLASK_ENV": environment,
     }):
         conf = config[environment]()
@@ -44,3 +45,9 @@ def test_config(environment: str):
         assert conf.JWT_REFRESH_TOKEN_EXPIRES.total_seconds() == 7200
         assert conf.JWT_BLOCKLIST_ENABLED
         assert conf.JWT_BLOCKLIST_TOKEN_CHECKS == ['access', 'refresh']
+        assert conf.JWT_BLOCKLIST_REFRESH_INTERVAL == 2.5
+        if environment == 'production':
+            assert conf.SQLALCHEMY_ENGINE_OPTIONS['pool_size'] == 10
+        else:
+            assert conf.SQLALCHEMY_ENGINE_OPTIONS['pool_size'] == 5
+        assert conf.SQLALCHEMY_ENGINE_OPTIONS['pool_pre_ping']
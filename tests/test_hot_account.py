@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+from sqlalchemy import select
+
+from extensions import db
+from src.models.account_shard_model import AccountShard
+from src.models.balance_snapshot_model import BalanceSnapshot
+from src.services.hot_account_service import HotAccountService
+from src.services.reconciliation_service import ReconciliationService
+
+
+def test_hot_account_credits_go_to_shards(client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}'}
+
+    response = client.put('/user/register', data={'username': 'merchant', 'email': 'merchant@test.test', 'first_name': 'merchant', 'last_name': 'merchant', 'password': 'merchant', 'confirm_password': 'merchant'})
+    merchant_headers = {'Authorization': f"Bearer {response.json['user']['access']}"}
+    merchant_id = client.put('/account/create', data={'currency': 'USD'}, headers=merchant_headers).json['account id']
+
+    service = HotAccountService(db.session)
+    assert service.set_shards(merchant_id, 4)
+    assert not service.set_shards(999, 4)
+
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 100}, headers=headers)
+    for _ in range(5):
+        response = client.put('/transaction/transfer', data={'id': account_id, 'receiver_username': 'merchant', 'receiver_id': merchant_id, 'amount': 10}, headers=headers)
+        assert response.status_code == 200
+    client.put('/transaction/deposit', data={'id': merchant_id, 'amount': 5}, headers=merchant_headers)
+
+    shards = db.session.scalars(select(AccountShard.balance).where(AccountShard.account_id == merchant_id)).all()
+    assert len(shards) == 4 and sum(shards) == 55
+    assert client.post('/account/balance', data={'id': merchant_id}, headers=merchant_headers).json['account']['balance'] == 55
+    assert client.get('/user/view-accounts', headers=merchant_headers).json['accounts'][0]['balance'] == 55
+    assert ReconciliationService(db.session).reconcile()['mismatches'] == []
+
+    # The withdrawal is larger than the account row, so the shards are merged into it first
+    response = client.put('/transaction/withdraw', data={'id': merchant_id, 'amount': 30}, headers=merchant_headers)
+    assert response.status_code == 200
+    assert sum(db.session.scalars(select(AccountShard.balance).where(AccountShard.account_id == merchant_id))) == 0
+    assert client.post('/account/balance', data={'id': merchant_id}, headers=merchant_headers).json['account']['balance'] == 25
+
+    response = client.put('/transaction/withdraw', data={'id': merchant_id, 'amount': 30}, headers=merchant_headers)
+    assert response.status_code == 402
+
+    client.put('/transaction/transfer', data={'id': account_id, 'receiver_username': 'merchant', 'receiver_id': merchant_id, 'amount': 10}, headers=headers)
+    response = client.delete('/account/delete', data={'id': merchant_id}, headers=merchant_headers)
+    assert response.status_code == 402
+
+    assert service.merge_all() == 1
+    assert client.post('/account/balance', data={'id': merchant_id}, headers=merchant_headers).json['account']['balance'] == 35
+
+    assert service.set_shards(merchant_id, 0)
+    assert db.session.scalars(select(AccountShard).where(AccountShard.account_id == merchant_id)).all() == []
+    assert client.post('/account/balance', data={'id': merchant_id}, headers=merchant_headers).json['account']['balance'] == 35
+
+def test_hot_account_snapshots_are_written_at_day_end(client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 100}, headers=headers)
+
+    service = HotAccountService(db.session)
+    service.set_shards(account_id, 2)
+    assert db.session.scalars(select(BalanceSnapshot).where(BalanceSnapshot.account_id == account_id)).all() == []
+
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 20}, headers=headers)
+    assert db.session.scalars(select(BalanceSnapshot).where(BalanceSnapshot.account_id == account_id)).all() == []
+
+    assert service.close_day(date.today()) == 1
+    assert db.session.scalar(select(BalanceSnapshot.balance).where(BalanceSnapshot.account_id == account_id, BalanceSnapshot.day == date.today())) == 120
+    assert service.close_day(date.today() - timedelta(days=1)) == 1
+    assert db.session.scalar(select(BalanceSnapshot.balance).where(BalanceSnapshot.account_id == account_id, BalanceSnapshot.day == date.today() - timedelta(days=1))) == 0
+
+def test_view_accounts_sums_shards_in_one_query(client, access_token, query_budget):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    service = HotAccountService(db.session)
+    for amount in [10, 20, 30]:
+        account_id = client.put('/account/create', data={'currency': 'USD'}, headers=headers).json['account id']
+        service.set_shards(account_id, 2)
+        client.put('/transaction/deposit', data={'id': account_id, 'amount': amount}, headers=headers)
+
+    with query_budget(10) as statements:
+        response = client.get('/user/view-accounts', headers=headers)
+    assert [account['balance'] for account in response.json['accounts']] == [10, 20, 30]
+    assert sum('account_shards' in statement for statement in statements) == 1
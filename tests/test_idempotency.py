@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+from sqlalchemy import insert, update
+
+from extensions import db
+from src.models.idempotency_key_model import IdempotencyKey
+from src.utils import idempotency
+
+
+def balance(client, headers, account_id):
+    return client.post('/account/balance', data={'id': account_id}, headers=headers).json['account']['balance']
+
+def test_repeated_request_is_replayed(client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}', 'Idempotency-Key': 'deposit-1'}
+
+    response = client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers=headers)
+    assert response.status_code == 200
+    assert 'Idempotent-Replayed' not in response.headers
+
+    response = client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers=headers)
+    assert response.status_code == 200
+    assert response.json['message'] == 'Deposit successful'
+    assert response.headers['Idempotent-Replayed'] == 'true'
+    assert balance(client, headers, account_id) == 10
+
+    response = client.put('/transaction/deposit', data={'id': account_id, 'amount': 20}, headers=headers)
+    assert response.status_code == 422
+
+    response = client.put('/transaction/withdraw', data={'id': account_id, 'amount': 100}, headers={**headers, 'Idempotency-Key': 'withdraw-1'})
+    assert response.status_code == 402
+    response = client.put('/transaction/withdraw', data={'id': account_id, 'amount': 100}, headers={**headers, 'Idempotency-Key': 'withdraw-1'})
+    assert response.status_code == 402
+    assert response.headers['Idempotent-Replayed'] == 'true'
+
+    headers.pop('Idempotency-Key')
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers=headers)
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers=headers)
+    assert balance(client, headers, account_id) == 30
+
+def test_expired_key_runs_again(client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}', 'Idempotency-Key': 'deposit-1'}
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers=headers)
+
+    db.session.execute(update(IdempotencyKey).values(expires_at=datetime.now() - timedelta(seconds=1)))
+    db.session.commit()
+
+    response = client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers=headers)
+    assert 'Idempotent-Replayed' not in response.headers
+    assert balance(client, headers, account_id) == 20
+
+def test_duplicate_waits_for_first_request(app, client, access_token, account_id, monkeypatch):
+    headers = {'Authorization': f'Bearer {access_token}', 'Idempotency-Key': 'deposit-1'}
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers=headers)
+    first = db.session.get(IdempotencyKey, 1)
+    status, response, mimetype = first.status, first.response, first.mimetype
+
+    # The first request is still in flight, it finishes while the duplicate waits
+    db.session.execute(update(IdempotencyKey).values(status=None, response=None, mimetype=None))
+    db.session.commit()
+
+    def finish_first_request(seconds):
+        db.session.execute(update(IdempotencyKey).values(status=status, response=response, mimetype=mimetype))
+        db.session.commit()
+    monkeypatch.setattr(idempotency.time, 'sleep', finish_first_request)
+
+    response = client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers['Idempotent-Replayed'] == 'true'
+
+    with app.test_request_context('/transaction/deposit', method='PUT', data={'id': account_id, 'amount': 10}):
+        fingerprint = idempotency.request_fingerprint()
+    db.session.execute(insert(IdempotencyKey).values(username='owner', key='deposit-2', fingerprint=fingerprint, date=datetime.now(), expires_at=datetime.now() + timedelta(days=1)))
+    db.session.commit()
+    monkeypatch.setattr(idempotency.time, 'sleep', lambda seconds: None)
+    app.config['IDEMPOTENCY_WAIT_TIMEOUT'] = 0
+
+    response = client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers={**headers, 'Idempotency-Key': 'deposit-2'})
+    assert response.status_code == 409
+
+def test_abandoned_claim_is_taken_over(app, client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}', 'Idempotency-Key': 'deposit-1'}
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers=headers)
+    assert db.session.get(IdempotencyKey, 1).applied_at is not None
+
+    with app.test_request_context('/transaction/deposit', method='PUT', data={'id': account_id, 'amount': 10}):
+        fingerprint = idempotency.request_fingerprint()
+    abandoned = datetime.now() - app.config['IDEMPOTENCY_PROCESSING_TIMEOUT'] - timedelta(seconds=1)
+    # The worker of deposit-2 died before committing the deposit, the one of deposit-3 after
+    for key, applied_at in [('deposit-2', None), ('deposit-3', abandoned)]:
+        db.session.execute(insert(IdempotencyKey).values(username='owner', key=key, fingerprint=fingerprint, claimed_at=abandoned, applied_at=applied_at, date=abandoned, expires_at=datetime.now() + timedelta(days=1)))
+    db.session.commit()
+
+    response = client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers={**headers, 'Idempotency-Key': 'deposit-2'})
+    assert response.status_code == 200
+    assert 'Idempotent-Replayed' not in response.headers
+
+    response = client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers={**headers, 'Idempotency-Key': 'deposit-3'})
+    assert response.status_code == 409
+    assert 'unknown' in response.json['error']
+    assert balance(client, headers, account_id) == 20
+
+def test_lost_claim_race_waits_until_deadline(app, client, access_token, account_id, monkeypatch):
+    monkeypatch.setattr(idempotency.IdempotencyService, 'claim', lambda *args: None)
+    monkeypatch.setattr(idempotency.time, 'sleep', lambda seconds: None)
+    app.config['IDEMPOTENCY_WAIT_TIMEOUT'] = 0
+
+    response = client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers={'Authorization': f'Bearer {access_token}', 'Idempotency-Key': 'deposit-1'})
+    assert response.status_code == 409
@@ -0,0 +1,40 @@
+import io
+import json
+from sqlalchemy import select, func
+
+from extensions import db
+from src.models.account_model import Account
+from src.models.user_model import User
+from src.services.import_service import ImportService, read_rows
+
+
+def test_import_users(client, access_token):
+    file = io.StringIO(
+        'first_name,last_name,username,email,password,currencies\n'
+        'first,last,imported1,Imported1@test.test,secret,USD LBP\n'
+        'first,last,imported2,imported2@test.test,secret,\n'
+        'first,last,owner,other@test.test,secret,USD\n'
+        'first,last,imported3,imported1@test.test,secret,USD\n'
+        'first,last,imported4,not-an-email,secret,EUR\n'
+        'first,last,imported5,imported5@test.test,secret,USD\n'
+    )
+    rejected = {}
+    report = ImportService(db.session).import_users(read_rows(file, 'csv'), batch_size=2, workers=1, on_reject=rejected.__setitem__)
+
+    assert report == {'users': 3, 'accounts': 3, 'rejected': 3}
+    assert set(rejected) == {4, 5, 6}
+    assert set(rejected[6]) == {'email', 'currencies'}
+    assert db.session.scalar(select(func.count()).select_from(Account).join(User).where(User.username == 'imported1')) == 2
+
+    response = client.post('/user/login', data={'email': 'imported1@test.test', 'password': 'secret'})
+    assert response.status_code == 200
+
+def test_import_hashes_in_worker_processes(app):
+    lines = [json.dumps({'first_name': 'first', 'last_name': 'last', 'username': f'imported{number}', 'email': f'imported{number}@test.test', 'password': 'secret', 'currencies': ['USD']}) for number in range(10)]
+    report = ImportService(db.session).import_users(read_rows(io.StringIO('\n'.join(lines)), 'ndjson'), batch_size=4, workers=2)
+
+    assert report == {'users': 10, 'accounts': 10, 'rejected': 0}
+
+def test_rejected_rows_keep_their_file_line():
+    file = io.StringIO('{"username": "first"}\n\n{"username": "second"}\n')
+    assert [line for line, _ in read_rows(file, 'ndjson')] == [1, 3]
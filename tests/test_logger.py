@@ -0,0 +1,49 @@
+import json
+import logging
+import sys
+
+from logger import JsonFormatter, SamplingFilter, RequestIdFilter, TracebackQueueHandler
+
+
+def record(level: int) -> logging.LogRecord:
+    return logging.LogRecord('P2P_APP', level, __file__, 1, 'message %s', ('argument',), None)
+
+def test_sampling_filter():
+    never = SamplingFilter(0)
+    assert not never.filter(record(logging.INFO))
+    assert not never.filter(record(logging.DEBUG))
+    assert never.filter(record(logging.WARNING))
+    assert SamplingFilter(1).filter(record(logging.INFO))
+
+def test_json_formatter_includes_request_id(app):
+    with app.test_request_context():
+        from flask import g
+        g.request_id = 'request-1'
+        entry = record(logging.INFO)
+        RequestIdFilter().filter(entry)
+
+    line = json.loads(JsonFormatter().format(entry))
+    assert line['request_id'] == 'request-1'
+    assert line['message'] == 'message argument'
+    assert line['level'] == 'INFO'
+
+def test_json_formatter_includes_traceback():
+    try:
+        raise ValueError('broken')
+    except ValueError:
+        entry = logging.LogRecord('P2P_APP', logging.ERROR, __file__, 1, 'failed %s', ('argument',), sys.exc_info(), sinfo='Stack (most recent call last):')
+
+    queued = TracebackQueueHandler(None).prepare(entry)
+    for formatted in [entry, queued]:
+        line = json.loads(JsonFormatter().format(formatted))
+        assert line['message'] == 'failed argument'
+        assert line['exc_info'].startswith('Traceback (most recent call last):')
+        assert line['exc_info'].endswith('ValueError: broken')
+        assert line['stack_info'] == 'Stack (most recent call last):'
+
+def test_request_id_header(client):
+    response = client.get('/', headers={'X-Request-ID': 'client-id'})
+    assert response.headers['X-Request-ID'] == 'client-id'
+
+    response = client.get('/')
+    assert len(response.headers['X-Request-ID']) == 32
@@ -0,0 +1,44 @@
+import hashlib
+from sqlalchemy import update
+
+from extensions import db
+from src.models.user_model import User
+from src.utils.passwords import HashParameters, PasswordHasher, get_password_hasher, verify
+
+
+def test_hashes_record_their_parameters():
+    scrypt = PasswordHasher(HashParameters(scrypt_n=16), 0)
+    salt, stored = scrypt.hash('secret')
+    assert stored.startswith('scrypt$16$8$1$')
+    assert scrypt.verify('secret', salt, stored)
+    assert not scrypt.verify('wrong', salt, stored)
+    assert not scrypt.needs_rehash(stored)
+
+    pbkdf2 = PasswordHasher(HashParameters(scheme='pbkdf2_sha256', pbkdf2_iterations=1000), 0)
+    assert pbkdf2.needs_rehash(stored)
+    # Hashes made with older parameters stay valid after the parameters change
+    assert pbkdf2.verify('secret', salt, stored)
+
+    salt, stored = pbkdf2.hash('secret')
+    assert stored.startswith('pbkdf2_sha256$1000$')
+    assert verify('secret', salt, stored)
+
+def test_hashing_in_worker_processes():
+    hasher = PasswordHasher(HashParameters(scrypt_n=16), 1)
+    try:
+        salt, stored = hasher.hash('secret')
+        assert hasher.verify('secret', salt, stored)
+    finally:
+        hasher.shutdown()
+
+def test_legacy_hash_is_upgraded_on_login(client, access_token):
+    salt = 'legacy-salt'
+    db.session.execute(update(User).where(User.username == 'owner').values(salt=salt, password=hashlib.sha256(('owner' + salt).encode()).hexdigest()))
+    db.session.commit()
+
+    assert client.post('/user/login', data={'username': 'owner', 'password': 'wrong'}).status_code == 402
+    assert client.post('/user/login', data={'username': 'owner', 'password': 'owner'}).status_code == 200
+
+    user = db.session.query(User).filter_by(username='owner').one()
+    assert not get_password_hasher().needs_rehash(user.password)
+    assert client.post('/user/login', data={'username': 'owner', 'password': 'owner'}).status_code == 200
@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import create_engine, exc
+
+from src.utils.pool_metrics import MeteredQueuePool, pool_metrics
+
+
+def test_metered_pool(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=MeteredQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05)
+
+    connection = engine.connect()
+    metrics = pool_metrics(engine)
+    assert metrics['checked out'] == 1
+    assert metrics['idle'] == 0
+    assert metrics['checkouts'] == 1
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    connection.close()
+    metrics = pool_metrics(engine)
+    assert metrics['checked out'] == 0
+    assert metrics['idle'] == 1
+    assert metrics['timeouts'] == 1
+    assert metrics['max wait time'] >= 0.05
+
+def test_pool_metrics_route(client):
+    response = client.get('/metrics/pool')
+    assert response.status_code == 200
+    assert 'pool' in response.json['pool']
+
+def test_metrics_routes_are_protected(app, client):
+    app.config['METRICS_TOKEN'] = 'scraper-token'
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics/pool', headers={'Authorization': 'Bearer wrong-token'}).status_code == 401
+    assert client.get('/metrics/pool', headers={'Authorization': 'Bearer scraper-token'}).status_code == 200
+
+    app.config['METRICS_ENABLED'] = False
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scraper-token'}).status_code == 404
@@ -0,0 +1,8 @@
+import pytest
+from extensions import db
+from src.utils.query_plan import hot_queries, find_full_scans
+
+
+def test_hot_queries_use_indexes(app):
+    for name, statement in hot_queries(db.session).items():
+        assert find_full_scans(db.session, statement) == [], f'{name} regressed to a full table scan'
@@ -0,0 +1,93 @@
+import time
+import fakeredis
+import pytest
+
+from src.utils.rate_limit import Limit, MemoryBackend, RedisBackend, init_rate_limiting, parse_limit, parse_limits
+
+
+def test_bucket_refills_over_time():
+    now = [0.0]
+    backend = MemoryBackend(clock=lambda: now[0])
+    limit = parse_limit('2/minute')
+
+    assert backend.take('key', limit) == 0
+    assert backend.take('key', limit) == 0
+    assert backend.take('key', limit) == pytest.approx(30)
+    assert backend.take('other', limit) == 0
+
+    now[0] = 30
+    assert backend.take('key', limit) == 0
+    assert backend.take('key', limit) == pytest.approx(30)
+
+def test_least_recently_used_buckets_are_evicted():
+    backend = MemoryBackend(max_keys=2)
+    limit = Limit(1, 1)
+
+    backend.take('a', limit)
+    backend.take('b', limit)
+    backend.take('a', limit)
+    backend.take('c', limit)
+    assert list(backend.buckets) == ['a', 'c']
+
+    for key in range(100):
+        backend.take(str(key), limit)
+    assert len(backend.buckets) == 2
+
+def test_redis_bucket_script():
+    client = fakeredis.FakeRedis()
+    backend = RedisBackend(client)
+    limit = parse_limit('2/minute')
+
+    assert backend.take('key', limit) == 0
+    assert backend.take('key', limit) == 0
+    assert backend.take('key', limit) == pytest.approx(30, abs=0.1)
+    assert backend.take('other', limit) == 0
+    assert 0 < client.ttl('rate-limit:key') <= 61
+
+    fast = Limit(1, 100)
+    assert backend.take('fast', fast) == 0
+    assert backend.take('fast', fast) > 0
+    time.sleep(0.02)
+    assert backend.take('fast', fast) == 0
+
+def test_unreachable_redis_lets_requests_through():
+    server = fakeredis.FakeServer()
+    server.connected = False
+    backend = RedisBackend(fakeredis.FakeRedis(server=server))
+
+    assert backend.take('key', Limit(1, 1)) == 0
+    assert backend.take('key', Limit(1, 1)) == 0
+    assert not backend.available
+
+    server.connected = True
+    assert backend.take('key', Limit(1, 1)) == 0
+    assert backend.take('key', Limit(1, 1)) > 0
+    assert backend.available
+
+def test_parse_limits():
+    assert parse_limits('/user/login 20/minute, /metrics unlimited') == {'/user/login': Limit(20, 20 / 60), '/metrics': None}
+    with pytest.raises(ValueError):
+        parse_limit('20 per minute')
+
+def test_limits_per_address_and_identity(app, query_budget):
+    app.config.update(RATE_LIMIT_ENABLED=True, RATE_LIMIT_DEFAULT='unlimited', RATE_LIMITS='/user/login 2/minute, /account/balance 1/hour')
+    init_rate_limiting(app)
+    client = app.test_client()
+    response = client.put('/user/register', data={'username': 'owner', 'email': 'owner@test.test', 'first_name': 'owner', 'last_name': 'owner', 'password': 'owner', 'confirm_password': 'owner'})
+    headers = {'Authorization': f"Bearer {response.json['user']['access']}"}
+    account_id = client.put('/account/create', data={'currency': 'USD'}, headers=headers).json['account id']
+
+    for _ in range(2):
+        assert client.post('/user/login', data={'username': 'owner', 'password': 'owner'}).status_code == 200
+    with query_budget(0):
+        response = client.post('/user/login', data={'username': 'owner', 'password': 'owner'})
+    assert response.status_code == 429
+    assert 1 <= int(response.headers['Retry-After']) <= 30
+    assert client.post('/user/login', data={'username': 'owner', 'password': 'owner'}, environ_base={'REMOTE_ADDR': '10.0.0.2'}).status_code == 200
+
+    assert client.post('/account/balance', data={'id': account_id}, headers=headers).status_code == 200
+    # Another address gets its own bucket, the user's is empty already
+    with query_budget(0):
+        response = client.post('/account/balance', data={'id': account_id}, headers=headers, environ_base={'REMOTE_ADDR': '10.0.0.3'})
+    assert response.status_code == 429
+    assert client.get('/user/view-profile', headers=headers).status_code == 200
@@ -0,0 +1,66 @@
+from sqlalchemy import event
+from extensions import db
+from src.models.account_model import Account
+from src.services.reconciliation_service import ReconciliationService
+
+
+def test_reconcile(client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers=headers)
+    client.put('/transaction/withdraw', data={'id': account_id, 'amount': 4}, headers=headers)
+
+    service = ReconciliationService(db.session)
+    report = service.reconcile(chunk_size=1)
+    assert report['transactions'] == 2
+    assert report['mismatches'] == []
+
+    db.session.get(Account, account_id).balance = 7
+    db.session.commit()
+
+    report = service.reconcile(chunk_size=1)
+    assert [mismatch['account id'] for mismatch in report['mismatches']] == [account_id]
+    assert report['mismatches'][0]['expected balance'] == 6
+
+def test_reconcile_incremental(client, access_token, account_id, tmp_path):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    checkpoint = str(tmp_path / 'checkpoint.npz')
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers=headers)
+
+    service = ReconciliationService(db.session)
+    report = service.reconcile(checkpoint=checkpoint)
+    assert report['transactions'] == 1
+
+    client.put('/transaction/withdraw', data={'id': account_id, 'amount': 3}, headers=headers)
+    client.put('/account/create', data={'currency': 'LBP'}, headers=headers)
+
+    report = service.reconcile(checkpoint=checkpoint)
+    assert report['transactions'] == 1
+    assert report['accounts'] == 2
+    assert report['mismatches'] == []
+
+    report = service.reconcile(checkpoint=checkpoint, full=True)
+    assert report['transactions'] == 2
+    assert report['mismatches'] == []
+
+def test_reconcile_reads_one_snapshot(client, access_token, account_id, monkeypatch):
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers={'Authorization': f'Bearer {access_token}'})
+    reads = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        reads.append((conn, conn.in_transaction(), conn.get_execution_options().get('isolation_level')))
+
+    # SQLite stands in for PostgreSQL, only the isolation level it would be given is checked
+    dialect = db.engine.dialect
+    monkeypatch.setattr(dialect, 'name', 'postgresql')
+    monkeypatch.setattr(dialect, 'get_isolation_level_values', lambda dbapi_connection: ['READ COMMITTED', 'REPEATABLE READ', 'SERIALIZABLE'])
+    monkeypatch.setattr(dialect, 'set_isolation_level', lambda dbapi_connection, level: None)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        assert ReconciliationService(db.session).reconcile(chunk_size=1)['mismatches'] == []
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    # The account count, the transactions and the stored balances are read in one REPEATABLE READ transaction
+    assert len(reads) == 3
+    assert len({conn for conn, _, _ in reads}) == 1
+    assert all(in_transaction and isolation_level == 'REPEATABLE READ' for _, in_transaction, isolation_level in reads)
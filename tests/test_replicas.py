@@ -0,0 +1,64 @@
+from sqlalchemy import create_engine, select
+
+from extensions import db
+from src.models.user_model import User
+from src.utils.constants import READ_YOUR_WRITES_COOKIE
+from src.utils.replicas import Replica, ReplicaRouter, init_replicas
+
+
+def test_reads_go_to_replica_unless_user_wrote_recently(app, tmp_path):
+    app.config['SQLALCHEMY_REPLICA_URIS'] = [f"sqlite:///{tmp_path / 'replica.db'}"]
+    init_replicas(app)
+    router = app.extensions['replica_router']
+    # The replica is empty, so reads served by it do not find the user
+    db.metadata.create_all(router.replicas[0].engine)
+
+    client = app.test_client()
+    response = client.put('/user/register', data={'username': 'owner', 'email': 'owner@test.test', 'first_name': 'owner', 'last_name': 'owner', 'password': 'owner', 'confirm_password': 'owner'})
+    headers = {'Authorization': f"Bearer {response.json['user']['access']}"}
+    account_id = client.put('/account/create', data={'currency': 'USD'}, headers=headers).json['account id']
+    assert router.wrote_recently(client.get_cookie(READ_YOUR_WRITES_COOKIE).value, 'owner')
+
+    assert client.get('/user/view-accounts', headers=headers).status_code == 200
+
+    router.read_your_writes_window = 0
+    client.delete_cookie(READ_YOUR_WRITES_COOKIE)
+    assert client.get('/user/view-accounts', headers=headers).status_code == 404
+    assert client.post('/account/balance', data={'id': account_id}, headers=headers).status_code == 404
+
+    response = client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers=headers)
+    assert response.headers['Set-Cookie'].startswith(f'{READ_YOUR_WRITES_COOKIE}=')
+
+    router.replicas[0].mark(False)
+    assert client.post('/account/balance', data={'id': account_id}, headers=headers).json['account']['balance'] == 10
+
+    router.dispose()
+
+def test_unreachable_replica_is_unhealthy(tmp_path):
+    replica = Replica(create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"), 5)
+    assert not replica.is_healthy()
+
+def test_request_reads_from_one_replica(app, tmp_path):
+    app.config['SQLALCHEMY_REPLICA_URIS'] = [f"sqlite:///{tmp_path / 'first.db'}", f"sqlite:///{tmp_path / 'second.db'}"]
+    init_replicas(app)
+    router = app.extensions['replica_router']
+
+    with app.test_request_context():
+        db.session.info['replica'] = True
+        engine = db.session.get_bind(clause=select(User))
+        assert all(db.session.get_bind(clause=select(User)) is engine for _ in range(3))
+        db.session.info.pop('replica')
+        db.session.info.pop('replica_engine')
+
+    router.dispose()
+
+def test_write_marker_holds_across_workers():
+    marker = ReplicaRouter([], {}, 5, 5, 'secret').write_marker('owner')
+
+    # Another worker process has its own router, the marker is all it needs
+    other_worker = ReplicaRouter([], {}, 5, 5, 'secret')
+    assert other_worker.wrote_recently(marker, 'owner')
+    assert not other_worker.wrote_recently(marker, 'someone-else')
+    assert not other_worker.wrote_recently(marker + 'forged', 'owner')
+    assert not ReplicaRouter([], {}, 5, 5, 'other-secret').wrote_recently(marker, 'owner')
+    assert not other_worker.wrote_recently(None, 'owner')
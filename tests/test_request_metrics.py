@@ -0,0 +1,49 @@
+import pytest
+from flask import g
+from sqlalchemy import exc, text
+
+from extensions import db
+from src.utils import request_metrics
+from src.utils.request_metrics import Histogram
+
+
+def test_histogram_render():
+    histogram = Histogram('latency', 'Latency.', ('endpoint',), (0.1, 1.0))
+    histogram.observe(('route',), 0.05)
+    histogram.observe(('route',), 0.5)
+    histogram.observe(('route',), 5)
+
+    lines = histogram.render()
+    assert 'latency_bucket{endpoint="route",le="0.1"} 1' in lines
+    assert 'latency_bucket{endpoint="route",le="1.0"} 2' in lines
+    assert 'latency_bucket{endpoint="route",le="+Inf"} 3' in lines
+    assert 'latency_count{endpoint="route"} 3' in lines
+
+def test_metrics_route(client, access_token, account_id):
+    client.get('/account/view-all-transaction-history', headers={'Authorization': f'Bearer {access_token}'})
+    client.get('/does-not-exist')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+
+    lines = response.get_data(as_text=True).splitlines()
+    assert 'p2p_http_requests_total{endpoint="account.create",method="PUT",status="200"} 1' in lines
+    assert 'p2p_http_requests_total{endpoint="unmatched",method="GET",status="404"} 1' in lines
+    assert any(line.startswith('p2p_db_statements_per_request_sum{endpoint="account.view_accounts",method="GET"}') and float(line.split()[-1]) > 0 for line in lines)
+    assert any(line.startswith('p2p_http_request_duration_seconds_bucket{endpoint="account.view_accounts"') for line in lines)
+
+def test_failed_statements_leave_no_timing_behind(app, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(request_metrics.time, 'perf_counter', lambda: next(clock))
+
+    with app.test_request_context():
+        g.sql_statements, g.sql_time = 0, 0.0
+        with db.engine.connect() as connection:
+            with pytest.raises(exc.OperationalError):
+                connection.execute(text('SELECT * FROM missing_table'))
+            connection.execute(text('SELECT 1'))
+            assert 'statement_start' not in connection.info
+
+        assert g.sql_statements == 1
+        assert g.sql_time == 1
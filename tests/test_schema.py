@@ -0,0 +1,45 @@
+import sys
+import click
+import pytest
+from flask.cli import FlaskGroup
+
+from app import create_app
+from src.utils.schema import migration_heads
+
+
+def write_revision(directory, revision, down_revision):
+    (directory / f'{revision}_migration.py').write_text(f'revision = {revision!r}\ndown_revision: str = {down_revision!r}\n')
+
+def test_migration_heads(tmp_path):
+    versions = tmp_path / 'versions'
+    versions.mkdir()
+    write_revision(versions, 'base', None)
+    write_revision(versions, 'left', 'base')
+    write_revision(versions, 'right', 'base')
+    assert migration_heads(tmp_path) == {'left', 'right'}
+
+    write_revision(versions, 'merge', ('left', 'right'))
+    assert migration_heads(tmp_path) == {'merge'}
+
+def test_check_schema(monkeypatch):
+    monkeypatch.setenv('FLASK_ENV', 'testing')
+    monkeypatch.delenv('FLASK_RUN_FROM_CLI', raising=False)
+
+    monkeypatch.setenv('SCHEMA_CHECK', 'strict')
+    with pytest.raises(RuntimeError, match='flask db upgrade'):
+        create_app()
+
+    monkeypatch.setenv('SCHEMA_CHECK', 'warn')
+    create_app()
+
+def test_check_schema_skips_db_commands(monkeypatch):
+    monkeypatch.setenv('FLASK_ENV', 'testing')
+    monkeypatch.setenv('SCHEMA_CHECK', 'strict')
+
+    with click.Context(FlaskGroup()):
+        monkeypatch.setattr(sys, 'argv', ['flask', '--app', 'app', 'db', 'upgrade'])
+        create_app()
+
+        monkeypatch.setattr(sys, 'argv', ['flask', '--app', 'app', 'run', '--port', '5001'])
+        with pytest.raises(RuntimeError, match='flask db upgrade'):
+            create_app()
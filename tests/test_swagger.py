@@ -0,0 +1,39 @@
+import json
+
+from app import create_app
+
+
+def test_apispec_etag(client):
+    response = client.get('/apispec_1.json')
+    assert response.status_code == 200
+    assert '/transaction/transfer' in response.json['paths']
+    etag = response.headers['ETag']
+
+    response = client.get('/apispec_1.json', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+def test_export_apispec(app, client, tmp_path):
+    output = tmp_path / 'apispec.json'
+    result = app.test_cli_runner().invoke(args=['export-apispec', '--output', str(output)])
+    assert result.exit_code == 0
+
+    spec = json.loads(output.read_text())
+    assert spec['paths'] == client.get('/apispec_1.json').json['paths']
+
+def test_apispec_from_file(monkeypatch, tmp_path):
+    output = tmp_path / 'apispec.json'
+    output.write_text(json.dumps({'swagger': '2.0', 'paths': {'/prebuilt': {}}}))
+    monkeypatch.setenv('FLASK_ENV', 'testing')
+    monkeypatch.setenv('SWAGGER_SPEC_FILE', str(output))
+
+    response = create_app().test_client().get('/apispec_1.json')
+    assert response.json['paths'] == {'/prebuilt': {}}
+
+def test_swagger_disabled(monkeypatch):
+    monkeypatch.setenv('FLASK_ENV', 'testing')
+    monkeypatch.setenv('SWAGGER_ENABLED', 'False')
+
+    app = create_app()
+    assert not hasattr(app, 'swag')
+    assert app.test_client().get('/apispec_1.json').status_code == 404
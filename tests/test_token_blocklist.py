@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+from extensions import db
+from src.models.token_blocklist_model import TokenBlocklist
+from src.services.token_blocklist_service import RevokedTokenCache, prune_expired_tokens
+
+
+def test_revoked_token_cache(app):
+    now = datetime.now()
+    cache = RevokedTokenCache(refresh_interval=3600)
+    assert not cache.is_revoked(db.session, 'revoked-elsewhere')
+
+    db.session.add(TokenBlocklist(jti='revoked-elsewhere', date=now, expires_at=now + timedelta(hours=1)))
+    db.session.add(TokenBlocklist(jti='expired', date=now, expires_at=now - timedelta(seconds=1)))
+    db.session.commit()
+    assert not cache.is_revoked(db.session, 'revoked-elsewhere')
+
+    cache.next_refresh = 0
+    assert cache.is_revoked(db.session, 'revoked-elsewhere')
+    assert not cache.is_revoked(db.session, 'expired')
+
+def test_prune_expired_tokens(app):
+    now = datetime.now()
+    db.session.add_all([TokenBlocklist(jti=f'expired-{index}', date=now, expires_at=now - timedelta(minutes=index + 1)) for index in range(5)])
+    db.session.add(TokenBlocklist(jti='live', date=now, expires_at=now + timedelta(hours=1)))
+    db.session.commit()
+
+    assert prune_expired_tokens(db.session, batch_size=2) == 5
+    assert db.session.scalars(db.select(TokenBlocklist.jti)).all() == ['live']
+
+def test_logout_revokes_token(client, access_token):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    assert client.get('/user/view-profile', headers=headers).status_code == 200
+
+    response = client.delete('/user/logout', headers=headers)
+    assert response.status_code == 200
+
+    response = client.get('/user/view-profile', headers=headers)
+    assert response.status_code == 401
+    assert response.json['msg'] == 'Token has been revoked'
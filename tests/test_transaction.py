@@ -1,6 +1,8 @@
 from tests.conftest import client
 from tests.test_user import response
 from tests.test_account import account_response
+from extensions import db
+from src.services.transaction_service import TransactionService
 
 def test_transfer(client, response, account_response):
     access_token = response.json['user']['access']
@@ -58,3 +60,89 @@ def test_withdraw(client, response, account_response):
 
     assert response.status_code == 200
     assert response.json['message'] == 'Withdrawal successful'
+
+def test_withdraw_cannot_overdraw(client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 5}, headers=headers)
+
+    response = client.put('/transaction/withdraw', data={'id': account_id, 'amount': 3}, headers=headers)
+    assert response.status_code == 200
+
+    response = client.put('/transaction/withdraw', data={'id': account_id, 'amount': 3}, headers=headers)
+    assert response.status_code == 402
+    assert response.json['error'] == 'Insufficient funds'
+
+    response = client.post('/account/balance', data={'id': account_id}, headers=headers)
+    assert response.json['account']['balance'] == 2
+
+def test_transfer_is_atomic(client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    response = client.put('/user/register', data={'username': 'payee', 'email': 'payee@test.test', 'first_name': 'payee', 'last_name': 'payee', 'password': 'payee', 'confirm_password': 'payee'})
+    payee_headers = {'Authorization': f"Bearer {response.json['user']['access']}"}
+    payee_account_id = client.put('/account/create', data={'currency': 'USD'}, headers=payee_headers).json['account id']
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 5}, headers=headers)
+
+    response = client.put('/transaction/transfer', data={'id': account_id, 'receiver_username': 'payee', 'receiver_id': payee_account_id, 'amount': 6}, headers=headers)
+    assert response.status_code == 402
+
+    response = client.put('/transaction/transfer', data={'id': payee_account_id, 'receiver_username': 'owner', 'receiver_id': account_id, 'amount': 1}, headers=payee_headers)
+    assert response.status_code == 402
+
+    response = client.put('/transaction/transfer', data={'id': account_id, 'receiver_username': 'payee', 'receiver_id': payee_account_id, 'amount': 5}, headers=headers)
+    assert response.status_code == 200
+
+    assert client.post('/account/balance', data={'id': account_id}, headers=headers).json['account']['balance'] == 0
+    assert client.post('/account/balance', data={'id': payee_account_id}, headers=payee_headers).json['account']['balance'] == 5
+
+def test_batch_transfer(client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    receivers = []
+    for name in ['payee1', 'payee2']:
+        response = client.put('/user/register', data={'username': name, 'email': f'{name}@test.test', 'first_name': name, 'last_name': name, 'password': name, 'confirm_password': name})
+        payee_headers = {'Authorization': f"Bearer {response.json['user']['access']}"}
+        receivers.append((name, client.put('/account/create', data={'currency': 'USD'}, headers=payee_headers).json['account id'], payee_headers))
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers=headers)
+
+    transfers = [
+        {'receiver_username': 'payee1', 'receiver_id': receivers[0][1], 'amount': 3},
+        {'receiver_username': 'payee2', 'receiver_id': receivers[1][1], 'amount': 4},
+        {'receiver_username': 'payee1', 'receiver_id': receivers[1][1], 'amount': 1},
+        {'receiver_username': 'nobody', 'receiver_id': receivers[0][1], 'amount': 1},
+        {'receiver_username': 'payee1', 'receiver_id': receivers[0][1], 'amount': 2},
+    ]
+    response = client.put('/transaction/batch-transfer', json={'id': account_id, 'transfers': transfers}, headers=headers)
+    assert response.status_code == 200
+    assert response.json['total'] == 9
+    assert [result['status'] for result in response.json['results']] == [200, 200, 404, 404, 200]
+
+    assert client.post('/account/balance', data={'id': account_id}, headers=headers).json['account']['balance'] == 1
+    assert client.post('/account/balance', data={'id': receivers[0][1]}, headers=receivers[0][2]).json['account']['balance'] == 5
+    assert client.post('/account/balance', data={'id': receivers[1][1]}, headers=receivers[1][2]).json['account']['balance'] == 4
+
+    response = client.put('/transaction/batch-transfer', json={'id': account_id, 'transfers': transfers[:2]}, headers=headers)
+    assert response.status_code == 402
+    assert response.json['error'] == 'Insufficient funds'
+    assert client.post('/account/balance', data={'id': account_id}, headers=headers).json['account']['balance'] == 1
+
+    response = client.put('/transaction/batch-transfer', json={'id': account_id, 'transfers': []}, headers=headers)
+    assert response.status_code == 401
+
+def test_amounts_must_be_positive(client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    response = client.put('/user/register', data={'username': 'payee', 'email': 'payee@test.test', 'first_name': 'payee', 'last_name': 'payee', 'password': 'payee', 'confirm_password': 'payee'})
+    payee_headers = {'Authorization': f"Bearer {response.json['user']['access']}"}
+    payee_id = client.put('/account/create', data={'currency': 'USD'}, headers=payee_headers).json['account id']
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 10}, headers=headers)
+
+    for amount in [-5, 0]:
+        response = client.put('/transaction/transfer', data={'id': account_id, 'receiver_username': 'payee', 'receiver_id': payee_id, 'amount': amount}, headers=headers)
+        assert response.status_code == 401
+        assert client.put('/transaction/deposit', data={'id': account_id, 'amount': amount}, headers=headers).status_code == 401
+        assert client.put('/transaction/withdraw', data={'id': account_id, 'amount': amount}, headers=headers).status_code == 401
+
+    # Queued transfers accepted before the amounts were validated are refused by the debit itself
+    data = {'id': account_id, 'receiver_username': 'payee', 'receiver_id': payee_id, 'amount': -5}
+    assert TransactionService(db.session).transfer(data, 'owner')[1] == 402
+
+    assert client.post('/account/balance', data={'id': account_id}, headers=headers).json['account']['balance'] == 10
+    assert client.post('/account/balance', data={'id': payee_id}, headers=payee_headers).json['account']['balance'] == 0
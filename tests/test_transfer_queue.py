@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+from sqlalchemy import update
+
+from extensions import db
+from src.models.pending_transfer_model import PendingTransfer
+from src.services.transfer_queue_service import TransferQueueService
+
+
+def test_queued_transfers(client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 100}, headers=headers)
+
+    response = client.put('/user/register', data={'username': 'receiver', 'email': 'receiver@test.test', 'first_name': 'receiver', 'last_name': 'receiver', 'password': 'receiver', 'confirm_password': 'receiver'})
+    receiver_headers = {'Authorization': f"Bearer {response.json['user']['access']}"}
+    receiver_id = client.put('/account/create', data={'currency': 'USD'}, headers=receiver_headers).json['account id']
+
+    ids = []
+    for receiver_username, amount in [('receiver', 60), ('receiver', 60), ('nobody', 10)]:
+        response = client.put('/transaction/transfer-async', data={'id': account_id, 'receiver_username': receiver_username, 'receiver_id': receiver_id, 'amount': amount}, headers=headers)
+        assert response.status_code == 202
+        ids.append(response.json['transfer id'])
+
+    response = client.put('/transaction/transfer-async', data={'id': account_id, 'receiver_username': 'owner', 'receiver_id': receiver_id, 'amount': 1}, headers=headers)
+    assert response.status_code == 402
+
+    response = client.get('/transaction/transfer-status', query_string={'id': ids[0]}, headers=headers)
+    assert response.json['transfer']['status'] == 'PENDING'
+    assert client.get('/transaction/transfer-status', query_string={'id': ids[0]}, headers=receiver_headers).status_code == 404
+
+    assert TransferQueueService(db.session).process(10, timedelta(minutes=5)) == 3
+    assert TransferQueueService(db.session).process(10, timedelta(minutes=5)) == 0
+
+    statuses = [client.get('/transaction/transfer-status', query_string={'id': id}, headers=headers).json['transfer'] for id in ids]
+    assert [status['status'] for status in statuses] == ['SETTLED', 'FAILED', 'FAILED']
+    assert statuses[1]['error'] == 'Insufficient funds'
+    assert statuses[2]['error'] == 'Receiver not found'
+
+    assert client.post('/account/balance', data={'id': account_id}, headers=headers).json['account']['balance'] == 40
+    assert client.post('/account/balance', data={'id': receiver_id}, headers=receiver_headers).json['account']['balance'] == 60
+
+def test_abandoned_claims_are_reclaimed(client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    for _ in range(3):
+        client.put('/transaction/transfer-async', data={'id': account_id, 'receiver_username': 'receiver', 'receiver_id': 2, 'amount': 1}, headers=headers)
+
+    service = TransferQueueService(db.session)
+    assert [pending.id for pending in service.claim(2, timedelta(minutes=5))] == [1, 2]
+    assert [pending.id for pending in service.claim(2, timedelta(minutes=5))] == [3]
+    assert service.claim(2, timedelta(minutes=5)) == []
+
+    db.session.execute(update(PendingTransfer).where(PendingTransfer.id == 2).values(claimed_at=datetime.now() - timedelta(minutes=10)))
+    db.session.commit()
+    assert [pending.id for pending in service.claim(2, timedelta(minutes=5))] == [2]
+
+def test_reclaimed_transfer_is_settled_once(client, access_token, account_id):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    client.put('/transaction/deposit', data={'id': account_id, 'amount': 100}, headers=headers)
+
+    response = client.put('/user/register', data={'username': 'receiver', 'email': 'receiver@test.test', 'first_name': 'receiver', 'last_name': 'receiver', 'password': 'receiver', 'confirm_password': 'receiver'})
+    receiver_headers = {'Authorization': f"Bearer {response.json['user']['access']}"}
+    receiver_id = client.put('/account/create', data={'currency': 'USD'}, headers=receiver_headers).json['account id']
+    client.put('/transaction/transfer-async', data={'id': account_id, 'receiver_username': 'receiver', 'receiver_id': receiver_id, 'amount': 10}, headers=headers)
+
+    service = TransferQueueService(db.session)
+    [first] = service.claim(10, timedelta(minutes=5))
+    # The first worker is slow, another one finds its claim timed out and takes the transfer over
+    [second] = service.claim(10, timedelta(seconds=-1))
+    assert second.id == first.id
+
+    assert not service.settle(first)
+    assert service.settle(second)
+    assert not service.settle(first)
+
+    assert client.get('/transaction/transfer-status', query_string={'id': first.id}, headers=headers).json['transfer']['status'] == 'SETTLED'
+    assert client.post('/account/balance', data={'id': account_id}, headers=headers).json['account']['balance'] == 90
+    assert client.post('/account/balance', data={'id': receiver_id}, headers=receiver_headers).json['account']['balance'] == 10
@@ -128,3 +128,13 @@ def test_refresh(client, response):
     assert response.json['message'] == 'Token refreshed successfully'
     assert 'access' in response.json['user']
     assert 'refresh' in response.json['user']
+
+def test_delete_query_budget(client, access_token, account_id, query_budget):
+    headers = {'Authorization': f'Bearer {access_token}'}
+    for _ in range(10):
+        client.put('/account/create', data={'currency': 'USD'}, headers=headers)
+
+    # User, funded account check, one UPDATE for all the accounts, user UPDATE, plus a possible revoked token cache refresh
+    with query_budget(5):
+        response = client.delete('/user/delete', headers=headers)
+    assert response.status_code == 200